@@ -3,9 +3,13 @@
 import pandas as pd
 import os
 
+from utility.metrics import log, print_summary, stage
+from utility.wide_table import build_fatality_wide, WIDE_TABLE_NAME
+
 # ========== CONFIG ==========
-DATA_DIR = "sources"
-OUTPUT_DIR = "output"
+# Source and output folders (override with DW_DATA_DIR / DW_OUTPUT_DIR, e.g. for synthetic sources)
+DATA_DIR = os.environ.get("DW_DATA_DIR", "sources")
+OUTPUT_DIR = os.environ.get("DW_OUTPUT_DIR", "output")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
@@ -78,12 +82,78 @@ def load_population_table(sheet_name: str) -> pd.DataFrame:
     df['population_2023'] = pd.to_numeric(df['population_2023'], errors='coerce').astype('Int64')
 
     # Remove rows where the first column (e.g., LGA name) contains "total" (case-insensitive)
-    print(df[df.iloc[:, 0].str.contains("total", case=False, na=False)])
+    log(df[df.iloc[:, 0].str.contains("total", case=False, na=False)])
     df = df[~df.iloc[:, 0].str.contains("total", case=False, na=False)].reset_index(drop=True)
 
     return df
 
 
+# State/territory names in the ABS tables → abbreviations used by the crash data;
+# the first digit of an LGA code is the position of its state in this list
+STATE_ABBREVIATIONS = {
+    "New South Wales": "NSW",
+    "Victoria": "Vic",
+    "Queensland": "Qld",
+    "South Australia": "SA",
+    "Western Australia": "WA",
+    "Tasmania": "Tas",
+    "Northern Territory": "NT",
+    "Australian Capital Territory": "ACT",
+    "Other Territories": "OT"
+}
+STATE_BY_LGA_CODE = {str(i): abbr for i, abbr in enumerate(STATE_ABBREVIATIONS.values(), start=1)}
+
+
+def load_population_years(sheet_name: str) -> pd.DataFrame:
+    """
+    Load a population sheet keeping every year: the two label columns as `code_or_state` and `name`,
+    then one column per year (from the 'ERP at 30 June' header row).
+    """
+    raw = pd.read_excel(os.path.join(DATA_DIR, "Population_estimates.xlsx"), sheet_name=sheet_name, header=None)
+    year_row = raw.iloc[5]
+    year_cols = [i for i in range(2, raw.shape[1]) if pd.notna(pd.to_numeric(year_row.iloc[i], errors="coerce"))]
+
+    df = raw.iloc[7:, [0, 1] + year_cols].copy()
+    df.columns = ["code_or_state", "name"] + [int(year_row.iloc[i]) for i in year_cols]
+    # Drop the blank separator and copyright rows
+    return df[df["name"].notna()].reset_index(drop=True)
+
+
+def load_lga_population() -> pd.DataFrame:
+    """
+    LGA populations by year (Table 1) with the state taken from the LGA code.
+    """
+    df = load_population_years("Table 1")
+    codes = pd.to_numeric(df["code_or_state"], errors="coerce")
+    df = df[codes.notna()].copy()
+    df["state"] = codes[codes.notna()].astype(int).astype(str).str[0].map(STATE_BY_LGA_CODE)
+    df = df.rename(columns={"name": "geo_name"}).drop(columns="code_or_state")
+    return df.melt(id_vars=["state", "geo_name"], var_name="year", value_name="population")
+
+
+def load_state_remoteness_population() -> pd.DataFrame:
+    """
+    State, state × remoteness and national remoteness populations by year (Table 3), with a `geo_level` column.
+    Per-state rows carry a suffix such as "Major Cities of Australia (NSW)"; national rows have none.
+    """
+    df = load_population_years("Table 3")
+    state_names = df["code_or_state"].ffill()
+    name = df["name"].astype(str).str.strip()
+    is_total = name.str.startswith("Total ")
+    has_suffix = name.str.contains(r"\(.+\)$")
+
+    df["geo_level"] = "remoteness"
+    df.loc[has_suffix, "geo_level"] = "state_remoteness"
+    df.loc[is_total, "geo_level"] = "state"
+    df["state"] = state_names.map(STATE_ABBREVIATIONS).where(has_suffix | is_total)
+    df["geo_name"] = name.str.replace(r"\s*\(.+\)$", "", regex=True)
+    df.loc[is_total, "geo_name"] = df.loc[is_total, "state"]
+
+    # "Total Australia" is the national total, not a state
+    df = df[~(is_total & (name == "Total Australia"))].drop(columns=["code_or_state", "name"])
+    return df.melt(id_vars=["geo_level", "state", "geo_name"], var_name="year", value_name="population")
+
+
 # ========== CLEANERS ==========
 
 
@@ -109,8 +179,9 @@ def common_clean_steps(df):
         special_missing_count = (df['road_user'] == 'Other/-9').sum()
         if special_missing_count > 0:
             df['road_user'] = df['road_user'].replace('Other/-9', pd.NA)
-            print(
-                f"[Missing Data Handling] Replaced {special_missing_count} 'Other/-9' values with missing values in column `road_user`.")
+            log(
+                f"[Missing Data Handling] Replaced {special_missing_count} 'Other/-9' values with missing values in column `road_user`.",
+                step="missing", column="road_user", replaced=int(special_missing_count))
 
     # Replace generic invalid values with pd.NA (e.g., 'Unknown', '-9', 'nan')
     for col in df.columns:
@@ -118,8 +189,9 @@ def common_clean_steps(df):
         replace_count = replace_mask.sum()
         if replace_count > 0:
             df[col] = df[col].replace(["Unknown", "nan", "-9", -9], pd.NA)
-            print(
-                f"[Missing Data Handling] Replaced {replace_count} values ('Unknown', 'nan','-9', -9) with missing values in column `{col}`.")
+            log(
+                f"[Missing Data Handling] Replaced {replace_count} values ('Unknown', 'nan','-9', -9) with missing values in column `{col}`.",
+                step="missing", column=col, replaced=int(replace_count))
 
     # Normalize boolean columns to True/False
     bool_columns = [
@@ -135,7 +207,8 @@ def common_clean_steps(df):
         special_case = df['speed_limit'] == '<40'
         if special_case.sum() > 0:
             df.loc[special_case, 'speed_limit'] = 40
-            print(f"[Value Correction] Replaced {special_case.sum()} '<40' entries in `speed_limit` with 40.")
+            log(f"[Value Correction] Replaced {special_case.sum()} '<40' entries in `speed_limit` with 40.",
+                step="correction", column="speed_limit", replaced=int(special_case.sum()))
 
         df['speed_limit'] = pd.to_numeric(df['speed_limit'], errors='coerce')
 
@@ -143,7 +216,8 @@ def common_clean_steps(df):
         df = df[df['speed_limit'].notna()]
         removed = before - len(df)
         if removed > 0:
-            print(f"[Clean Step] Removed {removed} rows with missing `speed_limit`.")
+            log(f"[Clean Step] Removed {removed} rows with missing `speed_limit`.",
+                step="remove", column="speed_limit", removed=removed)
 
     # Drop rows missing critical fields such as age or time_of_day
     for col in ['age', 'time_of_day']:
@@ -152,7 +226,8 @@ def common_clean_steps(df):
             df = df[df[col].notna()]
             removed = before - len(df)
             if removed > 0:
-                print(f"[Clean Step] Removed {removed} rows with missing `{col}`.")
+                log(f"[Clean Step] Removed {removed} rows with missing `{col}`.",
+                    step="remove", column=col, removed=removed)
 
     # Replace missing categorical values in selected location and identity columns with 'Unknown'
     for col in ['national_lga_name_2021', 'sa4_name_2021', 'national_remoteness_areas', 'gender', 'road_user']:
@@ -160,7 +235,8 @@ def common_clean_steps(df):
             missing = df[col].isna().sum()
             df[col] = df[col].fillna("Unknown")
             if missing > 0:
-                print(f"[Location Normalization] Replaced {missing} missing values in `{col}` with 'Unknown'.")
+                log(f"[Location Normalization] Replaced {missing} missing values in `{col}` with 'Unknown'.",
+                    step="normalize", column=col, replaced=int(missing))
 
     # Recalculate day_of_week based on dayweek
     if 'dayweek' in df.columns:
@@ -172,11 +248,12 @@ def common_clean_steps(df):
             lambda x: 'Weekday' if x in weekday_names else ('Weekend' if x in weekend_names else pd.NA)
         )
 
-        print(f"[Reassignment] `day_of_week` reassigned based on `dayweek`.")
+        log(f"[Reassignment] `day_of_week` reassigned based on `dayweek`.")
 
         if before is not None:
             mismatch = (before != df['day_of_week']).sum()
-            print(f"[Validation] {mismatch} records had different `day_of_week` after reassignment.")
+            log(f"[Validation] {mismatch} records had different `day_of_week` after reassignment.",
+                step="validate", column="day_of_week", mismatched=int(mismatch))
 
     return df
 
@@ -395,186 +472,187 @@ def generate_dim_location(fatal_crash_df, lga_pop_df, sua_pop_df, remote_pop_df,
     return dim_location
 
 
-# ========== FACT TABLES ==========
-
-def generate_fact_person_fatality(fatality_df, dim_person, dim_date, dim_holiday, dim_location, dim_road, dim_vehicle,
-                                  dim_crash_type, dim_time):
-    """
-    Generate Fact_Person_Fatality table, linking person-level fatalities
-    with all related dimension tables including date, location, road, vehicle, and holiday.
-    """
-    # Standardize column names for joining
-    df = fatality_df.rename(columns={
-        'national_lga_name_2021': 'lga_name',
-        'sa4_name_2021': 'sa4_name',
-        'national_remoteness_areas': 'remoteness_area',
-        'national_road_type': 'road_type'
-    })
-
-    # Merge: Dim_Location
-    df = df.merge(
-        dim_location[['location_id', 'state', 'lga_name', 'sa4_name', 'remoteness_area']],
-        on=['state', 'lga_name', 'sa4_name', 'remoteness_area'],
-        how='left'
-    )
-
-    # Merge: Dim_Person
-    df = df.merge(dim_person, on=['age', 'gender', 'road_user'], how='left')
-
-    # Merge: Dim_Date
-    df = df.merge(
-        dim_date[['date_id', 'year', 'month', 'day_of_week_name', 'day_type']],
-        left_on=['year', 'month', 'dayweek', 'day_of_week'],
-        right_on=['year', 'month', 'day_of_week_name', 'day_type'],
-        how='left'
-    )
-
-    # Merge: dim_holiday
-    df = df.merge(
-        dim_holiday[['holiday_id', 'christmas_period', 'easter_period']],
-        left_on=['christmas_period', 'easter_period'],
-        right_on=['christmas_period', 'easter_period'],
-        how='left'
-    )
-
-    # Merge: Dim_Road
-    df = df.merge(
-        dim_road[['road_id', 'road_type', 'speed_limit']],
-        on=['road_type', 'speed_limit'],
-        how='left'
-    )
-
-    # Merge: Dim_Vehicle
-    df = df.merge(
-        dim_vehicle[
-            ['vehicle_id', 'bus_involvement', 'heavy_rigid_truck_involvement', 'articulated_truck_involvement']],
-        on=['bus_involvement', 'heavy_rigid_truck_involvement', 'articulated_truck_involvement'],
-        how='left'
-    )
-
-    # Merge: Dim_CrashType
-    df = df.merge(
-        dim_crash_type[['crash_type_id', 'crash_type']],
-        on='crash_type',
-        how='left'
-    )
-
-    # Merge: Dim_TimeOfDay
-    df = df.merge(
-        dim_time[['time_of_day_id', 'time_of_day']],
-        on='time_of_day',
-        how='left'
-    )
-
-    # Add fatality_count as a measure (each record represents one death)
-    df['fatality_count'] = 1
-
-    # primary key
-    df['fact_person_fatality_id'] = range(1, len(df) + 1)
-
-    # Construct the final fact table
-    fact_person_fatality = df[[
-        'fact_person_fatality_id',
-        'crash_id',
-        'date_id',
-        'holiday_id',
-        'person_id',
-        'location_id',
-        'road_id',
-        'vehicle_id',
-        'crash_type_id',
-        'time_of_day_id',
-        'fatality_count'  # 👈 added measure
-    ]].copy()
-
-    return fact_person_fatality
-
-
-def generate_fact_fatal_crash(fatal_crash_df, dim_road, dim_vehicle, dim_crash_type, dim_location, dim_date,
-                              dim_holiday):
-    """
-    Generate Fact_Fatal_Crash table linking crash-level records
-    with date, location, road, vehicle, and crash type dimensions.
-    """
-    # Rename columns for consistent joining
-    df = fatal_crash_df.rename(columns={
-        'national_lga_name_2021': 'lga_name',
-        'sa4_name_2021': 'sa4_name',
-        'national_remoteness_areas': 'remoteness_area',
-        'national_road_type': 'road_type'
-    })
-
-    # Merge: Dim_Location
-    df = df.merge(
-        dim_location[['location_id', 'state', 'lga_name', 'sa4_name', 'remoteness_area']],
-        on=['state', 'lga_name', 'sa4_name', 'remoteness_area'],
-        how='left'
-    )
-
-    # Merge: Dim_Road
-    df = df.merge(
-        dim_road[['road_id', 'road_type', 'speed_limit']],
-        on=['road_type', 'speed_limit'],
-        how='left'
-    )
-
-    # Merge: Dim_Vehicle
-    df = df.merge(
-        dim_vehicle[
-            ['vehicle_id', 'bus_involvement', 'heavy_rigid_truck_involvement', 'articulated_truck_involvement']],
-        on=['bus_involvement', 'heavy_rigid_truck_involvement', 'articulated_truck_involvement'],
-        how='left'
-    )
-
-    # Merge: Dim_CrashType
-    df = df.merge(
-        dim_crash_type[['crash_type_id', 'crash_type']],
-        on='crash_type',
-        how='left'
-    )
-
-    # Merge: Dim_Date
-    df = df.merge(
-        dim_date[['date_id', 'year', 'month', 'day_of_week_name', 'day_type']],
-        left_on=['year', 'month', 'dayweek', 'day_of_week'],
-        right_on=['year', 'month', 'day_of_week_name', 'day_type'],
-        how='left'
-    )
-
-    # Merge: dim_holiday
-    df = df.merge(
-        dim_holiday[['holiday_id', 'christmas_period', 'easter_period']],
-        left_on=['christmas_period', 'easter_period'],
-        right_on=['christmas_period', 'easter_period'],
-        how='left'
-    )
-
-    # Primary key (directly using crash_id)
-    df['fact_crash_id'] = df['crash_id']
-
-    # Add crash_count = 1 as a measure
-    df['crash_count'] = 1
+# geo_name of the per-state SA4 row holding the LGAs that have no crash record, hence no known SA4
+UNALLOCATED_SA4 = "LGAs without crash records"
+
+
+def generate_geo_denominator(fatal_crash_df, lga_pop_df, state_remote_pop_df, dwelling_df):
+    """
+    Generate the geography denominator table: population by year and 2021 dwelling count for every
+    state, remoteness area (national and per state), SA4 and LGA, named as in dim_location.
+
+    Denominator source of each level:
+      - state, remoteness, state_remoteness: ABS Table 3 totals. A state is the whole state, so it
+        includes LGAs without any crash and is larger than the sum over dim_location's LGAs that
+        sql/1.5 uses (whose state rates are usually higher).
+      - lga: ABS Table 1, one row per LGA.
+      - sa4: an approximation, since there is no SA4 population source. Each LGA is split across
+        the SA4s of its crash records in proportion to its number of records in each, and the LGAs
+        without any crash record are kept per state as an UNALLOCATED_SA4 row, so that a state's
+        SA4 rows add up to its LGAs.
+    State dwellings are the sum over the state's LGAs; remoteness areas have none.
+    """
+    dwelling_df = dwelling_df.rename(columns={'LGA_EN': 'geo_name'})
+
+    # 1. LGAs, with their dwelling counts
+    lga = lga_pop_df.merge(dwelling_df, on='geo_name', how='left')
+    lga['geo_level'] = 'lga'
+
+    # 2. States and remoteness areas from Table 3; state dwellings are the sum over their LGAs
+    state_dwellings = (lga.drop_duplicates(['state', 'geo_name'])
+                       .groupby('state')['dwelling_records'].sum(min_count=1)
+                       .rename('state_dwellings').reset_index())
+    state_remote = state_remote_pop_df.merge(state_dwellings, on='state', how='left')
+    state_remote['dwelling_records'] = state_remote['state_dwellings'].where(state_remote['geo_level'] == 'state')
+    state_remote = state_remote.drop(columns='state_dwellings')
+
+    # 3. SA4s: each LGA's share in an SA4 is the share of its crash records located there
+    pairs = fatal_crash_df[['state', 'national_lga_name_2021', 'sa4_name_2021']].dropna()
+    pairs.columns = ['state', 'geo_name', 'sa4_name']
+    lga_sa4 = pairs.groupby(['state', 'geo_name', 'sa4_name']).size().rename('share').reset_index()
+    lga_sa4['share'] /= lga_sa4.groupby(['state', 'geo_name'])['share'].transform('sum')
+    sa4 = lga.merge(lga_sa4, on=['state', 'geo_name'], how='left')
+    sa4['sa4_name'] = sa4['sa4_name'].fillna(UNALLOCATED_SA4)
+    sa4['share'] = sa4['share'].fillna(1.0)
+    for col in ['population', 'dwelling_records']:
+        sa4[col] = pd.to_numeric(sa4[col], errors='coerce') * sa4['share']
+    sa4 = (sa4.groupby(['state', 'sa4_name', 'year'])[['population', 'dwelling_records']].sum(min_count=1)
+           .round().reset_index().rename(columns={'sa4_name': 'geo_name'}))
+    sa4['geo_level'] = 'sa4'
+
+    # 4. Stack the levels and add the surrogate key
+    geo_denominator = pd.concat([state_remote, sa4, lga], ignore_index=True)
+    geo_denominator['population'] = pd.to_numeric(geo_denominator['population'], errors='coerce').astype('Int64')
+    geo_denominator['dwelling_records'] = geo_denominator['dwelling_records'].astype('Int64')
+    geo_denominator['year'] = geo_denominator['year'].astype(int)
+    geo_denominator['geography_id'] = range(1, len(geo_denominator) + 1)
+
+    return geo_denominator[[
+        'geography_id', 'geo_level', 'state', 'geo_name', 'year', 'population', 'dwelling_records'
+    ]]
 
-    # Construct the final fact table
-    fact_fatal_crash = df[[
-        'fact_crash_id',
-        'crash_id',
-        'date_id',
-        'holiday_id',
-        'location_id',
-        'road_id',
-        'vehicle_id',
-        'crash_type_id',
-        'number_fatalities',
-        'crash_count'  # 👈 added measure
-    ]].copy()
 
-    return fact_fatal_crash
+# ========== FACT TABLES ==========
+# Facts are built in row blocks: each block keeps only its key columns and resolves the
+# dimension ids against small lookups (id + natural key), so peak memory follows the block size.
+
+# Source column names → dimension column names
+FACT_KEY_RENAMES = {
+    'national_lga_name_2021': 'lga_name',
+    'sa4_name_2021': 'sa4_name',
+    'national_remoteness_areas': 'remoteness_area',
+    'national_road_type': 'road_type'
+}
+
+# (dimension, id column, fact key columns, dimension key columns if named differently), in merge order
+LOCATION_LOOKUP = ("dim_location", "location_id", ['state', 'lga_name', 'sa4_name', 'remoteness_area'], None)
+DATE_LOOKUP = ("dim_date", "date_id", ['year', 'month', 'dayweek', 'day_of_week'],
+               ['year', 'month', 'day_of_week_name', 'day_type'])
+HOLIDAY_LOOKUP = ("dim_holiday", "holiday_id", ['christmas_period', 'easter_period'], None)
+ROAD_LOOKUP = ("dim_road", "road_id", ['road_type', 'speed_limit'], None)
+VEHICLE_LOOKUP = ("dim_vehicle", "vehicle_id",
+                  ['bus_involvement', 'heavy_rigid_truck_involvement', 'articulated_truck_involvement'], None)
+CRASH_TYPE_LOOKUP = ("dim_crash_type", "crash_type_id", ['crash_type'], None)
+
+PERSON_FATALITY_LOOKUPS = [
+    LOCATION_LOOKUP,
+    ("dim_person", "person_id", ['age', 'gender', 'road_user'], None),
+    DATE_LOOKUP,
+    HOLIDAY_LOOKUP,
+    ROAD_LOOKUP,
+    VEHICLE_LOOKUP,
+    CRASH_TYPE_LOOKUP,
+    ("dim_time", "time_of_day_id", ['time_of_day'], None),
+]
+FATAL_CRASH_LOOKUPS = [LOCATION_LOOKUP, ROAD_LOOKUP, VEHICLE_LOOKUP, CRASH_TYPE_LOOKUP, DATE_LOOKUP, HOLIDAY_LOOKUP]
+
+# Source rows per block
+FACT_BLOCK_ROWS = int(os.environ.get("DW_FACT_BLOCK_ROWS", "50000"))
+
+
+def iter_fact_blocks(source_df, dimensions, lookups, measures, block_rows=FACT_BLOCK_ROWS):
+    """
+    Yield the source rows in blocks of `block_rows`, each with its dimension ids resolved
+    (left joins, in the order of `lookups`) next to the `measures` columns kept from the source.
+    Ids that do not resolve are missing (nullable Int64).
+    """
+    tables = []
+    key_columns = list(measures)
+    for dim_name, id_col, fact_keys, dim_keys in lookups:
+        lookup = dimensions[dim_name][[id_col] + (dim_keys or fact_keys)]
+        tables.append((lookup.set_axis([id_col] + fact_keys, axis=1), fact_keys))
+        key_columns += [col for col in fact_keys if col not in key_columns]
+
+    source_columns = {FACT_KEY_RENAMES.get(col, col): col for col in source_df.columns}
+    # An empty source still yields one (empty) block, so the table gets its header
+    for start in range(0, max(len(source_df), 1), block_rows):
+        block = source_df.iloc[start:start + block_rows][[source_columns[col] for col in key_columns]]
+        block = block.set_axis(key_columns, axis=1)
+        for lookup, fact_keys in tables:
+            block = block.merge(lookup, on=fact_keys, how='left')
+        ids = [id_col for _, id_col, _, _ in lookups]
+        yield block[list(measures) + ids].astype({id_col: 'Int64' for id_col in ids})
+
+
+def iter_fact_person_fatality(fatality_df, dimensions, block_rows=FACT_BLOCK_ROWS):
+    """
+    Blocks of Fact_Person_Fatality, linking person-level fatalities with all related
+    dimension tables including date, location, road, vehicle, and holiday.
+    """
+    next_id = 1
+    for block in iter_fact_blocks(fatality_df, dimensions, PERSON_FATALITY_LOOKUPS, ['crash_id'], block_rows):
+        # primary key, continuing across blocks
+        block['fact_person_fatality_id'] = range(next_id, next_id + len(block))
+        next_id += len(block)
+
+        # Add fatality_count as a measure (each record represents one death)
+        block['fatality_count'] = 1
+
+        yield block[[
+            'fact_person_fatality_id',
+            'crash_id',
+            'date_id',
+            'holiday_id',
+            'person_id',
+            'location_id',
+            'road_id',
+            'vehicle_id',
+            'crash_type_id',
+            'time_of_day_id',
+            'fatality_count'  # 👈 added measure
+        ]]
+
+
+def iter_fact_fatal_crash(fatal_crash_df, dimensions, block_rows=FACT_BLOCK_ROWS):
+    """
+    Blocks of Fact_Fatal_Crash, linking crash-level records with date, location,
+    road, vehicle, and crash type dimensions.
+    """
+    for block in iter_fact_blocks(fatal_crash_df, dimensions, FATAL_CRASH_LOOKUPS,
+                                  ['crash_id', 'number_fatalities'], block_rows):
+        # Primary key (directly using crash_id)
+        block['fact_crash_id'] = block['crash_id']
+
+        # Add crash_count = 1 as a measure
+        block['crash_count'] = 1
+
+        yield block[[
+            'fact_crash_id',
+            'crash_id',
+            'date_id',
+            'holiday_id',
+            'location_id',
+            'road_id',
+            'vehicle_id',
+            'crash_type_id',
+            'number_fatalities',
+            'crash_count'  # 👈 added measure
+        ]]
 
 
 # ========== SAVE FUNCTION ==========
 
-def save_table(df, name):
+def save_table(df, name, append=False):
     # Handle pd.NA in boolean columns by converting to object and replacing missing values with None
     bool_cols = df.select_dtypes(include="boolean").columns.tolist()
     for col in bool_cols:
@@ -584,8 +662,25 @@ def save_table(df, name):
     df = df.astype(object)
     df = df.where(pd.notnull(df), None)
 
-    # Save the DataFrame to CSV
-    df.to_csv(os.path.join(OUTPUT_DIR, f"{name}.csv"), index=False)
+    # Save the DataFrame to CSV (or append it, without header, to an existing one)
+    df.to_csv(os.path.join(OUTPUT_DIR, f"{name}.csv"), index=False, mode="a" if append else "w", header=not append)
+
+
+def save_table_blocks(blocks, name, derived=None):
+    """
+    Write a table block by block, together with the tables derived from each block
+    (`derived`: table name → function of the block). No block is kept; returns the rows written per table.
+    """
+    derived = derived or {}
+    rows = dict.fromkeys([name] + list(derived), 0)
+    for i, block in enumerate(blocks):
+        for derived_name, build in derived.items():
+            part = build(block)
+            save_table(part, derived_name, append=i > 0)
+            rows[derived_name] += len(part)
+        save_table(block, name, append=i > 0)
+        rows[name] += len(block)
+    return rows
 
 
 
@@ -593,18 +688,26 @@ def save_table(df, name):
 # ========== MAIN FUNCTION ==========
 def main():
     # ========== Step 1: Load Raw Data ==========
-    raw_fatal_crash_df = load_fatal_crash_data()
-    raw_fatality_df = load_fatality_data()
-    dwelling_df = load_dwelling_data()
-
-    lga_pop_df = load_population_table("Table 1")
-    sua_pop_df = load_population_table("Table 2")
-    remote_pop_df = load_population_table("Table 3")
-    ced_pop_df = load_population_table("Table 4")
+    with stage("load") as current:
+        raw_fatal_crash_df = load_fatal_crash_data()
+        raw_fatality_df = load_fatality_data()
+        dwelling_df = load_dwelling_data()
+
+        lga_pop_df = load_population_table("Table 1")
+        sua_pop_df = load_population_table("Table 2")
+        remote_pop_df = load_population_table("Table 3")
+        ced_pop_df = load_population_table("Table 4")
+        lga_years_df = load_lga_population()
+        state_remote_years_df = load_state_remoteness_population()
+        current.rows_out = len(raw_fatal_crash_df) + len(raw_fatality_df)
 
     # ========== Step 2: Clean Data ==========
-    fatal_crash_df = common_clean_steps(raw_fatal_crash_df)
-    fatality_df = common_clean_steps(raw_fatality_df)
+    with stage("clean[fatal_crash]", rows_in=len(raw_fatal_crash_df)) as current:
+        fatal_crash_df = common_clean_steps(raw_fatal_crash_df)
+        current.rows_out = len(fatal_crash_df)
+    with stage("clean[fatality]", rows_in=len(raw_fatality_df)) as current:
+        fatality_df = common_clean_steps(raw_fatality_df)
+        current.rows_out = len(fatality_df)
 
     # ========== Step 3: Generate Dimension Tables ==========
 
@@ -622,34 +725,33 @@ def main():
 
     dimensions = {}
     for name, func in dim_generators.items():
-        dim = func()
-        save_table(dim, name)
+        with stage(name) as current:
+            dim = func()
+            save_table(dim, name)
+            current.rows_out = len(dim)
         dimensions[name] = dim
 
+    # Population / dwelling denominators for death rates by geography
+    with stage("geo_denominator") as current:
+        geo_denominator = generate_geo_denominator(fatal_crash_df, lga_years_df, state_remote_years_df, dwelling_df)
+        save_table(geo_denominator, "geo_denominator")
+        current.rows_out = len(geo_denominator)
+
     # ========== Step 4: Generate Fact Tables ==========
-    fact_fatal_crash = generate_fact_fatal_crash(
-        fatal_crash_df,
-        dimensions["dim_road"],
-        dimensions["dim_vehicle"],
-        dimensions["dim_crash_type"],
-        dimensions["dim_location"],
-        dimensions["dim_date"],
-        dimensions["dim_holiday"]
-    )
-    save_table(fact_fatal_crash, "fact_fatal_crash")
-
-    fact_person_fatality = generate_fact_person_fatality(
-        fatality_df,
-        dimensions["dim_person"],
-        dimensions["dim_date"],
-        dimensions["dim_holiday"],
-        dimensions["dim_location"],
-        dimensions["dim_road"],
-        dimensions["dim_vehicle"],
-        dimensions["dim_crash_type"],
-        dimensions["dim_time"]
-    )
-    save_table(fact_person_fatality, "fact_person_fatality")
+    with stage("fact_fatal_crash", rows_in=len(fatal_crash_df)) as current:
+        rows = save_table_blocks(iter_fact_fatal_crash(fatal_crash_df, dimensions), "fact_fatal_crash")
+        current.rows_out = rows["fact_fatal_crash"]
+
+    # ========== Step 5: Denormalized Wide Table ==========
+    # Built from each fact_person_fatality block as it is written, so neither table is ever held whole
+    with stage("fact_person_fatality", rows_in=len(fatality_df)) as current:
+        rows = save_table_blocks(iter_fact_person_fatality(fatality_df, dimensions), "fact_person_fatality",
+                                 {WIDE_TABLE_NAME: lambda block: build_fatality_wide(block, dimensions)})
+        current.rows_out = rows["fact_person_fatality"]
+        log(f"✅ Wrote {rows[WIDE_TABLE_NAME]} rows to `{WIDE_TABLE_NAME}`", table=WIDE_TABLE_NAME,
+            rows=rows[WIDE_TABLE_NAME])
+
+    print_summary()
 
 
 if __name__ == "__main__":
@@ -1,29 +1,58 @@
 # PostgreSQL.py
-from utility.pg_utils import create_table, insert_data, insert_many, query_data, drop_table
-from utility.schemas import TABLE_SCHEMAS, TABLE_IMPORT_ORDER
+#   python 02_PostgreSQL.py                      # drop, create, import output/*.csv, export, run sql/1.x
+#   DW_RESUME_IMPORT=1 python 02_PostgreSQL.py   # keep the tables and resume an interrupted import
+#                                                # (same as: python dw.py load --keep)
+from utility.pg_utils import create_table, insert_data, insert_many, query_data, drop_table, table_checksum
+from utility.schemas import (TABLE_SCHEMAS, TABLE_IMPORT_ORDER, CONTROL_TABLE_SCHEMAS, IMPORT_CHECKPOINT_TABLE,
+                             table_columns)
+from utility.metrics import log, print_summary, stage
+from utility.validation import errors as validation_errors, format_problems, validate_csv_files
+from utility.csv_chunks import iter_csv_chunks
+from utility.olap import cube, order_by, rollup
 import pandas as pd
 from typing import List, Optional
+from datetime import datetime, timezone
+import hashlib
+import json
 import os
+import time
 
 
 # Directory paths for input/output
 OUTPUT_DIR = "output"
 DB_files_export = "DB_files_export"
 
+# Rows per committed chunk of the CSV import (each commit also records a checkpoint)
+IMPORT_CHUNK_ROWS = int(os.environ.get("DW_IMPORT_CHUNK_ROWS", "50000"))
+# DW_ALLOW_NULL_FKS=1: NULL foreign keys in the fact tables are validation warnings instead of errors
+ALLOW_NULL_FOREIGN_KEYS = os.environ.get("DW_ALLOW_NULL_FKS", "") == "1"
+# DW_RESUME_IMPORT=1: main() keeps the tables and checkpoints and resumes an interrupted import
+RESUME_IMPORT = os.environ.get("DW_RESUME_IMPORT", "") == "1"
+
+# Client-side dimension cache: one pickle per data version, and how often the version is re-checked
+DIMENSION_CACHE_DIR = os.environ.get("DW_DIM_CACHE_DIR", ".dim_cache")
+DIMENSION_CACHE_TTL = float(os.environ.get("DW_DIM_CACHE_TTL", "60"))
+
 
 # ==========================
 # Table Creation & Deletion
 # ==========================
 
-# Create all tables based on TABLE_IMPORT_ORDER and predefined schemas
+# Create all tables based on TABLE_IMPORT_ORDER and predefined schemas (plus the control tables)
 def create_all_tables():
-    for table in TABLE_IMPORT_ORDER:
-        create_table(table, TABLE_SCHEMAS[table])
+    with stage("create_all_tables"):
+        for table in TABLE_IMPORT_ORDER:
+            create_table(table, TABLE_SCHEMAS[table])
+        for table, schema in CONTROL_TABLE_SCHEMAS.items():
+            create_table(table, schema)
 
-# Drop all tables in reverse order (to avoid foreign key constraint errors)
+# Drop all tables in reverse order (to avoid foreign key constraint errors), then the control tables
 def drop_all_tables():
-    for table in reversed(TABLE_IMPORT_ORDER):
-        drop_table(table)
+    with stage("drop_all_tables"):
+        for table in reversed(TABLE_IMPORT_ORDER):
+            drop_table(table)
+        for table in CONTROL_TABLE_SCHEMAS:
+            drop_table(table)
 
 
 # ==========================
@@ -36,80 +65,396 @@ def prepare_df_for_postgres(df: pd.DataFrame) -> pd.DataFrame:
     df = df.astype(object).where(pd.notnull(df), None)
     return df
 
-# Insert a full DataFrame into a table
-def insert_dataframe(table_name: str, df: pd.DataFrame):
+# Insert a full DataFrame into a table (`checkpoint` is committed in the same transaction)
+def insert_dataframe(table_name: str, df: pd.DataFrame, checkpoint: Optional[tuple] = None):
     df = prepare_df_for_postgres(df)
     cols = ','.join(df.columns)
     placeholders = ','.join(['%s'] * len(df.columns))
     insert_sql = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
     data = [tuple(row) for row in df.to_numpy()]
-    insert_many(insert_sql, data)
+    insert_many(insert_sql, data, checkpoint)
 
 
 # ==========================
 # Querying & Previewing
 # ==========================
 
-# Execute SELECT statement and convert results to DataFrame
-def query_to_dataframe(select_sql: str, params: Optional[tuple] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+# Execute SELECT statement and convert results to DataFrame.
+# With `decode=True`, dimension key columns in the result (e.g. road_id) are replaced by their labels
+# from the client-side dimension cache, so the query itself can stay on fact ids.
+def query_to_dataframe(select_sql: str, params: Optional[tuple] = None, columns: Optional[List[str]] = None,
+                       decode: bool = False) -> pd.DataFrame:
     results, inferred_columns = query_data(select_sql, params)
 
     if columns:
         df = pd.DataFrame(results, columns=columns)
     else:
         df = pd.DataFrame(results, columns=inferred_columns)
+    if decode:
+        df = decode_labels(df)
 
     
-    print(df)
-    print(f"📋 Converted query results to DataFrame with {len(df)} rows and columns: {df.columns.tolist()}")
+    log(df)
+    log(f"📋 Converted query results to DataFrame with {len(df)} rows and columns: {df.columns.tolist()}")
     return df
 
-# Preview contents of all tables and optionally export them to CSV
-def preview_all_tables(limit: int = None):
-    for table_name in TABLE_SCHEMAS:
-        print(f"\n📄 Previewing first {limit} rows of `{table_name}`:")
-        try:
-            select_sql = f"SELECT * FROM {table_name}"
-            if limit:
-                select_sql += f" LIMIT {limit}"
-            results, columns = query_data(select_sql)
+# Manifest of the exported tables (row count and server-side checksum per table)
+EXPORT_MANIFEST = "_manifest.json"
+
+
+def load_export_manifest(folder: str = DB_files_export) -> dict:
+    path = os.path.join(folder, EXPORT_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_export_manifest(manifest: dict, folder: str = DB_files_export):
+    def write(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    write_atomic(os.path.join(folder, EXPORT_MANIFEST), write)
 
-            if results:
-                df = pd.DataFrame(results, columns=columns)
 
-                os.makedirs(DB_files_export, exist_ok=True)
-                df.to_csv(os.path.join(DB_files_export, f"{table_name}.csv"), index=False)
-                print(df.head(15))
-            else:
-                print("⚠️ No data found in this table")
-        except Exception as e:
-            print(f"❌ Error while querying `{table_name}`: {e}")
+# Write a file through a temporary file in the same folder, so readers never see a partial file
+def write_atomic(path: str, write):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Preview contents of all tables and export them to CSV.
+# Only tables whose row count / checksum changed since the last export are rewritten (unless `force`).
+def preview_all_tables(limit: int = None, folder: str = DB_files_export, force: bool = False):
+    os.makedirs(folder, exist_ok=True)
+    manifest = load_export_manifest(folder)
+    for table_name in TABLE_SCHEMAS:
+        log(f"\n📄 Previewing first {limit} rows of `{table_name}`:")
+        with stage(f"export[{table_name}]") as current:
+            try:
+                file_path = os.path.join(folder, f"{table_name}.csv")
+                rows, checksum = table_checksum(table_name)
+                entry = {"rows": rows, "checksum": checksum, "limit": limit}
+                previous = manifest.get(table_name, {})
+                if not force and os.path.exists(file_path) and all(previous.get(k) == v for k, v in entry.items()):
+                    log(f"♻️ `{table_name}` unchanged ({rows} rows), keeping `{file_path}`",
+                        table=table_name, exported=False)
+                    log(pd.read_csv(file_path, nrows=15))
+                    continue
+
+                select_sql = f"SELECT * FROM {table_name}"
+                if limit:
+                    select_sql += f" LIMIT {limit}"
+                results, columns = query_data(select_sql)
+                current.rows_out = len(results)
+
+                if results:
+                    df = pd.DataFrame(results, columns=columns)
+                    write_atomic(file_path, lambda path: df.to_csv(path, index=False))
+                    manifest[table_name] = dict(entry, exported_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+                    save_export_manifest(manifest, folder)
+                    log(f"📦 Exported `{table_name}` ({len(df)} rows)", table=table_name, exported=True, rows=len(df))
+                    log(df.head(15))
+                else:
+                    log("⚠️ No data found in this table", table=table_name)
+            except Exception as e:
+                log(f"❌ Error while querying `{table_name}`: {e}", table=table_name, error=str(e))
 
 
 # ==========================
-# CSV Import
+# Dimension Cache & Label Decoding
 # ==========================
 
+DIMENSION_TABLES = [table for table in TABLE_IMPORT_ORDER if table.startswith("dim_")]
+# Dimension key column → dimension table, e.g. "road_id" → "dim_road"
+DIMENSION_KEYS = {table_columns(table)[0][0]: table for table in DIMENSION_TABLES}
+
+dimension_cache = {"version": None, "checked_at": 0.0, "tables": {}}
+
+
+# Data version of the dimensions: hash of their server-side (row count, checksum), as in the export manifest.
+# `checksum` computes one table's (row count, checksum), e.g. on a connection of the read API's pool
+def dimension_version(checksum=table_checksum) -> str:
+    checksums = {table: list(checksum(table)) for table in DIMENSION_TABLES}
+    return hashlib.md5(json.dumps(checksums, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# The dimension tables of data version `version`, indexed by their key: read back from DIMENSION_CACHE_DIR,
+# or fetched with `run` (a query_data-like callable returning (rows, columns)) and written there
+def read_dimension_tables(version: str, run=query_data) -> dict:
+    path = os.path.join(DIMENSION_CACHE_DIR, f"dimensions_{version}.pkl")
+    if os.path.exists(path):
+        tables = pd.read_pickle(path)
+        log(f"♻️ Dimension cache `{version}` read from `{path}`", version=version, fetched=False)
+        return tables
+    tables = {}
+    for table in DIMENSION_TABLES:
+        results, columns = run(f"SELECT * FROM {table}")
+        tables[table] = pd.DataFrame(results, columns=columns).set_index(columns[0])
+    os.makedirs(DIMENSION_CACHE_DIR, exist_ok=True)
+    write_atomic(path, lambda tmp_path: pd.to_pickle(tables, tmp_path))
+    log(f"📦 Dimension cache `{version}` fetched ({sum(len(t) for t in tables.values())} rows)",
+        version=version, fetched=True)
+    return tables
+
+
+# All dimension tables indexed by their key, fetched once per data version.
+# The version is re-checked at most every DIMENSION_CACHE_TTL seconds (or now, with `refresh`);
+# a version seen before is read back from DIMENSION_CACHE_DIR instead of the database.
+def load_dimension_cache(refresh: bool = False) -> dict:
+    if not refresh and dimension_cache["tables"] and time.time() - dimension_cache["checked_at"] < DIMENSION_CACHE_TTL:
+        return dimension_cache["tables"]
+
+    with stage("dimension_cache") as current:
+        version = dimension_version()
+        if version != dimension_cache["version"]:
+            dimension_cache.update(version=version, tables=read_dimension_tables(version))
+        dimension_cache["checked_at"] = time.time()
+        current.rows_out = sum(len(t) for t in dimension_cache["tables"].values())
+    return dimension_cache["tables"]
+
+
+# Replace each dimension key column of `df` with that dimension's label columns (all of them, or
+# `labels[key]`, which may name the key itself to keep it), by a vectorized index lookup;
+# keys without a dimension row decode to NULL. `tables` replaces the module's dimension cache.
+def decode_labels(df: pd.DataFrame, labels: Optional[dict] = None, tables: Optional[dict] = None) -> pd.DataFrame:
+    tables = tables if tables is not None else load_dimension_cache()
+    for key in [col for col in df.columns if col in DIMENSION_KEYS]:
+        dim = tables[DIMENSION_KEYS[key]]
+        wanted = (labels or {}).get(key, list(dim.columns))
+        rows = dim[[col for col in wanted if col != key]].reindex(df[key].to_numpy())
+        decoded = pd.DataFrame({col: df[key].to_numpy() if col == key else rows[col].to_numpy() for col in wanted})
+        # Label names already in the result are prefixed with the dimension, e.g. date_year
+        decoded.columns = [f"{DIMENSION_KEYS[key][len('dim_'):]}_{col}" if col in df.columns and col != key else col
+                           for col in decoded.columns]
+        at = df.columns.get_loc(key)
+        df = pd.concat([df.iloc[:, :at].reset_index(drop=True), decoded,
+                        df.iloc[:, at + 1:].reset_index(drop=True)], axis=1)
+    return df
 
-csv_headers = {}
 
-# Import all CSVs in OUTPUT_DIR into corresponding database tables
-def import_all_csv_to_db():
-    for table_name in TABLE_IMPORT_ORDER:
-        filename = f"{table_name}.csv"
-        file_path = os.path.join(OUTPUT_DIR, filename)
+# Keys of the cached dimension rows matching all `equals` filters, e.g. dimension_ids("dim_date", year=2024);
+# a list value matches any of its items, and the key column itself can be filtered too
+def dimension_ids(dim_table: str, tables: Optional[dict] = None, **equals) -> list:
+    dim = (tables if tables is not None else load_dimension_cache())[dim_table]
+    mask = pd.Series(True, index=dim.index)
+    for col, value in equals.items():
+        values = dim.index.to_series() if col == dim.index.name else dim[col]
+        mask &= values.isin(value) if isinstance(value, (list, tuple, set)) else values == value
+    return dim.index[mask.to_numpy()].tolist()
+
+
+# Aggregate a fact table on its dimension ids on the server, then decode the labels locally and
+# re-aggregate by label. Fact rows with a NULL group key are left out, as the inner joins would.
+# `filters` = {(dim_table, column): value} become id lists from the cache, e.g.
+#   query_fact_aggregate("fact_person_fatality", {"time_of_day_id": ["time_of_day"], "road_id": ["road_type"]},
+#                        "fatality_count", {("dim_date", "year"): 2024})
+# `run` executes the SELECT (query_data, or a pooled connection's equivalent) and `tables` replaces the
+# module's dimension cache, so a server can bring its own connections and cache.
+def query_fact_aggregate(fact_table: str, group_labels: dict, measure: str, filters: Optional[dict] = None,
+                         measure_name: str = "total", run=query_data, tables: Optional[dict] = None) -> pd.DataFrame:
+    where, params = [], []
+    for (dim_table, column), value in (filters or {}).items():
+        key = table_columns(dim_table)[0][0]
+        ids = dimension_ids(dim_table, tables, **{column: value})
+        where.append(f"{key} IN ({','.join(['%s'] * len(ids))})" if ids else "1 = 0")
+        params += ids
+
+    keys = list(group_labels)
+    where += [f"{key} IS NOT NULL" for key in keys]
+    select_sql = f"SELECT {', '.join(keys)}, SUM({measure}) AS {measure_name} FROM {fact_table}"
+    if where:
+        select_sql += " WHERE " + " AND ".join(where)
+    select_sql += f" GROUP BY {', '.join(keys)}"
+    with stage(f"fact_aggregate[{fact_table}]") as current:
+        results, columns = run(select_sql, tuple(params))
+        df = decode_labels(pd.DataFrame(results, columns=columns), group_labels, tables)
+        label_columns = [col for col in df.columns if col != measure_name]
+        df = (df.groupby(label_columns, dropna=False, sort=False)[measure_name].sum().reset_index()
+              .sort_values(measure_name, ascending=False, kind="stable").reset_index(drop=True))
+        current.rows_out = len(df)
+    return df
+
 
-        if not os.path.exists(file_path):
-            print(f"⚠️ File `{filename}` not found, skipping.")
+# Business queries sql/1.x that are fact aggregates, answered with query_fact_aggregate: the fact table is
+# aggregated on ids at the finest grain and the CUBE / ROLLUP subtotals are summed up from the decoded labels.
+# "having" = (columns, n) keeps the rows where fewer than n of those columns are subtotals;
+# "totals" are the COALESCE labels of the subtotal rows.
+BUSINESS_AGGREGATES = {
+    "1.1": {"fact": "fact_person_fatality", "labels": {"time_of_day_id": ["time_of_day"], "road_id": ["road_type"]},
+            "measure": "fatality_count", "filters": {("dim_date", "year"): 2024}, "grouping": "cube",
+            "having": (["time_of_day", "road_type"], 2),
+            "totals": {"time_of_day": "All Times", "road_type": "All Road Types"},
+            "order": [("total_fatalities", False)]},
+    "1.2": {"fact": "fact_person_fatality", "labels": {"person_id": ["age_group", "road_user"]},
+            "measure": "fatality_count", "filters": {("dim_date", "year"): 2024}, "grouping": "cube",
+            "having": (["age_group", "road_user"], 2),
+            "totals": {"age_group": "All Age Groups", "road_user": "All Road Users"},
+            "order": [("total_fatalities", False)]},
+    "1.3": {"fact": "fact_person_fatality", "labels": {"date_id": ["month"], "time_of_day_id": ["time_of_day"]},
+            "measure": "fatality_count", "filters": {("dim_date", "year"): 2024}, "grouping": "rollup",
+            "having": (["month", "time_of_day"], 2), "totals": {"time_of_day": "All Times"},
+            "order": [("total_fatalities", False)]},
+    "1.4": {"fact": "fact_person_fatality",
+            "labels": {"holiday_id": ["holiday_id"], "road_id": ["road_type"], "time_of_day_id": ["time_of_day"]},
+            "measure": "fatality_count",
+            "filters": {("dim_date", "year"): 2024, ("dim_holiday", "holiday_id"): [1, 3]}, "grouping": "cube",
+            "having": (["holiday_id", "road_type", "time_of_day"], 3),
+            "totals": {"road_type": "All Road Types", "time_of_day": "All Times"},
+            "order": [("total_fatalities", False)]},
+    "1.6": {"fact": "fact_person_fatality",
+            "labels": {"date_id": ["year"], "crash_type_id": ["crash_type"], "road_id": ["speed_category"]},
+            "measure": "fatality_count", "filters": {}, "grouping": "cube",
+            "having": (["crash_type", "speed_category"], 2),
+            "totals": {"crash_type": "All Crash Types", "speed_category": "All Speed Zones"},
+            "order": [("year", True), ("total_fatalities", False)]},
+}
+
+
+# Run business query `name` (a key of BUSINESS_AGGREGATES) without joining the dimensions on the server;
+# returns the same rows as sql/<name>.sql (`run` and `tables` as in query_fact_aggregate)
+def business_aggregate(name: str, measure_name: str = "total_fatalities", run=query_data,
+                       tables: Optional[dict] = None) -> pd.DataFrame:
+    spec = BUSINESS_AGGREGATES[name]
+    base = query_fact_aggregate(spec["fact"], spec["labels"], spec["measure"], spec["filters"], measure_name,
+                                run, tables)
+    keys = [col for col in base.columns if col != measure_name]
+    grouping_sets = cube(keys) if spec["grouping"] == "cube" else rollup(keys)
+    having_columns, having_limit = spec["having"]
+
+    parts = []
+    for grouping_set in grouping_sets:
+        if sum(col not in grouping_set for col in having_columns) >= having_limit:
             continue
+        if grouping_set:
+            part = base.groupby(list(grouping_set), dropna=False, sort=False)[measure_name].sum().reset_index()
+        else:
+            part = pd.DataFrame({measure_name: [base[measure_name].sum()]})
+        part = part.astype(object)
+        for col in keys:
+            if col not in grouping_set:
+                part[col] = None
+        parts.append(part[keys + [measure_name]])
+    df = pd.concat(parts, ignore_index=True)
+    for col, label in spec["totals"].items():
+        df[col] = df[col].where(df[col].notna(), label)
+    df[measure_name] = df[measure_name].astype("int64")
+    return order_by(df, spec["order"])
 
-        print(f"\n📥 Importing `{filename}` into `{table_name}`...")
-        try:
-            df = pd.read_csv(file_path)
-            csv_headers[table_name] = df.columns.tolist()
-            insert_dataframe(table_name, df)
-        except Exception as e:
-            print(f"❌ Failed to import `{table_name}`: {e}")
+
+# ==========================
+# CSV Import
+# ==========================
+
+
+csv_headers = {}
+
+CHECKPOINT_UPSERT = f"""
+    INSERT INTO {IMPORT_CHECKPOINT_TABLE}
+        (table_name, byte_offset, rows_committed, file_size, file_mtime_ns, file_hash, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (table_name) DO UPDATE SET byte_offset = excluded.byte_offset,
+        rows_committed = excluded.rows_committed, file_size = excluded.file_size,
+        file_mtime_ns = excluded.file_mtime_ns, file_hash = excluded.file_hash, updated_at = excluded.updated_at
+"""
+
+# Bytes hashed at each end of a CSV to tell a regenerated file from the one a checkpoint was taken on
+CSV_SIGNATURE_BYTES = 64 * 1024
+
+
+# (size, mtime in ns, md5 of the first and last CSV_SIGNATURE_BYTES) of a file
+def csv_signature(file_path: str) -> tuple:
+    stat = os.stat(file_path)
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        digest.update(f.read(CSV_SIGNATURE_BYTES))
+        if stat.st_size > CSV_SIGNATURE_BYTES:
+            f.seek(max(stat.st_size - CSV_SIGNATURE_BYTES, CSV_SIGNATURE_BYTES))
+            digest.update(f.read())
+    return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+# Committed import progress per table: {table: {"byte_offset", "rows", "signature"}}
+def load_import_checkpoints() -> dict:
+    create_table(IMPORT_CHECKPOINT_TABLE, CONTROL_TABLE_SCHEMAS[IMPORT_CHECKPOINT_TABLE])
+    results, _ = query_data(f"SELECT table_name, byte_offset, rows_committed, file_size, file_mtime_ns, file_hash "
+                            f"FROM {IMPORT_CHECKPOINT_TABLE}")
+    return {name: {"byte_offset": offset, "rows": rows, "signature": (size, mtime_ns, file_hash)}
+            for name, offset, rows, size, mtime_ns, file_hash in results}
+
+
+# Import one CSV in committed chunks, resuming after the rows a previous run already committed.
+# Returns the number of rows inserted by this call.
+def import_csv_resumable(table_name: str, file_path: str, chunk_rows: int = IMPORT_CHUNK_ROWS,
+                         checkpoint: Optional[dict] = None) -> int:
+    signature = csv_signature(file_path)
+    file_size = signature[0]
+    offset, rows = 0, 0
+    if checkpoint:
+        if tuple(checkpoint["signature"]) != signature:
+            raise ValueError(f"`{file_path}` changed since the interrupted import "
+                             f"({checkpoint['rows']} rows committed); drop the tables and load again.")
+        offset, rows = checkpoint["byte_offset"], checkpoint["rows"]
+        if offset >= file_size:
+            log(f"♻️ `{table_name}` already imported ({rows} rows), skipping.", table=table_name, rows=rows)
+            return 0
+        log(f"♻️ Resuming `{table_name}` after {rows} committed rows (byte {offset}).",
+            table=table_name, rows=rows, byte_offset=offset)
+
+    inserted = 0
+    for chunk, end_offset in iter_csv_chunks(file_path, chunk_rows, offset):
+        csv_headers[table_name] = chunk.columns.tolist()
+        rows += len(chunk)
+        insert_dataframe(table_name, chunk, (CHECKPOINT_UPSERT, (table_name, end_offset, rows) + signature))
+        inserted += len(chunk)
+        offset = end_offset
+    if offset < file_size:  # header only (or trailing blank lines): mark the file as done
+        insert_data(CHECKPOINT_UPSERT, (table_name, file_size, rows) + signature)
+    return inserted
+
+
+# Import all CSVs in OUTPUT_DIR into corresponding database tables.
+# The tables are validated chunk by chunk against TABLE_SCHEMAS first; nothing is inserted if the database
+# would reject them (or if a fact row has a NULL foreign key, unless ALLOW_NULL_FOREIGN_KEYS).
+# Rows are committed every `chunk_rows` together with a checkpoint, so a rerun after a failure resumes
+# where the last committed chunk ended (drop_all_tables() also clears the checkpoints).
+def import_all_csv_to_db(validate: bool = True, chunk_rows: int = IMPORT_CHUNK_ROWS):
+    with stage("import_all_csv_to_db"):
+        files = {}
+        for table_name in TABLE_IMPORT_ORDER:
+            filename = f"{table_name}.csv"
+            file_path = os.path.join(OUTPUT_DIR, filename)
+
+            if not os.path.exists(file_path):
+                log(f"⚠️ File `{filename}` not found, skipping.", table=table_name, skipped=True)
+                continue
+            files[table_name] = file_path
+
+        if validate:
+            with stage("validate") as current:
+                problems, current.rows_in = validate_csv_files(files, chunk_rows,
+                                                               allow_null_foreign_keys=ALLOW_NULL_FOREIGN_KEYS)
+            if problems:
+                log(format_problems(problems), problems=problems)
+            if validation_errors(problems):
+                raise ValueError(f"Refusing to load `{OUTPUT_DIR}`: {len(validation_errors(problems))} "
+                                 f"validation errors (see above).")
+
+        checkpoints = load_import_checkpoints()
+        for table_name, file_path in files.items():
+            log(f"\n📥 Importing `{table_name}.csv` into `{table_name}`...")
+            with stage(f"import[{table_name}]") as current:
+                try:
+                    current.rows_out = import_csv_resumable(table_name, file_path, chunk_rows,
+                                                            checkpoints.get(table_name))
+                except Exception as e:
+                    log(f"❌ Failed to import `{table_name}`: {e} (committed chunks are kept; rerun to resume)",
+                        table=table_name, error=str(e))
 
 
 # ==========================
@@ -125,15 +470,17 @@ def run_sql_file(filename):
 
     statements = [stmt.strip() for stmt in sql_content.split(";") if stmt.strip()]
     for i, stmt in enumerate(statements, start=1):
-        print(f"\n💡 Executing SQL #{i}:\n{stmt}")
-        try:
-            result, columns = query_data(stmt)
-            df = pd.DataFrame(result, columns=columns)
-            print(df)
-            df_results[f"query_{i}"] = df
-        except Exception as e:
-            print(f"❌ Execution failed: {e}")
-            df_results[f"query_{i}"] = None
+        log(f"\n💡 Executing SQL #{i}:\n{stmt}")
+        with stage(f"sql[{os.path.basename(filename)}#{i}]") as current:
+            try:
+                result, columns = query_data(stmt)
+                df = pd.DataFrame(result, columns=columns)
+                current.rows_out = len(df)
+                log(df)
+                df_results[f"query_{i}"] = df
+            except Exception as e:
+                log(f"❌ Execution failed: {e}", file=filename, statement=i, error=str(e))
+                df_results[f"query_{i}"] = None
 
     return df_results
 
@@ -145,8 +492,9 @@ def run_sql_file(filename):
 
 def main():
 
-    # Drop all existing tables
-    drop_all_tables()
+    # Drop all existing tables (unless resuming an interrupted import: that needs the tables and checkpoints)
+    if not RESUME_IMPORT:
+        drop_all_tables()
 
     # Delete one certain table，e.g. fact_person_fatality
     # drop_table("fact_person_fatality")
@@ -175,26 +523,33 @@ def main():
     # )
     # print(df.head(20))
 
+    # Optional: aggregate on fact ids and decode the labels from the cached dimensions
+    # df = query_fact_aggregate("fact_person_fatality", {"time_of_day_id": ["time_of_day"], "road_id": ["road_type"]},
+    #                           "fatality_count", {("dim_date", "year"): 2024}, "total_fatalities")
+    # print(df.head(20))
+
 
     # Running Business queries sql files
 
     dfs = run_sql_file("sql/1.1.sql")
-    print(dfs["query_1"].head())
+    log(dfs["query_1"].head())
 
     dfs2 = run_sql_file("sql/1.2.sql")
-    print(dfs2["query_1"].head())
+    log(dfs2["query_1"].head())
 
     dfs3 = run_sql_file("sql/1.3.sql")
-    print(dfs3["query_1"].head())
+    log(dfs3["query_1"].head())
 
     dfs4 = run_sql_file("sql/1.4.sql")
-    print(dfs4["query_1"].head())
+    log(dfs4["query_1"].head())
 
     dfs5 = run_sql_file("sql/1.5.sql")
-    print(dfs5["query_1"].head())
+    log(dfs5["query_1"].head())
 
     dfs6 = run_sql_file("sql/1.6.sql")
-    print(dfs6["query_1"].head())
+    log(dfs6["query_1"].head())
+
+    print_summary()
 
 
 if __name__ == "__main__":
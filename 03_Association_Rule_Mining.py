@@ -4,9 +4,37 @@
 
 import pandas as pd
 from mlxtend.frequent_patterns import apriori, association_rules
-from mlxtend.preprocessing import TransactionEncoder
 import os
 
+from utility.approximate_mining import mine_approximate
+from utility.eclat import eclat
+from utility.item_matrix import ColumnSubset, ItemMatrix
+from utility.itemset_cache import cached_frequent_itemsets
+from utility.parallel_mining import mine_combinations_parallel
+from utility.pg_mining import PostgresSupportCounter
+from utility.rule_store import RuleStore
+from utility.shared_lattice import SharedLattice
+from utility.table_catalog import get_catalog
+from utility.targeted_mining import mine_targeted_rules
+from utility.wide_table import WIDE_JOINS, WIDE_KEY_COLUMNS, WIDE_TABLE_NAME
+
+# Worker processes used to mine the parameter combinations (None = one per CPU core)
+MAX_WORKERS = None
+
+# Where main() reads its data: "csv" (fatality_wide, or the tables exported to DB_files_export)
+# or "postgres" (itemset supports counted in the database, no export of the fact table needed)
+MINING_SOURCE = "csv"
+
+# Rule miner used by main(): "targeted" (consequent-constrained search), "apriori" (mlxtend),
+# "eclat" (packed-bitset supports, for long histories), or "lattice" (base-column itemsets
+# mined once and extended per combination)
+MINING_ALGORITHM = "targeted"
+
+# Approximate mode for exploratory runs: mine a sample of this fraction of the rows, stratified by
+# road_user (None = mine the full data). With VERIFY_SAMPLE the surviving rules are recounted exactly.
+SAMPLE_FRACTION = None
+VERIFY_SAMPLE = True
+
 # ===============================
 # Load CSV files into dictionary
 # ===============================
@@ -19,6 +47,25 @@ def load_csv_files(folder_path):
             csv_data[table_name] = df
     return csv_data
 
+# ==========================================================
+# Load the denormalized fatality table (no joins required)
+# ==========================================================
+def load_fatality_table(columns=None, wide_folder="output", fallback_folder="DB_files_export"):
+    # Only the requested columns (plus the join keys) are read, each table at most once per process
+    wanted = None if columns is None else WIDE_KEY_COLUMNS + [col for col in columns if col not in WIDE_KEY_COLUMNS]
+
+    # Prefer the fatality_wide table written by the ETL
+    wide_catalog = get_catalog(wide_folder)
+    if WIDE_TABLE_NAME in wide_catalog.tables:
+        return wide_catalog.load(WIDE_TABLE_NAME, wanted)
+
+    # Otherwise join the exported star schema tables, touching only the dimensions that are needed
+    print(f"⚠️ `{WIDE_TABLE_NAME}.csv` not found in `{wide_folder}`, building it from `{fallback_folder}`.")
+    catalog = get_catalog(fallback_folder)
+    if wanted is None:
+        wanted = [col for dim, key in WIDE_JOINS for col in catalog.columns(dim) if col != key]
+    return catalog.load_joined("fact_person_fatality", WIDE_JOINS, wanted)
+
 # ================================================
 # Select relevant columns based on user settings
 # ================================================
@@ -53,49 +100,94 @@ def get_selected_columns(speed= "limit", preference="easter", vehicle="bus"):
     return selected_cols
 
 # ===================================================
-# Merge all dimension tables to construct transactions
+# Build transactions from the denormalized fatality table
 # ===================================================
-def prepare_transactions_custom(data, selected_cols):
-
-    df = data["fact_person_fatality"].merge(data["dim_person"], on="person_id") \
-        .merge(data["dim_date"], on='date_id') \
-        .merge(data["dim_holiday"], on='holiday_id') \
-        .merge(data["dim_location"], on='location_id') \
-        .merge(data["dim_road"], on='road_id') \
-        .merge(data["dim_vehicle"], on='vehicle_id') \
-        .merge(data["dim_crash_type"], on='crash_type_id') \
-        .merge(data["dim_time"], on='time_of_day_id') 
-    
-    
-    # Transform selected columns to "col=value" format for association mining
-    df = df[selected_cols]
-    df = df.apply(lambda col: col.map(lambda x: f"{col.name}={x}" if pd.notnull(x) else pd.NA))
-    transactions = df.apply(lambda row: row.dropna().tolist(), axis=1)
-
-    # Encode transactions for mlxtend
-    te = TransactionEncoder()
-    df_encoded = te.fit(transactions).transform(transactions)
-    return pd.DataFrame(df_encoded, columns=te.columns_)
+def encode_transactions(wide_df, candidate_cols):
+
+    # Keep only fatalities linked to every dimension (same rows as inner-joining the star schema)
+    df = wide_df.dropna(subset=WIDE_KEY_COLUMNS)
+
+    # One-hot encode every candidate column once as a sparse "col=value" item matrix
+    return ItemMatrix.encode(df, candidate_cols)
+
+
+def prepare_transactions_custom(wide_df, selected_cols, algorithm=None):
+    # Encode a single combination (use encode_transactions + select to share work across combinations);
+    # Eclat gets bitsets packed from the sparse columns, apriori the dense one-hot DataFrame
+    item_matrix = encode_transactions(wide_df, selected_cols)
+    if algorithm == "eclat":
+        return item_matrix.select_packed(selected_cols)
+    return item_matrix.select(selected_cols, dense=True)
 
 
 # ========================================
 # Run apriori + filter for specific target
 # ========================================
-def mine_association_rules(df_trans, target_rhs="road_user=", min_support=0.02, min_confidence=0.60, min_lift=1.0, top_k=10):
-    freq_items = apriori(df_trans, min_support=min_support, use_colnames=True)
-    rules = association_rules(freq_items, metric="lift", min_threshold=min_lift)
-
-    # Keep only rules with a single consequent that starts with the target (e.g. road_user=)
-    rules = rules[
-        rules['consequents'].apply(lambda x: len(x) == 1 and list(x)[0].startswith(target_rhs))
-    ]
+def run_apriori(df_trans, min_support=0.02):
+    # mlxtend needs a DataFrame of its own
+    if isinstance(df_trans, ColumnSubset):
+        df_trans = df_trans.to_frame()
+    return apriori(df_trans, min_support=min_support, use_colnames=True)
+
+
+def mine_association_rules(df_trans, target_rhs="road_user=", min_support=0.02, min_confidence=0.60, min_lift=1.0, top_k=10,
+                           algorithm="apriori", frequent_itemsets=None, cache_dir=None):
+    if algorithm == "targeted":
+        # Search only rules whose consequent is a target item, pruning during the search
+        rules = mine_targeted_rules(df_trans, target_rhs=target_rhs, min_support=min_support,
+                                    min_confidence=min_confidence, min_lift=min_lift)
+    else:
+        # Precomputed itemsets (e.g. from a SharedLattice) replace the apriori pass
+        freq_items = frequent_itemsets
+        if freq_items is None:
+            # Eclat counts supports on packed bitsets: memory stays at rows/8 bytes per item
+            miner = eclat if algorithm == "eclat" else run_apriori
+            if cache_dir:
+                # Reuse itemsets cached on disk for the same data at an equal or lower support
+                freq_items = cached_frequent_itemsets(df_trans, min_support, miner, cache_dir=cache_dir)
+            else:
+                freq_items = miner(df_trans, min_support=min_support)
+        rules = association_rules(freq_items, metric="lift", min_threshold=min_lift)
+
+        # Keep only rules with a single consequent that starts with the target (e.g. road_user=)
+        rules = rules[
+            rules['consequents'].apply(lambda x: len(x) == 1 and list(x)[0].startswith(target_rhs))
+        ]
+
+        rules = rules[rules['confidence'] >= min_confidence]
 
-    rules = rules[rules['confidence'] >= min_confidence]
     rules = rules.sort_values(by=["lift", "confidence"], ascending=False).head(top_k)
 
 
     return rules
 
+# ==================================================
+# Sweep thresholds over a single low-support mining pass
+# ==================================================
+def sweep_thresholds(df_trans, supports, confidences, lifts, target_rhs="road_user=", top_k=10,
+                     algorithm="eclat", cache_dir=None):
+    # Mine once at the loosest thresholds; every stricter setting is a filter of these rules,
+    # because a rule's support, confidence and lift do not depend on the thresholds
+    base_rules = mine_association_rules(df_trans, target_rhs=target_rhs, min_support=min(supports),
+                                        min_confidence=min(confidences), min_lift=min(lifts), top_k=None,
+                                        algorithm=algorithm, cache_dir=cache_dir)
+
+    summary = []
+    top_rules = {}
+    for min_support in supports:
+        for min_confidence in confidences:
+            for min_lift in lifts:
+                rules = base_rules[
+                    (base_rules["support"] >= min_support)
+                    & (base_rules["confidence"] >= min_confidence)
+                    & (base_rules["lift"] >= min_lift)
+                ]
+                summary.append({"min_support": min_support, "min_confidence": min_confidence,
+                                "min_lift": min_lift, "rule_count": len(rules)})
+                top_rules[(min_support, min_confidence, min_lift)] = rules.head(top_k)
+
+    return pd.DataFrame(summary), top_rules
+
 # ==========================
 # Format frozensets for CSV
 # ==========================
@@ -115,8 +207,6 @@ def clean_frozenset_columns(df):
 # Main execution flow
 # ===================
 def main():
-    # Load all CSV files from the exported data directory
-    data = load_csv_files("DB_files_export")
     all_rules = []
 
     # Define all parameter combinations to explore (speed type, holiday period, vehicle type)
@@ -135,31 +225,70 @@ def main():
         ("category","christmas", "articulated")
     ]
 
-    # Perform rule mining for each combination of parameters
-    for speed, holiday, vehicle in combinations:
-        print(f"🚀 combination：{speed} +{holiday} + {vehicle}")
-
-        # Select relevant columns based on the current combination
-        selected_cols = get_selected_columns(speed= speed, preference=holiday, vehicle=vehicle)
-
-        # Prepare transaction dataset
-        df_trans = prepare_transactions_custom(data, selected_cols)
-
-        # Mine association rules with target item on the RHS (road_user)
-        rules = mine_association_rules(df_trans, target_rhs="road_user=",top_k=50)
+    # Select relevant columns for every combination of parameters
+    jobs = [get_selected_columns(speed=speed, preference=holiday, vehicle=vehicle)
+            for speed, holiday, vehicle in combinations]
+
+    if MINING_SOURCE == "postgres":
+        # Count itemset supports in the database; only the count tables are transferred
+        print(f"🚀 Mining {len(jobs)} combinations with supports counted in PostgreSQL")
+        counter = PostgresSupportCounter(min_support=0.02)
+        results = [mine_association_rules(None, target_rhs="road_user=", top_k=None,
+                                          frequent_itemsets=counter.frequent_itemsets(cols))
+                   for cols in jobs]
+    else:
+        # Union of all candidate columns
+        candidate_cols = []
+        for cols in jobs:
+            for col in cols:
+                if col not in candidate_cols:
+                    candidate_cols.append(col)
+
+        # Load only those columns of the denormalized fatality table, then encode them once
+        data = load_fatality_table(candidate_cols)
+        item_matrix = encode_transactions(data, candidate_cols)
+
+        if MINING_ALGORITHM == "lattice":
+            # Mine the itemsets of the shared base columns once, then extend them per combination
+            print(f"🚀 Mining {len(jobs)} combinations on a shared base lattice")
+            lattice = SharedLattice(item_matrix, base_columns=get_selected_columns(speed=None, preference=None, vehicle=None))
+            results = [mine_association_rules(None, target_rhs="road_user=", top_k=None,
+                                              frequent_itemsets=lattice.frequent_itemsets(cols))
+                       for cols in jobs]
+        else:
+            # Mine association rules with target item on the RHS (road_user), one worker process per combination;
+            # the item matrix is shared between workers and results come back in combination order
+            print(f"🚀 Mining {len(jobs)} combinations with {MAX_WORKERS or os.cpu_count()} worker(s)")
+            if SAMPLE_FRACTION:
+                # Rules from a stratified sample, with confidence intervals for support/confidence/lift
+                print(f"📦 Approximate mode: {SAMPLE_FRACTION:.0%} sample per road_user, verify={VERIFY_SAMPLE}")
+                results = mine_combinations_parallel(item_matrix, jobs, mine_approximate, max_workers=MAX_WORKERS,
+                                                     rule_miner=mine_association_rules, target_rhs="road_user=",
+                                                     sample_fraction=SAMPLE_FRACTION, verify=VERIFY_SAMPLE,
+                                                     top_k=None, algorithm=MINING_ALGORITHM)
+            else:
+                results = mine_combinations_parallel(item_matrix, jobs, mine_association_rules, max_workers=MAX_WORKERS,
+                                                     packed=MINING_ALGORITHM == "eclat",
+                                                     target_rhs="road_user=", top_k=None, algorithm=MINING_ALGORITHM)
+
+    for (speed, holiday, vehicle), rules in zip(combinations, results):
         rules["combo"] = f"{speed}_{holiday}_{vehicle}"  # Label rule origin
         all_rules.append(rules)
 
     # Merge and clean all rules
     combined_rules = pd.concat(all_rules, ignore_index=True)
 
-    # Export top rules
-    final_top_k = combined_rules.sort_values(by=["lift", "confidence"], ascending=False)
-
-    # Export rules to CSV
     output_dir = "output_rules"
     os.makedirs(output_dir, exist_ok=True)
 
+    # Keep every combination's rules in the indexed rule store (query with RuleStore.load(...).query(...))
+    store_path = os.path.join(output_dir, "rules_store.npz")
+    RuleStore.from_rules(combined_rules).save(store_path)
+    print(f"✅ Saved {len(combined_rules)} rules to the rule store：{store_path}")
+
+    # Export top rules
+    final_top_k = combined_rules.sort_values(by=["lift", "confidence"], ascending=False)
+
     # Round numerical metrics for readability
     final_top_k["support"] = final_top_k["support"].round(3)
     final_top_k["confidence"] = final_top_k["confidence"].round(3)
@@ -173,7 +302,7 @@ def main():
     final_top_k = final_top_k[export_cols]
     final_top_k = final_top_k.drop_duplicates()
 
-    # Select top 50 rules
+    # Select top 50 rules for the CSV summary
     final_top_k = final_top_k.head(50)
 
     # Save to CSV
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# dw.py
+# Single command-line entry point for the pipeline. Each subcommand imports only what it needs,
+# so `query` (outside the sql/ business queries) and `drop` start without pandas, mlxtend or scikit-learn.
+#
+#   python dw.py etl                      # 01: sources → output/*.csv
+#   python dw.py load                     # 02: drop, create, validate and import output/*.csv
+#   python dw.py load --keep              # resume an interrupted import from its last committed chunk
+#   python dw.py query sql/1.1.sql        # run SQL files (or -c "SELECT ...") and print the results;
+#                                         # (--engine aggregate: unedited business fact aggregates run on ids)
+#   python dw.py export                   # 02: write every table to DB_files_export/
+#   python dw.py mine --algorithm eclat   # 03: association rule mining
+#   python dw.py rates sa4 --year 2023   # deaths per 100k population (or --per dwellings) by geography
+#   python dw.py drop [table ...]         # drop the given tables (default: all, in reverse import order, and the import checkpoints)
+#   python dw.py serve --port 8765        # HTTP read API (utility/read_api.py)
+
+import argparse
+import csv
+import functools
+import importlib
+import os
+import sys
+
+
+# ---------- Output ----------
+def print_rows(rows, columns, fmt: str = "table", out=None):
+    """
+    Print query results as an aligned text table or as CSV (no pandas needed).
+    """
+    out = out or sys.stdout
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return
+    cells = [[("" if value is None else str(value)) for value in row] for row in rows]
+    widths = [max([len(str(col))] + [len(row[i]) for row in cells]) for i, col in enumerate(columns)]
+    out.write("  ".join(str(col).ljust(w) for col, w in zip(columns, widths)).rstrip() + "\n")
+    out.write("  ".join("-" * w for w in widths) + "\n")
+    for row in cells:
+        out.write("  ".join(value.ljust(w) for value, w in zip(row, widths)).rstrip() + "\n")
+    out.write(f"({len(rows)} rows)\n")
+
+
+def split_statements(sql_content: str) -> list:
+    """
+    Statements of a SQL script, split on ';' the same way run_sql_file does.
+    """
+    return [stmt.strip() for stmt in sql_content.split(";") if stmt.strip()]
+
+
+# ---------- Subcommands ----------
+def cmd_etl(args):
+    etl = importlib.import_module("01_ETL_template")
+    etl.main()
+
+
+def cmd_load(args):
+    pg = importlib.import_module("02_PostgreSQL")
+    if not args.keep:
+        pg.drop_all_tables()
+    pg.create_all_tables()
+    if args.allow_null_fks:
+        pg.ALLOW_NULL_FOREIGN_KEYS = True
+    pg.import_all_csv_to_db(validate=not args.no_validate, chunk_rows=args.chunk_rows or pg.IMPORT_CHUNK_ROWS)
+
+
+def cmd_export(args):
+    pg = importlib.import_module("02_PostgreSQL")
+    pg.preview_all_tables(args.limit, folder=args.out or pg.DB_files_export, force=args.force)
+
+
+def cmd_query(args):
+    from utility.metrics import stage
+    from utility.pg_utils import query_data
+    from utility.schemas import matches_business_aggregate
+
+    scripts = [(f"-c#{i}", sql) for i, sql in enumerate(args.command or [], start=1)]
+    for filename in args.files:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        with open(filename, "r", encoding="utf-8") as f:
+            text = f.read()
+        if args.engine == "aggregate" and matches_business_aggregate(name, text):
+            # Business fact aggregates are grouped on ids and decoded with the cached dimensions
+            # (02_PostgreSQL, and with it pandas, is only imported for them)
+            pg = importlib.import_module("02_PostgreSQL")
+            scripts.append((filename, functools.partial(business_rows, pg, name)))
+            continue
+        scripts += [(f"{filename}#{i}", stmt) for i, stmt in enumerate(split_statements(text), start=1)]
+    if not scripts:
+        raise SystemExit("Nothing to run: give SQL files or -c \"SELECT ...\".")
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        for label, statement in scripts:
+            with stage(f"sql[{label}]") as current:
+                rows, columns = statement() if callable(statement) else query_data(statement)
+                current.rows_out = len(rows)
+            if len(scripts) > 1 and args.format == "table":
+                out.write(f"\n-- {label}\n")
+            print_rows(rows, columns, args.format, out)
+    finally:
+        if args.out:
+            out.close()
+
+
+def business_rows(pg, name: str):
+    """
+    (rows, columns) of business query `name` from 02_PostgreSQL.business_aggregate.
+    """
+    df = pg.business_aggregate(name)
+    return [tuple(row) for row in df.astype(object).where(df.notna(), None).to_numpy()], list(df.columns)
+
+
+def cmd_rates(args):
+    from utility.pg_utils import death_rates
+
+    rows, columns = death_rates(args.level, args.year, args.per)
+    print_rows(rows, columns, args.format)
+
+
+def cmd_mine(args):
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    if args.source:
+        mining.MINING_SOURCE = args.source
+    if args.algorithm:
+        mining.MINING_ALGORITHM = args.algorithm
+    if args.workers:
+        mining.MAX_WORKERS = args.workers
+    if args.sample_fraction:
+        mining.SAMPLE_FRACTION = args.sample_fraction
+    mining.main()
+
+
+def cmd_drop(args):
+    from utility.pg_utils import drop_table
+    from utility.schemas import CONTROL_TABLE_SCHEMAS, TABLE_IMPORT_ORDER
+
+    for table in args.tables or list(reversed(TABLE_IMPORT_ORDER)) + list(CONTROL_TABLE_SCHEMAS):
+        drop_table(table)
+
+
+def cmd_serve(args):
+    import asyncio
+    from utility.read_api import serve
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size, args.engine))
+    except KeyboardInterrupt:
+        pass
+
+
+# ---------- Parser ----------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dw.py", description="Traffic fatality data warehouse pipeline.")
+    parser.add_argument("--db", choices=["postgres", "sqlite"], help="Database backend (default: DW_DB_BACKEND)")
+    parser.add_argument("--sqlite-path", help="SQLite database file (implies --db sqlite)")
+    parser.add_argument("--quiet", action="store_true", help="No console progress output")
+    parser.add_argument("--metrics-log", help="Append stage metrics as JSON lines to this file")
+    parser.add_argument("--summary", action="store_true", help="Print the stage metrics table at the end")
+    sub = parser.add_subparsers(dest="command_name", required=True)
+
+    sub.add_parser("etl", help="Build the star schema CSVs from the source files").set_defaults(func=cmd_etl)
+
+    load = sub.add_parser("load", help="Create the tables and import the ETL output")
+    load.add_argument("--keep", action="store_true", help="Do not drop existing tables first (resumes an interrupted import)")
+    load.add_argument("--no-validate", action="store_true", help="Skip the pre-load validation")
+    load.add_argument("--allow-null-fks", action="store_true",
+                      help="Load fact rows with NULL foreign keys (validation warning instead of error)")
+    load.add_argument("--chunk-rows", type=int, help="Rows per committed chunk (default: DW_IMPORT_CHUNK_ROWS)")
+    load.set_defaults(func=cmd_load)
+
+    query = sub.add_parser("query", help="Run SQL files or statements and print the results")
+    query.add_argument("files", nargs="*", help="SQL script files")
+    query.add_argument("-c", "--command", action="append", help="SQL statement (repeatable)")
+    query.add_argument("--format", choices=["table", "csv"], default="table")
+    query.add_argument("--out", help="Write the results to this file instead of stdout")
+    query.add_argument("--engine", choices=["aggregate", "sql"], default="sql",
+                       help="sql: run every file as it is (default); aggregate: business fact aggregates "
+                            "(sql/1.x, while unedited) on ids with cached dimension labels, other files as SQL")
+    query.set_defaults(func=cmd_query)
+
+    export = sub.add_parser("export", help="Export every table to DB_files_export")
+    export.add_argument("--limit", type=int, help="Rows per table (default: all)")
+    export.add_argument("--out", help="Export folder (default: DB_files_export)")
+    export.add_argument("--force", action="store_true", help="Rewrite every table, even if unchanged")
+    export.set_defaults(func=cmd_export)
+
+    rates = sub.add_parser(
+        "rates", help="Deaths per 100k population or dwellings by geography",
+        description="Deaths per 100k population or dwellings by geography. Denominators: state and remoteness "
+                    "levels use the ABS state / remoteness totals (so state rates are usually lower than sql/1.5, which "
+                    "only counts the LGAs in dim_location), lga the ABS LGA estimates, and sa4 the LGA "
+                    "populations split across SA4s by their share of crash records (an approximation; LGAs "
+                    "without crashes form a 'LGAs without crash records' row per state).")
+    rates.add_argument("level", choices=["state", "remoteness", "state_remoteness", "sa4", "lga"],
+                       help="state, remoteness, state_remoteness: ABS totals; lga: ABS LGA estimates; "
+                            "sa4: LGAs apportioned by their crash records")
+    rates.add_argument("--year", type=int, default=2023,
+                       help="Year of the deaths; the denominators are the latest up to it, or the earliest "
+                            "available before the population series starts (see population_year)")
+    rates.add_argument("--per", choices=["population", "dwellings"], default="population")
+    rates.add_argument("--format", choices=["table", "csv"], default="table")
+    rates.set_defaults(func=cmd_rates)
+
+    mine = sub.add_parser("mine", help="Mine association rules")
+    mine.add_argument("--source", choices=["csv", "postgres"])
+    mine.add_argument("--algorithm", choices=["targeted", "apriori", "eclat", "lattice"])
+    mine.add_argument("--workers", type=int)
+    mine.add_argument("--sample-fraction", type=float)
+    mine.set_defaults(func=cmd_mine)
+
+    drop = sub.add_parser("drop", help="Drop tables (default: all)")
+    drop.add_argument("tables", nargs="*")
+    drop.set_defaults(func=cmd_drop)
+
+    serve = sub.add_parser("serve", help="Serve the business queries and table previews over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--pool-size", type=int, default=4, help="Worker threads / open connections")
+    serve.add_argument("--engine", choices=["aggregate", "sql", "olap"], default="sql",
+                       help="sql: run the scripts as they are (default); aggregate: unedited business fact "
+                            "aggregates on ids with cached dimension labels; olap: answer them with utility.olap")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from utility import metrics, pg_utils
+    if args.sqlite_path:
+        pg_utils.set_backend("sqlite", path=args.sqlite_path)
+    elif args.db:
+        pg_utils.set_backend(args.db)
+    # Query and rate results go to stdout, so progress output is off for them
+    metrics.configure(log_path=args.metrics_log, quiet=args.quiet or args.command_name in ("query", "rates"))
+    try:
+        args.func(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `dw.py rates lga | head`): stop quietly, and point stdout at
+        # devnull so that the interpreter's final flush does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(0)
+    except Exception as e:
+        print(f"❌ {args.command_name} failed: {e}", file=sys.stderr)
+        raise SystemExit(1)
+    # (the ETL prints its own summary)
+    if args.summary and args.command_name != "etl":
+        metrics.configure(quiet=False)
+        metrics.print_summary()
+
+
+if __name__ == "__main__":
+    main()
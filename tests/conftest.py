@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# conftest.py
+# Puts the repository root on sys.path so the numbered scripts import with importlib.
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
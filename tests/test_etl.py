@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# test_etl.py
+import functools
+import importlib
+import os
+
+from conftest import REPO_ROOT
+from utility.synthetic_sources import generate_sources
+from utility.wide_table import WIDE_TABLE_NAME
+
+
+def test_fact_blocks_write_the_same_tables_as_one_block(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    etl = importlib.import_module("01_ETL_template")
+    generate_sources(str(tmp_path / "sources"), n_fatalities=3000, seed=1)
+    monkeypatch.setattr(etl, "DATA_DIR", str(tmp_path / "sources"))
+
+    builders = {name: getattr(etl, name) for name in ("iter_fact_fatal_crash", "iter_fact_person_fatality")}
+
+    def run(out, block_rows):
+        os.makedirs(out)
+        monkeypatch.setattr(etl, "OUTPUT_DIR", str(out))
+        for name, builder in builders.items():
+            monkeypatch.setattr(etl, name, functools.partial(builder, block_rows=block_rows))
+        etl.main()
+
+    # 777 divides neither table's row count, so the last block is a partial one
+    run(tmp_path / "one_block", 1_000_000)
+    run(tmp_path / "blocks", 777)
+    for table in ("fact_fatal_crash", "fact_person_fatality", WIDE_TABLE_NAME):
+        one_block = (tmp_path / "one_block" / f"{table}.csv").read_bytes()
+        blocks = (tmp_path / "blocks" / f"{table}.csv").read_bytes()
+        assert (one_block.count(b"\n") - 1) % 777 != 0
+        assert blocks == one_block, table
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# test_import.py
+import importlib
+import os
+import shutil
+
+import pytest
+
+from conftest import REPO_ROOT
+from utility import pg_utils
+from utility.schemas import TABLE_IMPORT_ORDER
+
+EXPORT_DIR = os.path.join(REPO_ROOT, "DB_files_export")
+
+
+@pytest.fixture
+def pg(tmp_path, monkeypatch):
+    previous = pg_utils.get_backend()
+    pg_utils.set_backend("sqlite", path=str(tmp_path / "project1.sqlite"))
+    module = importlib.import_module("02_PostgreSQL")
+    shutil.copytree(EXPORT_DIR, tmp_path / "output")
+    monkeypatch.setattr(module, "OUTPUT_DIR", str(tmp_path / "output"))
+    module.drop_all_tables()
+    module.create_all_tables()
+    yield module
+    pg_utils._backend = previous
+
+
+def _table_counts():
+    return {table: pg_utils.query_data(f"SELECT COUNT(*) FROM {table}")[0][0][0] for table in TABLE_IMPORT_ORDER}
+
+
+def _fail_on_third_chunk(pg, monkeypatch, table):
+    real, calls = pg.insert_dataframe, {"n": 0}
+
+    def failing(table_name, df, checkpoint=None):
+        if table_name == table:
+            calls["n"] += 1
+            if calls["n"] == 3:
+                raise RuntimeError("simulated crash")
+        return real(table_name, df, checkpoint)
+    monkeypatch.setattr(pg, "insert_dataframe", failing)
+    return real
+
+
+def test_interrupted_import_resumes_without_duplicates(pg, monkeypatch):
+    pg.import_all_csv_to_db(chunk_rows=5000)
+    expected = {table: pg_utils.table_checksum(table) for table in TABLE_IMPORT_ORDER}
+    pg.drop_all_tables()
+    pg.create_all_tables()
+
+    real = _fail_on_third_chunk(pg, monkeypatch, "fact_person_fatality")
+    pg.import_all_csv_to_db(chunk_rows=5000)
+    assert _table_counts()["fact_person_fatality"] == 10000
+
+    monkeypatch.setattr(pg, "insert_dataframe", real)
+    pg.import_all_csv_to_db(chunk_rows=7000)
+    assert {table: pg_utils.table_checksum(table) for table in TABLE_IMPORT_ORDER} == expected
+
+
+def test_regenerated_csv_is_not_resumed(pg, monkeypatch):
+    real = _fail_on_third_chunk(pg, monkeypatch, "fact_person_fatality")
+    pg.import_all_csv_to_db(chunk_rows=5000)
+    monkeypatch.setattr(pg, "insert_dataframe", real)
+
+    # Same size, different contents: swap two data lines at the end of the file
+    path = os.path.join(pg.OUTPUT_DIR, "fact_person_fatality.csv")
+    with open(path, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    lines[-1], lines[-2] = lines[-2], lines[-1]
+    with open(path, "wb") as f:
+        f.write(b"".join(lines))
+
+    checkpoint = pg.load_import_checkpoints()["fact_person_fatality"]
+    with pytest.raises(ValueError, match="changed since the interrupted import"):
+        pg.import_csv_resumable("fact_person_fatality", path, 5000, checkpoint)
+    assert _table_counts()["fact_person_fatality"] == 10000
+
+
+def test_validation_rejects_null_foreign_keys_chunk_by_chunk(pg, monkeypatch):
+    path = os.path.join(pg.OUTPUT_DIR, "fact_person_fatality.csv")
+    with open(path, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    header = lines[0].decode().rstrip("\r\n").split(",")
+    fields = lines[-1].decode().rstrip("\r\n").split(",")
+    fields[header.index("road_id")] = ""
+    lines[-1] = (",".join(fields) + "\n").encode()
+    with open(path, "wb") as f:
+        f.write(b"".join(lines))
+
+    with pytest.raises(ValueError, match="validation errors"):
+        pg.import_all_csv_to_db(chunk_rows=5000)
+    assert _table_counts()["fact_person_fatality"] == 0
+
+    monkeypatch.setattr(pg, "ALLOW_NULL_FOREIGN_KEYS", True)
+    pg.import_all_csv_to_db(chunk_rows=5000)
+    assert pg_utils.query_data("SELECT COUNT(*) FROM fact_person_fatality WHERE road_id IS NULL")[0][0][0] == 1
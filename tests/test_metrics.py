@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# test_metrics.py
+import time
+from collections import Counter
+
+import numpy as np
+
+from utility import metrics, profiling
+
+
+def test_rss_peak_is_reset_on_first_stage_not_at_construction(monkeypatch):
+    calls = []
+    monkeypatch.setattr(metrics, "reset_rss_peak", lambda: calls.append(1) or True)
+    monkeypatch.setattr(metrics, "rss_peak_resettable", lambda: True)
+
+    recorder = metrics.MetricsRecorder(log_path=None, quiet=True)
+    assert calls == []
+    with recorder.stage("first"):
+        pass
+    assert calls == [1]
+    assert recorder.memory_source == "rss"
+
+
+def test_unwritable_clear_refs_falls_back(monkeypatch):
+    monkeypatch.setattr(metrics, "reset_rss_peak", lambda: False)
+    monkeypatch.setattr(metrics, "rss_peak_resettable", lambda: True)
+    monkeypatch.setattr(metrics, "USE_TRACEMALLOC", False)
+
+    recorder = metrics.MetricsRecorder(log_path=None, quiet=True)
+    with recorder.stage("first"):
+        pass
+    assert recorder.memory_source is None
+    assert recorder.records[0]["peak_mb"] is None
+
+
+def _sort_in_c(values):
+    return np.sort(values)
+
+
+def _python_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_counts_long_c_calls_by_their_duration():
+    values = np.random.default_rng(0).random(10_000_000)
+    sampler = profiling.StackSampler(interval_ms=5)
+    sampler.start()
+    started = time.perf_counter()
+    _sort_in_c(values)
+    c_seconds = time.perf_counter() - started
+    _python_loop(c_seconds)
+    sampler.stop()
+
+    # The sort's samples land on numpy's Python wrapper, below _sort_in_c
+    total = Counter()
+    for stack, n in sampler.stacks.items():
+        for label in set(stack.split(";")):
+            total[label.split(" ")[0]] += n
+    share = total["_sort_in_c"] / (total["_sort_in_c"] + total["_python_loop"])
+    assert 0.3 < share < 0.7
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+# test_mining.py
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+
+
+def test_sampled_mining_runs_end_to_end(tmp_path, monkeypatch):
+    # main() reads DB_files_export (no fatality_wide in the working folder) and writes output_rules/
+    os.symlink(os.path.join(REPO_ROOT, "DB_files_export"), tmp_path / "DB_files_export")
+    monkeypatch.chdir(tmp_path)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    monkeypatch.setattr(mining, "MINING_SOURCE", "csv")
+    monkeypatch.setattr(mining, "MINING_ALGORITHM", "targeted")
+    monkeypatch.setattr(mining, "SAMPLE_FRACTION", 0.2)
+    monkeypatch.setattr(mining, "VERIFY_SAMPLE", True)
+    monkeypatch.setattr(mining, "MAX_WORKERS", 1)
+
+    mining.main()
+
+    from utility.rule_store import RuleStore
+    store = RuleStore.load(str(tmp_path / "output_rules" / "rules_store.npz"))
+    assert len(store) > 0
+    assert (tmp_path / "output_rules" / "combined_top10_rules.csv").exists()
+
+
+def _itemsets(frame):
+    return {items: round(support, 12) for items, support in zip(frame["itemsets"], frame["support"])}
+
+
+def test_eclat_on_packed_columns_matches_dense(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    from utility.eclat import eclat
+    from utility.parallel_mining import mine_combinations_parallel
+
+    cols = mining.get_selected_columns()
+    item_matrix = mining.encode_transactions(mining.load_fatality_table(cols), cols)
+    dense = item_matrix.select(cols, dense=True)
+    packed = item_matrix.select_packed(cols)
+
+    expected = _itemsets(mining.run_apriori(dense, min_support=0.05))
+    assert _itemsets(eclat(dense, min_support=0.05)) == expected
+    assert _itemsets(eclat(packed, min_support=0.05)) == expected
+
+    # Workers read the packed bitsets from shared memory
+    results = mine_combinations_parallel(item_matrix, [cols, cols[:-1]], mining.mine_association_rules,
+                                         max_workers=2, packed=True, top_k=None, algorithm="eclat")
+    reference = mining.mine_association_rules(dense, top_k=None, algorithm="eclat")
+    assert results[0].reset_index(drop=True).equals(reference.reset_index(drop=True))
+
+
+def test_orphan_foreign_key_is_dropped_like_an_inner_join(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    import pandas as pd
+    from utility.wide_table import WIDE_JOINS, build_fatality_wide
+
+    dimensions = {dim: pd.DataFrame({key: [1]}) for dim, key in WIDE_JOINS}
+    dimensions["dim_person"]["road_user"] = ["Driver"]
+    fact = pd.DataFrame({key: [1, 1, 1] for _, key in WIDE_JOINS})
+    fact["road_id"] = [1, 99, None]  # matched, orphan, NULL
+
+    wide = build_fatality_wide(fact, dimensions)
+    assert wide["road_id"].isna().tolist() == [False, True, True]
+    item_matrix = mining.encode_transactions(wide, ["road_user"])
+    assert len(item_matrix.select(["road_user"], dense=True)) == 1
+
+
+def test_joined_load_reads_each_table_once(monkeypatch):
+    from utility import table_catalog
+
+    reads = []
+    read_csv = table_catalog.pd.read_csv
+    monkeypatch.setattr(table_catalog.pd, "read_csv",
+                        lambda path, **kwargs: reads.append(os.path.basename(path)) or read_csv(path, **kwargs))
+    catalog = table_catalog.TableCatalog(os.path.join(REPO_ROOT, "DB_files_export"))
+    df = catalog.load_joined("fact_person_fatality", [("dim_person", "person_id"), ("dim_road", "road_id")],
+                             ["road_user", "age_group"])
+    assert sorted(reads) == ["dim_person.csv", "dim_road.csv", "fact_person_fatality.csv"]
+    assert {"road_user", "age_group"} <= set(df.columns)
+
+
+def test_workers_mine_shared_columns_in_place(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    from utility.item_matrix import ColumnSubset
+    from utility.parallel_mining import mine_combinations_parallel
+
+    jobs = [mining.get_selected_columns(), mining.get_selected_columns(speed="category", vehicle="heavy")]
+    candidates = list(dict.fromkeys(col for cols in jobs for col in cols))
+    item_matrix = mining.encode_transactions(mining.load_fatality_table(candidates), candidates)
+    dense = np.asfortranarray(item_matrix.matrix.toarray())
+
+    for algorithm in ("targeted", "eclat"):
+        results = mine_combinations_parallel(item_matrix, jobs, mining.mine_association_rules, max_workers=2,
+                                             top_k=None, algorithm=algorithm)
+        for cols, rules in zip(jobs, results):
+            idx = item_matrix.item_indices(cols)
+            in_place = ColumnSubset(dense, idx, [item_matrix.items[i] for i in idx])
+            assert np.shares_memory(in_place[in_place.columns[0]].to_numpy(), dense)
+            expected = mining.mine_association_rules(item_matrix.select(cols, dense=True), top_k=None,
+                                                     algorithm=algorithm)
+            assert rules.reset_index(drop=True).equals(expected.reset_index(drop=True))
+            assert mining.mine_association_rules(in_place, top_k=None, algorithm=algorithm) \
+                .reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+
+def test_verified_sample_rules_keep_consistent_columns(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    from utility.approximate_mining import mine_approximate, recount_rules
+
+    cols = mining.get_selected_columns()
+    dense = mining.encode_transactions(mining.load_fatality_table(cols), cols).select(cols, dense=True)
+
+    estimated = mine_approximate(dense, mining.mine_association_rules, sample_fraction=0.2, top_k=None,
+                                 algorithm="targeted")
+    for metric in ("support", "confidence", "lift"):
+        assert (estimated[f"{metric}_low"] <= estimated[metric] + 1e-12).all()
+        assert (estimated[metric] <= estimated[f"{metric}_high"] + 1e-12).all()
+
+    verified = mine_approximate(dense, mining.mine_association_rules, sample_fraction=0.2, verify=True,
+                                top_k=None, algorithm="targeted")
+    assert len(verified) > 0
+    for metric in ("support", "confidence", "lift"):
+        # The intervals describe the sample estimates, never the exact values next to them
+        assert f"{metric}_low" not in verified.columns and f"{metric}_high" not in verified.columns
+        assert (verified[f"sample_{metric}_low"] <= verified[f"sample_{metric}"] + 1e-12).all()
+        assert (verified[f"sample_{metric}"] <= verified[f"sample_{metric}_high"] + 1e-12).all()
+    exact = recount_rules(verified, dense)
+    for metric in ("support", "confidence", "lift", "antecedent support", "consequent support"):
+        assert np.allclose(verified[metric], exact[metric])
+    assert np.allclose(verified["confidence"], verified["support"] / verified["antecedent support"])
+    assert np.allclose(verified["lift"], verified["confidence"] / verified["consequent support"])
+
+    empty = mine_approximate(dense, mining.mine_association_rules, sample_fraction=0.2, verify=True,
+                             min_support=0.99, top_k=None, algorithm="targeted")
+    assert len(empty) == 0 and "sample_support_low" in empty.columns and "support_low" not in empty.columns
+
+
+def test_targeted_rules_match_apriori_road_user_subset(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    import pandas as pd
+    from mlxtend.frequent_patterns import association_rules
+    from utility.targeted_mining import RULE_METRIC_COLUMNS, mine_targeted_rules
+
+    cols = mining.get_selected_columns()
+    df_trans = mining.encode_transactions(mining.load_fatality_table(cols), cols).select(cols, dense=True)
+    df_trans = df_trans.iloc[:20000].reset_index(drop=True)
+
+    # What the targeted miner replaces: every frequent itemset, then the rules filtered to road_user consequents
+    rules = association_rules(mining.run_apriori(df_trans, min_support=0.02), metric="lift", min_threshold=1.0)
+    expected = rules[rules["consequents"].apply(lambda c: len(c) == 1 and next(iter(c)).startswith("road_user="))
+                     & (rules["confidence"] >= 0.6)]
+    targeted = mine_targeted_rules(df_trans, "road_user=", min_support=0.02, min_confidence=0.6, min_lift=1.0)
+
+    assert len(expected) > 0
+
+    def by_rule(rules):
+        # frozensets do not sort, so index the rules by their sorted items
+        index = [(tuple(sorted(a)), tuple(sorted(c))) for a, c in zip(rules["antecedents"], rules["consequents"])]
+        return rules.set_axis(pd.MultiIndex.from_tuples(index)).sort_index()[RULE_METRIC_COLUMNS]
+
+    expected, targeted = by_rule(expected), by_rule(targeted)
+    assert expected.index.equals(targeted.index)
+    np.testing.assert_allclose(targeted.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9)
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    # The benchmark's scratch database on the local server; never the project database
+    psycopg2 = pytest.importorskip("psycopg2")
+    from utility import pg_utils
+    from utility.benchmark import BENCH_PG_DATABASE
+
+    monkeypatch.setitem(pg_utils.DB_CONFIG, "database", BENCH_PG_DATABASE)
+    try:
+        psycopg2.connect(**pg_utils.DB_CONFIG).close()
+    except psycopg2.Error as e:
+        pytest.skip(f"no local PostgreSQL database `{BENCH_PG_DATABASE}`: {e}")
+    previous = pg_utils.get_backend()
+    pg_utils.set_backend("postgres")
+    module = importlib.import_module("02_PostgreSQL")
+    monkeypatch.setattr(module, "OUTPUT_DIR", os.path.join(REPO_ROOT, "DB_files_export"))
+    module.drop_all_tables()
+    module.create_all_tables()
+    module.import_all_csv_to_db()
+    yield module
+    pg_utils._backend = previous
+
+
+def test_postgres_support_counts_match_apriori(postgres, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    from utility.pg_mining import PostgresSupportCounter
+
+    cols = ["gender", "age_group", "road_user", "day_type", "time_of_day", "state"]
+    dense = mining.encode_transactions(mining.load_fatality_table(cols), cols).select(cols, dense=True)
+    counter = PostgresSupportCounter(min_support=0.05)
+
+    # The same rows as the inner-joined star schema, and the smallest count that reaches the support
+    assert counter.n_rows == len(dense)
+    assert (counter.min_count - 1) / counter.n_rows < 0.05 <= counter.min_count / counter.n_rows
+
+    expected = _itemsets(mining.run_apriori(dense, min_support=0.05))
+    assert max(len(items) for items in expected) >= 3  # candidates beyond the pair level are generated
+    assert _itemsets(counter.frequent_itemsets(cols)) == expected
+    # Column sets counted for the first call are reused for a subset of the columns
+    assert _itemsets(counter.frequent_itemsets(cols[:4])) == _itemsets(mining.run_apriori(dense[
+        [c for c in dense.columns if c.split("=", 1)[0] in cols[:4]]], min_support=0.05))
+
+
+def test_itemset_cache_and_threshold_sweep_match_fresh_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    from utility.itemset_cache import cached_frequent_itemsets
+
+    cols = mining.get_selected_columns()
+    dense = mining.encode_transactions(mining.load_fatality_table(cols), cols).select(cols, dense=True)
+    dense = dense.iloc[:5000].reset_index(drop=True)
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def miner(df_trans, min_support):
+        calls.append(min_support)
+        return mining.run_apriori(df_trans, min_support=min_support)
+
+    cached_frequent_itemsets(dense, 0.05, miner, cache_dir=cache_dir)
+    # A higher support is a filter of the lower-support itemsets
+    higher = cached_frequent_itemsets(dense, 0.1, miner, cache_dir=cache_dir)
+    assert calls == [0.05]
+    assert _itemsets(higher) == _itemsets(mining.run_apriori(dense, min_support=0.1))
+    # Other data (one row changed) has another fingerprint and is mined again
+    changed = dense.copy()
+    changed.iloc[0] = ~changed.iloc[0]
+    cached_frequent_itemsets(changed, 0.1, miner, cache_dir=cache_dir)
+    assert calls == [0.05, 0.1]
+
+    supports, confidences, lifts = [0.05, 0.1], [0.5, 0.7], [1.0, 1.2]
+    summary, _ = mining.sweep_thresholds(dense, supports, confidences, lifts, algorithm="eclat", cache_dir=cache_dir)
+    for row in summary.itertuples(index=False):
+        rules = mining.mine_association_rules(dense, min_support=row.min_support, min_confidence=row.min_confidence,
+                                              min_lift=row.min_lift, top_k=None, algorithm="eclat")
+        assert row.rule_count == len(rules)
+    assert summary["rule_count"].nunique() > 1
+
+
+def test_rule_store_round_trip_and_lookups(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    import pandas as pd
+    from utility.rule_store import RuleStore
+
+    jobs = {"base": mining.get_selected_columns(), "heavy": mining.get_selected_columns(vehicle="heavy")}
+    candidates = list(dict.fromkeys(col for cols in jobs.values() for col in cols))
+    item_matrix = mining.encode_transactions(mining.load_fatality_table(candidates), candidates)
+    rules = pd.concat([mining.mine_association_rules(item_matrix.select(cols, dense=True), top_k=None,
+                                                     algorithm="targeted").assign(combo=combo)
+                       for combo, cols in jobs.items()], ignore_index=True)
+
+    store = RuleStore.from_rules(rules)
+    store.save(str(tmp_path / "rules.npz"))
+    loaded = RuleStore.load(str(tmp_path / "rules.npz"))
+    frame = loaded.to_frame()
+    assert frame.equals(store.to_frame())
+
+    # Same rules and metrics as were mined
+    def key(df):
+        return sorted((combo, tuple(sorted(a)), tuple(sorted(c)), round(lift, 12))
+                      for combo, a, c, lift in zip(df["combo"], df["antecedents"], df["consequents"], df["lift"]))
+    assert len(loaded) == len(rules) and key(frame) == key(rules)
+
+    item = "age_group=65+"
+    mentions = frame[[item in a or item in c for a, c in zip(frame["antecedents"], frame["consequents"])]]
+    assert len(mentions) > 0
+    assert loaded.rules_with(item).tolist() == sorted(mentions["rule_id"])
+    as_antecedent = frame[[item in a for a in frame["antecedents"]]]
+    assert loaded.rules_with(item, side="antecedent").tolist() == sorted(as_antecedent["rule_id"])
+
+    min_lift = mentions["lift"].median()
+    expected = mentions[mentions["lift"] >= min_lift].reset_index(drop=True)
+    assert 0 < len(expected) < len(mentions)
+    assert loaded.query(contains=[item], min_lift=min_lift).equals(expected)
+    assert loaded.query(contains=[item], min_lift=min_lift, combo="heavy").equals(
+        expected[expected["combo"] == "heavy"].reset_index(drop=True))
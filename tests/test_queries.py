@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# test_queries.py
+import asyncio
+import csv
+import importlib
+import json
+import os
+import subprocess
+import sys
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from conftest import REPO_ROOT
+from utility import pg_utils
+from utility.schemas import BUSINESS_AGGREGATE_NAMES
+from utility.olap import BUSINESS_QUERIES, StarSchema, query_1_5
+
+EXPORT_DIR = os.path.join(REPO_ROOT, "DB_files_export")
+
+
+@pytest.fixture
+def pg(tmp_path, monkeypatch):
+    previous = pg_utils.get_backend()
+    path = str(tmp_path / "project1.sqlite")
+    pg_utils.set_backend("sqlite", path=path)
+    module = importlib.import_module("02_PostgreSQL")
+    monkeypatch.setattr(module, "OUTPUT_DIR", EXPORT_DIR)
+    monkeypatch.setattr(module, "DIMENSION_CACHE_DIR", str(tmp_path / "dim_cache"))
+    monkeypatch.setattr(module, "dimension_cache", {"version": None, "checked_at": 0.0, "tables": {}})
+    module.create_all_tables()
+    module.import_all_csv_to_db()
+    yield module
+    pg_utils._backend = previous
+
+
+def _value(v):
+    # NULL as "", and integral floats (nullable ints in pandas) as ints
+    if v is None:
+        return ""
+    return str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)
+
+
+def _records(df):
+    return sorted(tuple(_value(v) for v in row)
+                  for row in df.astype(object).where(df.notna(), None).itertuples(index=False))
+
+
+def test_decoded_aggregate_matches_joined_sql(pg):
+    joined = pg.query_to_dataframe(
+        "SELECT t.time_of_day, r.road_type, SUM(f.fatality_count) AS total_fatalities "
+        "FROM fact_person_fatality f JOIN dim_time t ON f.time_of_day_id = t.time_of_day_id "
+        "JOIN dim_road r ON f.road_id = r.road_id JOIN dim_date d ON f.date_id = d.date_id "
+        "WHERE d.year = 2024 GROUP BY t.time_of_day, r.road_type")
+    decoded = pg.query_fact_aggregate("fact_person_fatality", {"time_of_day_id": ["time_of_day"], "road_id": ["road_type"]},
+                                      "fatality_count", {("dim_date", "year"): 2024}, "total_fatalities")
+    assert list(decoded.columns) == list(joined.columns)
+    assert _records(decoded) == _records(joined)
+
+
+@pytest.mark.parametrize("name", ["1.1", "1.2", "1.3", "1.4", "1.6"])
+def test_business_aggregate_matches_cube_report(pg, name):
+    # utility.olap reproduces the CUBE / ROLLUP scripts, which SQLite cannot run
+    expected = BUSINESS_QUERIES[name](StarSchema.load(EXPORT_DIR))
+    result = pg.business_aggregate(name)
+    assert list(result.columns) == list(expected.columns)
+    assert _records(result) == _records(expected)
+
+
+def test_olap_1_5_leaves_null_states_out(tmp_path):
+    # NULL state and LGA codes are -1, which must not index the last category
+    pd.DataFrame({"date_id": [1], "year": [2023]}).to_csv(tmp_path / "dim_date.csv", index=False)
+    pd.DataFrame({"location_id": [1, 2, 3], "state": ["NSW", None, "Vic"], "lga_name": ["A", None, "B"],
+                  "population_2023_lga": [1000, 500, 2000]}).to_csv(tmp_path / "dim_location.csv", index=False)
+    pd.DataFrame({"fact_crash_id": [1, 2, 3], "date_id": [1, 1, 1], "location_id": [1, 2, 3],
+                  "number_fatalities": [1, 7, 1]}).to_csv(tmp_path / "fact_fatal_crash.csv", index=False)
+    result = query_1_5(StarSchema.load(str(tmp_path)))
+    assert result.values.tolist() == [["NSW", 1, 1000, Decimal("100.00")], ["Vic", 1, 2000, Decimal("50.00")]]
+
+
+def test_read_api_and_dw_query_use_the_aggregate(pg, tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    from utility.read_api import AggregateQueries, ConnectionPool, ReadAPI, load_business_queries
+    pool = ConnectionPool(2)
+    engine = AggregateQueries(pool)
+    statements, checksums = [], []
+    execute, checksum = pool._execute, pool._checksum
+    monkeypatch.setattr(pool, "_execute", lambda statement, params=None: statements.append(statement) or execute(statement, params))
+    monkeypatch.setattr(pool, "_checksum", lambda table: checksums.append(table) or checksum(table))
+    api = ReadAPI(pool, load_business_queries(), engine)
+
+    async def requests():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(pool.executor, engine.refresh)
+        refreshed = len(checksums)
+        bodies = [body for _, body in [await api.handle("/queries/1.1", {}), await api.handle("/queries/1.1", {})]]
+        return refreshed, bodies
+
+    try:
+        refreshed, bodies = asyncio.run(requests())
+    finally:
+        pool.close()
+    assert refreshed > 0 and len(checksums) == refreshed  # requests never re-check the dimensions
+    assert pool.executions > 0 and statements and not any("CUBE" in s.upper() for s in statements)
+    body = json.loads(bodies[0])
+    assert json.loads(bodies[1]) == body
+
+    out = tmp_path / "1.1.csv"
+    dw = importlib.import_module("dw")
+    dw.main(["--sqlite-path", pg_utils.get_backend().path, "query", os.path.join(REPO_ROOT, "sql", "1.1.sql"),
+             "--engine", "aggregate", "--format", "csv", "--out", str(out)])
+    with open(out, newline="", encoding="utf-8") as f:
+        header, *rows = list(csv.reader(f))
+
+    expected = pg.business_aggregate("1.1")
+    assert body["columns"] == header == list(expected.columns)
+    assert sorted(tuple(map(str, row)) for row in body["rows"]) == sorted(map(tuple, rows)) == _records(expected)
+
+
+def test_read_api_coalesces_identical_requests(pg, monkeypatch):
+    import time
+    from utility.read_api import ConnectionPool, ReadAPI
+
+    pool = ConnectionPool(4)
+    execute = pool._execute
+    # Slow enough that every request arrives while the first is in flight
+    monkeypatch.setattr(pool, "_execute", lambda statement, params=None: time.sleep(0.3) or execute(statement, params))
+    api = ReadAPI(pool, {})
+
+    async def requests():
+        return await asyncio.gather(*(api.handle("/tables/dim_road", {"limit": "5"}) for _ in range(5)))
+
+    try:
+        bodies = [body for _, body in asyncio.run(requests())]
+    finally:
+        pool.close()
+    assert pool.executions == 1 and api.stats["coalesced"] == 4
+    assert len(set(bodies)) == 1 and len(json.loads(bodies[0])["rows"]) == 5
+
+
+def test_read_api_500_does_not_leak_the_error(pg, monkeypatch, capsys):
+    from utility import metrics
+    from utility.read_api import ConnectionPool, ReadAPI
+
+    def failing(statement, params=None):
+        raise RuntimeError(f"syntax error near {statement!r}")
+
+    monkeypatch.setattr(metrics.get_recorder(), "quiet", False)
+    pool = ConnectionPool(1)
+    monkeypatch.setattr(pool, "_execute", failing)
+    api = ReadAPI(pool, {})
+
+    async def request():
+        server = await asyncio.start_server(api.serve_connection, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b"GET /tables/dim_road HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+
+    try:
+        response = asyncio.run(request())
+    finally:
+        pool.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 500") and body == b"Internal server error"
+    assert "syntax error near 'SELECT" in capsys.readouterr().out  # logged for the operator
+    assert api.stats["errors"] == 1
+
+
+def test_edited_business_script_runs_as_sql(pg, tmp_path):
+    from utility.read_api import AggregateQueries, ConnectionPool
+    sql_dir = tmp_path / "sql"
+    sql_dir.mkdir()
+    for name in ["1.1", "1.2"]:
+        with open(os.path.join(REPO_ROOT, "sql", f"{name}.sql"), "r", encoding="utf-8") as f:
+            (sql_dir / f"{name}.sql").write_text(f.read(), encoding="utf-8")
+    (sql_dir / "1.1.sql").write_text("SELECT 2023 AS year;\n", encoding="utf-8")
+
+    pool = ConnectionPool(1)
+    try:
+        assert AggregateQueries(pool, str(sql_dir)).queries == {"1.2"}
+    finally:
+        pool.close()
+
+    out = tmp_path / "1.1.csv"
+    importlib.import_module("dw").main(["--sqlite-path", pg_utils.get_backend().path, "query", str(sql_dir / "1.1.sql"),
+                                        "--engine", "aggregate", "--format", "csv", "--out", str(out)])
+    assert out.read_text(encoding="utf-8").split() == ["year", "2023"]
+
+
+def test_export_rewrites_only_changed_tables(pg, tmp_path, monkeypatch):
+    folder = tmp_path / "export"
+    written = []
+    write_atomic = pg.write_atomic
+    monkeypatch.setattr(pg, "write_atomic",
+                        lambda path, write: written.append(os.path.basename(path)) or write_atomic(path, write))
+
+    def export(force=False):
+        written.clear()
+        pg.preview_all_tables(folder=str(folder), force=force)
+        return sorted(name for name in written if name != pg.EXPORT_MANIFEST)
+
+    tables = export()
+    assert "dim_road.csv" in tables and "fact_person_fatality.csv" in tables
+    files = {name: (folder / name).read_bytes() for name in tables}
+    manifest = pg.load_export_manifest(str(folder))
+
+    assert export() == []
+
+    pg_utils.insert_data("UPDATE dim_road SET road_type = %s WHERE road_id = %s", ("Edited Road", 1))
+    assert export() == ["dim_road.csv"]
+    changed = pg.load_export_manifest(str(folder))
+    assert [name for name in manifest if changed[name] != manifest[name]] == ["dim_road"]
+    assert all((folder / name).read_bytes() == files[name] for name in tables if name != "dim_road.csv")
+    assert b"Edited Road" in (folder / "dim_road.csv").read_bytes()
+
+    assert export(force=True) == tables
+    assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+
+
+def test_dw_query_outside_the_aggregates_starts_without_pandas(pg):
+    assert sorted(pg.BUSINESS_AGGREGATES) == BUSINESS_AGGREGATE_NAMES
+    script = ("import sys, dw; dw.main(sys.argv[1:]); "
+              "assert 'pandas' not in sys.modules, 'pandas was imported'")
+    result = subprocess.run([sys.executable, "-c", script, "--sqlite-path", pg_utils.get_backend().path,
+                             "query", os.path.join("sql", "1.5.sql"), "--format", "csv"],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[0] == "state,total_deaths_2023,total_population,death_rate_per_100k_2023"
+
+
+def test_dw_exits_quietly_when_the_pipe_closes(pg):
+    proc = subprocess.Popen([sys.executable, "dw.py", "--sqlite-path", pg_utils.get_backend().path,
+                             "query", "-c", "SELECT * FROM fact_person_fatality"],
+                            cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    proc.stdout.close()  # like `| head` exiting before dw.py writes
+    stderr = proc.stderr.read().decode()
+    assert proc.wait() == 0 and stderr == ""
+
+
+def test_sa4_and_state_rates_match_hand_computed_values(tmp_path):
+    etl = importlib.import_module("01_ETL_template")
+    from utility.schemas import TABLE_IMPORT_ORDER, TABLE_SCHEMAS
+
+    # LGA A: 3 crash records in SA4 X and 1 in Y; LGA B: 2 in Y; LGA C: none
+    crashes = pd.DataFrame({"state": ["NSW"] * 6, "national_lga_name_2021": ["A"] * 4 + ["B"] * 2,
+                            "sa4_name_2021": ["X", "X", "X", "Y", "Y", "Y"]})
+    lgas = pd.DataFrame({"state": ["NSW"] * 3, "geo_name": ["A", "B", "C"], "year": [2023] * 3,
+                         "population": [1000, 400, 300]})
+    states = pd.DataFrame({"geo_level": ["state"], "state": ["NSW"], "geo_name": ["NSW"], "year": [2023],
+                           "population": [2000]})
+    dwellings = pd.DataFrame({"LGA_EN": ["A", "B", "C"], "dwelling_records": [400, 200, 100]})
+    geo = etl.generate_geo_denominator(crashes, lgas, states, dwellings)
+
+    previous = pg_utils.get_backend()
+    pg_utils.set_backend("sqlite", path=str(tmp_path / "rates.sqlite"))
+    try:
+        for table in TABLE_IMPORT_ORDER:
+            pg_utils.create_table(table, TABLE_SCHEMAS[table])
+        importlib.import_module("02_PostgreSQL").insert_dataframe("geo_denominator", geo)
+        pg_utils.insert_many("INSERT INTO dim_location (location_id, state, lga_name, sa4_name, population_2023_lga) "
+                             "VALUES (%s, %s, %s, %s, %s)",
+                             [(1, "NSW", "A", "X", 1000), (2, "NSW", "A", "Y", 1000), (3, "NSW", "B", "Y", 400)])
+        pg_utils.insert_many("INSERT INTO dim_date (date_id, year) VALUES (%s, %s)", [(1, 2023), (2, 1995)])
+        pg_utils.insert_many("INSERT INTO fact_fatal_crash (fact_crash_id, crash_id, date_id, location_id, "
+                             "number_fatalities) VALUES (%s, %s, %s, %s, %s)",
+                             [(1, 1, 1, 1, 3), (2, 2, 1, 2, 5), (3, 3, 1, 3, 8), (4, 4, 2, 1, 2)])
+
+        rows, columns = pg_utils.death_rates("sa4", 2023)
+        sa4 = {row[1]: (row[3], row[4], float(row[5])) for row in rows}
+        # X = 3/4 of A; Y = 1/4 of A + B; C has no SA4
+        assert sa4 == {"X": (750, 3, 400.0), "Y": (650, 13, 2000.0), etl.UNALLOCATED_SA4: (300, 0, 0.0)}
+
+        # State: the ABS total, while sql/1.5 sums the distinct LGAs of dim_location (1000 + 400)
+        (state_row,), _ = pg_utils.death_rates("state", 2023)
+        assert (state_row[3], state_row[4], float(state_row[5])) == (2000, 16, 800.0)
+        with open(os.path.join(REPO_ROOT, "sql", "1.5.sql"), encoding="utf-8") as f:
+            (q15,), _ = pg_utils.query_data(f.read().strip().rstrip(";"))
+        assert (q15[1], q15[2], round(float(q15[3]), 2)) == (16, 1400, 1142.86)
+
+        # Before the population series starts, the earliest denominators are used and reported
+        (early,), columns = pg_utils.death_rates("state", 1995)
+        assert (early[columns.index("population_year")], early[4], float(early[5])) == (2023, 2, 100.0)
+    finally:
+        pg_utils._backend = previous
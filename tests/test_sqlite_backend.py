@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# test_sqlite_backend.py
+import importlib
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from utility import pg_utils
+from utility.schemas import TABLE_IMPORT_ORDER
+
+EXPORT_DIR = os.path.join(REPO_ROOT, "DB_files_export")
+
+
+def _csv_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        header, *rows = f.read().splitlines()
+    return header, sorted(rows)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    previous = pg_utils.get_backend()
+    pg_utils.set_backend("sqlite", path=str(tmp_path / "project1.sqlite"))
+    yield
+    pg_utils._backend = previous
+
+
+def test_boolean_columns_read_back_as_bool(sqlite_db):
+    pg_utils.create_table("flags", "flag_id INTEGER PRIMARY KEY, flag BOOLEAN")
+    pg_utils.insert_many("INSERT INTO flags (flag_id, flag) VALUES (%s, %s)", [(1, True), (2, False), (3, None)])
+    rows, _ = pg_utils.query_data("SELECT flag FROM flags ORDER BY flag_id")
+    assert [value for value, in rows] == [True, False, None]
+    assert all(isinstance(value, bool) for value, in rows[:2])  # not 1 / 0
+
+
+def test_translate_leaves_literals_and_comments_alone():
+    statement = ("SELECT v::numeric, '100%s', 'a::b', 'it''s %s' -- keep %s and x::int\n"
+                 "FROM t /* %s::text */ WHERE k = %s::int AND \"c::d\" = %s")
+    assert pg_utils._SQLiteCursor.translate(statement) == (
+        "SELECT v, '100%s', 'a::b', 'it''s %s' -- keep %s and x::int\n"
+        "FROM t /* %s::text */ WHERE k = ? AND \"c::d\" = ?")
+
+
+def test_round_trip_matches_postgres_export(sqlite_db, tmp_path, monkeypatch):
+    # DB_files_export was written from PostgreSQL; loading it into SQLite and exporting must give the same
+    # lines (SQLite returns INTEGER PRIMARY KEY tables in key order, so the row order may differ)
+    pg = importlib.import_module("02_PostgreSQL")
+    monkeypatch.setattr(pg, "OUTPUT_DIR", EXPORT_DIR)
+    pg.create_all_tables()
+    pg.import_all_csv_to_db()
+    pg.preview_all_tables(None, folder=str(tmp_path / "export"))
+
+    for table in TABLE_IMPORT_ORDER:
+        if os.path.exists(os.path.join(EXPORT_DIR, f"{table}.csv")):
+            assert _csv_lines(os.path.join(EXPORT_DIR, f"{table}.csv")) == \
+                _csv_lines(tmp_path / "export" / f"{table}.csv"), table
+
+
+def test_table_checksum_ignores_row_order_but_not_duplicates(sqlite_db):
+    rows = [(1, "a"), (2, "b"), (3, "c")]
+    for table, data in [("t1", rows), ("t2", rows[::-1]), ("t3", rows + [(4, "a")]), ("t4", rows + [(3, "c")])]:
+        pg_utils.create_table(table, "k INTEGER, v TEXT")
+        pg_utils.insert_many(f"INSERT INTO {table} (k, v) VALUES (%s, %s)", data)
+    checksums = {table: pg_utils.table_checksum(table) for table in ("t1", "t2", "t3", "t4")}
+    assert checksums["t1"] == checksums["t2"]
+    assert checksums["t4"][0] == 4 and len({checksums["t1"][1], checksums["t3"][1], checksums["t4"][1]}) == 3
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# approximate_mining.py
+# Approximate association rule mining on a stratified sample of the transactions.
+# Rules are mined on the sample and reported with confidence intervals for support,
+# confidence and lift; an optional pass recounts the surviving rules exactly on the full data.
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from utility.eclat import pack_item_bitsets
+from utility.targeted_mining import rule_metrics
+
+
+def stratified_sample(df_trans: pd.DataFrame, strata_prefix: str = "road_user=", fraction: float = 0.1,
+                      random_state: int = 0) -> pd.DataFrame:
+    """
+    Sample `fraction` of the rows within each stratum, so the strata keep their proportions.
+    A row's stratum is its item starting with `strata_prefix` (rows without one form their own stratum).
+    """
+    strata_cols = [c for c in df_trans.columns if str(c).startswith(strata_prefix)]
+    if strata_cols:
+        flags = np.asarray(df_trans[strata_cols], dtype=bool)
+        strata = np.where(flags.any(axis=1), flags.argmax(axis=1), -1)
+    else:
+        strata = np.zeros(len(df_trans), dtype=int)
+
+    rng = np.random.default_rng(random_state)
+    picked = []
+    for stratum in np.unique(strata):
+        rows = np.flatnonzero(strata == stratum)
+        size = max(int(round(fraction * len(rows))), 1)
+        picked.append(rng.choice(rows, size=size, replace=False))
+    return df_trans.take(np.sort(np.concatenate(picked))).reset_index(drop=True)
+
+
+# Metrics reported with `<metric>_low` / `<metric>_high` interval columns
+INTERVAL_METRICS = ["support", "confidence", "lift"]
+
+
+def wilson_interval(p, n, z: float = 1.96):
+    """
+    Wilson score interval for proportions `p` observed over `n` trials (arrays allowed).
+    """
+    p, n = np.asarray(p, dtype=float), np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centre = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+        half = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return np.clip(centre - half, 0, 1), np.clip(centre + half, 0, 1)
+
+
+def add_confidence_intervals(rules: pd.DataFrame, n_rows: int, z: float = 1.96) -> pd.DataFrame:
+    """
+    Add `<metric>_low` / `<metric>_high` columns for support, confidence and lift.
+
+    Support is a proportion of the `n_rows` sampled transactions; confidence a proportion of the
+    sampled transactions containing the antecedent. With the sample stratified on the consequent
+    items their support is fixed by design, so the lift interval is the confidence interval
+    divided by the consequent support.
+    """
+    rules = rules.copy()
+    rules["support_low"], rules["support_high"] = wilson_interval(rules["support"], n_rows, z)
+    antecedent_rows = np.round(rules["antecedent support"].to_numpy(dtype=float) * n_rows)
+    rules["confidence_low"], rules["confidence_high"] = wilson_interval(rules["confidence"], antecedent_rows, z)
+    consequent_support = rules["consequent support"].to_numpy(dtype=float)
+    rules["lift_low"] = rules["confidence_low"] / consequent_support
+    rules["lift_high"] = rules["confidence_high"] / consequent_support
+    return rules
+
+
+def recount_rules(rules: pd.DataFrame, df_trans: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recompute the metrics of `rules` exactly on `df_trans` (packed bitsets, one AND per item).
+    """
+    bitsets, labels = pack_item_bitsets(df_trans)
+    index = {label: i for i, label in enumerate(labels)}
+    n_rows = len(df_trans)
+
+    def count(itemset):
+        bits = np.bitwise_and.reduce(bitsets[[index[item] for item in itemset]], axis=0)
+        return int(np.bitwise_count(bits).sum())
+
+    antecedents, consequents = list(rules["antecedents"]), list(rules["consequents"])
+    sAC = np.array([count(a | c) for a, c in zip(antecedents, consequents)]) / n_rows
+    sA = np.array([count(a) for a in antecedents]) / n_rows
+    sC = np.array([count(c) for c in consequents]) / n_rows
+    exact = rule_metrics(antecedents, consequents, sAC, sA, sC)
+    exact.index = rules.index
+    return exact
+
+
+def mine_approximate(df_trans: pd.DataFrame, rule_miner: Callable, target_rhs: str = "road_user=",
+                     sample_fraction: float = 0.1, random_state: int = 0, z: float = 1.96,
+                     verify: bool = False, min_support: float = 0.02, min_confidence: float = 0.60,
+                     min_lift: float = 1.0, **mine_kwargs) -> pd.DataFrame:
+    """
+    Run `rule_miner` (e.g. mine_association_rules) on a sample stratified by the target items.
+
+    Without `verify` the sample metrics come back with confidence-interval columns.
+    With `verify` the surviving rules are recounted on the full data, their metrics replaced
+    by the exact values, and rules no longer meeting the thresholds are dropped. The sample
+    estimates and their intervals are kept as `sample_<metric>`, `sample_<metric>_low` and
+    `sample_<metric>_high`, since the intervals describe the sample, not the exact values.
+    Rules that only reach the thresholds on the full data can still be missed.
+    """
+    sample = stratified_sample(df_trans, strata_prefix=target_rhs, fraction=sample_fraction,
+                               random_state=random_state)
+    rules = rule_miner(sample, target_rhs=target_rhs, min_support=min_support,
+                      min_confidence=min_confidence, min_lift=min_lift, **mine_kwargs)
+    rules = add_confidence_intervals(rules, len(sample), z=z)
+    if not verify:
+        return rules
+
+    exact = recount_rules(rules, df_trans)
+    sample_columns = [col for metric in INTERVAL_METRICS for col in (metric, f"{metric}_low", f"{metric}_high")]
+    sample = rules[sample_columns].add_prefix("sample_")
+    rules = rules.drop(columns=[col for col in sample_columns if col not in INTERVAL_METRICS])
+    for col in exact.columns.drop(["antecedents", "consequents"]):
+        rules[col] = exact[col]
+    rules = pd.concat([rules, sample], axis=1)
+    rules = rules[(rules["support"] >= min_support) & (rules["confidence"] >= min_confidence)
+                  & (rules["lift"] >= min_lift)]
+    return rules.sort_values(by=["lift", "confidence"], ascending=False)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# benchmark.py
+# End-to-end benchmark of the pipeline stages (ETL loaders, cleaning, dimension builders,
+# CSV export, fact tables streamed in blocks, database import, business queries, rule mining)
+# on synthetic sources at several scales. Each stage reports wall time, peak memory and rows per second;
+# results are written as JSON so runs can be compared between commits.
+#
+#   python -m utility.benchmark --scales 5000 55000 --db sqlite
+#   python -m utility.benchmark --compare bench_results/old.json bench_results/new.json
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utility import metrics, pg_utils
+from utility.synthetic_sources import generate_sources
+
+RESULTS_DIR = "bench_results"
+WORK_DIR = os.path.join(RESULTS_DIR, "work")
+DEFAULT_SCALES = [5000, 55000]
+SQL_DIR = "sql"
+# PostgreSQL database the benchmark may overwrite (must exist; never the project database)
+BENCH_PG_DATABASE = "project1_bench"
+
+
+# ---------- Measurement ----------
+class StageTimer:
+    """
+    Collects one record per measured stage: seconds, peak memory (MB) and rows per second.
+
+    Stages are measured through utility.metrics, so stages opened by the code under test nest
+    correctly. Peak memory is the process peak RSS where the kernel allows resetting it
+    (`peak_delta_mb` is the growth over the RSS at stage start); otherwise the tracemalloc
+    peak of Python allocations (slower, and excludes some native buffers).
+    """
+
+    def __init__(self, scale: int, quiet: bool = True):
+        self.scale = scale
+        self.quiet = quiet
+        self.records = []
+        recorder = metrics.get_recorder()
+        if recorder.memory_source is None:
+            recorder.memory_source = "tracemalloc"
+        self.memory_source = recorder.memory_source
+
+    @contextmanager
+    def stage(self, name: str, rows=None):
+        """
+        Measure the enclosed block. `rows` is a count, or a callable evaluated afterwards
+        (e.g. the length of the stage's output).
+        """
+        start_mb = metrics.rss_mb("VmRSS") if self.memory_source == "rss" else 0.0
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull if self.quiet else sys.stdout):
+            with metrics.stage(name) as current:
+                yield
+        seconds, peak_mb = current.seconds, current.peak_mb or 0.0
+
+        count = rows() if callable(rows) else rows
+        self.records.append({
+            "scale": self.scale, "stage": name, "seconds": round(seconds, 4), "peak_mb": round(peak_mb, 1),
+            "peak_delta_mb": round(peak_mb - start_mb, 1), "rows": count,
+            "rows_per_s": round(count / seconds, 1) if count and seconds > 0 else None,
+        })
+        print(f"  {name:<45} {seconds:9.3f} s  {peak_mb:9.1f} MB (+{peak_mb - start_mb:.1f})"
+              f"  {count if count is not None else '-':>9} rows")
+
+
+# ---------- Stages ----------
+def _fresh_database(db: str, folder: str):
+    """
+    Point pg_utils at a scratch database: a new SQLite file in `folder`, or BENCH_PG_DATABASE
+    on the configured PostgreSQL server (its project tables are dropped by the load stage).
+    """
+    if db == "sqlite":
+        path = os.path.join(folder, "bench.sqlite")
+        if os.path.exists(path):
+            os.remove(path)
+        pg_utils.set_backend("sqlite", path=path)
+    else:
+        pg_utils.DB_CONFIG["database"] = BENCH_PG_DATABASE
+        pg_utils.set_backend("postgres")
+
+
+def run_scale(scale: int, db: str = "sqlite", query_engine: str = "auto", seed: int = 0, quiet: bool = True,
+              fact_block_rows: int = None) -> list:
+    """
+    Run every stage once on `scale` synthetic fatalities and return the stage records.
+    Fact tables are written in blocks of `fact_block_rows` source rows (default: the ETL's FACT_BLOCK_ROWS).
+    With query_engine="auto" the business queries run on PostgreSQL, or on the in-process
+    OLAP engine when the database is SQLite (which has no CUBE / ROLLUP).
+    """
+    if query_engine == "auto":
+        query_engine = "db" if db == "postgres" else "olap"
+    etl = importlib.import_module("01_ETL_template")
+    pg = importlib.import_module("02_PostgreSQL")
+    mining = importlib.import_module("03_Association_Rule_Mining")
+    fact_block_rows = fact_block_rows or etl.FACT_BLOCK_ROWS
+
+    source_dir = os.path.join(WORK_DIR, f"sources_{scale}_{seed}")
+    output_dir = os.path.join(WORK_DIR, f"output_{scale}_{seed}")
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(source_dir, "bitre_fatalities_dec2024.xlsx")):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            generate_sources(source_dir, n_fatalities=scale, seed=seed)
+    etl.DATA_DIR, etl.OUTPUT_DIR, pg.OUTPUT_DIR = source_dir, output_dir, output_dir
+
+    timer = StageTimer(scale, quiet=quiet)
+    print(f"\n🚀 Scale {scale} ({timer.memory_source} peak memory, fact blocks of {fact_block_rows} rows)")
+
+    # ETL: loaders and cleaning
+    with timer.stage("load_fatal_crash_data", rows=lambda: len(raw_crash)):
+        raw_crash = etl.load_fatal_crash_data()
+    with timer.stage("load_fatality_data", rows=lambda: len(raw_fatality)):
+        raw_fatality = etl.load_fatality_data()
+    with timer.stage("load_dwelling_data", rows=lambda: len(dwelling)):
+        dwelling = etl.load_dwelling_data()
+    populations = {}
+    for sheet in ["Table 1", "Table 2", "Table 3", "Table 4"]:
+        with timer.stage(f"load_population_table[{sheet}]", rows=lambda: len(populations[sheet])):
+            populations[sheet] = etl.load_population_table(sheet)
+    with timer.stage("load_population_years", rows=lambda: len(lga_years) + len(state_remote_years)):
+        lga_years = etl.load_lga_population()
+        state_remote_years = etl.load_state_remoteness_population()
+    with timer.stage("common_clean_steps[crash]", rows=len(raw_crash)):
+        crash = etl.common_clean_steps(raw_crash)
+    with timer.stage("common_clean_steps[fatality]", rows=len(raw_fatality)):
+        fatality = etl.common_clean_steps(raw_fatality)
+
+    # ETL: dimensions and facts
+    dim_generators = {
+        "dim_location": lambda: etl.generate_dim_location(crash, populations["Table 1"], populations["Table 2"],
+                                                          populations["Table 3"], dwelling),
+        "dim_road": lambda: etl.generate_dim_road(crash),
+        "dim_vehicle": lambda: etl.generate_dim_vehicle(crash),
+        "dim_crash_type": lambda: etl.generate_dim_crash_type(crash),
+        "dim_date": lambda: etl.generate_dim_date(crash),
+        "dim_holiday": lambda: etl.generate_dim_holiday(crash),
+        "dim_person": lambda: etl.generate_dim_person(fatality),
+        "dim_time": lambda: etl.generate_dim_time_of_day(crash),
+    }
+    tables = {}
+    for name, func in dim_generators.items():
+        source_rows = len(fatality) if name == "dim_person" else len(crash)
+        with timer.stage(f"generate_{name}", rows=source_rows):
+            tables[name] = func()
+    with timer.stage("generate_geo_denominator", rows=len(crash)):
+        tables["geo_denominator"] = etl.generate_geo_denominator(crash, lga_years, state_remote_years, dwelling)
+    for name, df in tables.items():
+        with timer.stage(f"save_table[{name}]", rows=len(df)):
+            etl.save_table(df, name)
+
+    # Facts are streamed to CSV block by block as in main(), with fatality_wide built from each
+    # fact_person_fatality block, so the peak memory of these stages follows the block size
+    dimensions = {name: df for name, df in tables.items() if name.startswith("dim_")}
+    rows = {}
+    with timer.stage("save_table_blocks[fact_fatal_crash]", rows=lambda: rows["fact_fatal_crash"]):
+        rows.update(etl.save_table_blocks(etl.iter_fact_fatal_crash(crash, dimensions, fact_block_rows),
+                                          "fact_fatal_crash"))
+    with timer.stage("save_table_blocks[fact_person_fatality+wide]", rows=lambda: rows["fact_person_fatality"]):
+        rows.update(etl.save_table_blocks(
+            etl.iter_fact_person_fatality(fatality, dimensions, fact_block_rows), "fact_person_fatality",
+            {"fatality_wide": lambda block: etl.build_fatality_wide(block, dimensions)}))
+    rows.update({name: len(df) for name, df in tables.items()})
+
+    # Database load and business queries
+    _fresh_database(db, output_dir)
+    with timer.stage("drop_all_tables + create_all_tables"):
+        pg.drop_all_tables()
+        pg.create_all_tables()
+    with timer.stage("import_all_csv_to_db", rows=sum(rows[t] for t in pg.TABLE_IMPORT_ORDER)):
+        pg.import_all_csv_to_db()
+
+    if query_engine == "olap":
+        from utility.olap import BUSINESS_QUERIES, StarSchema
+        with timer.stage("olap StarSchema.load", rows=rows["fact_person_fatality"]):
+            star = StarSchema.load(output_dir)
+    for sql_file in sorted(f for f in os.listdir(SQL_DIR) if f.endswith(".sql")):
+        query = sql_file[:-len(".sql")]
+        result = {}
+        with timer.stage(f"sql/{sql_file} [{query_engine if query_engine == 'olap' else db}]",
+                         rows=lambda: result.get("rows")):
+            if query_engine == "olap":
+                result["rows"] = len(BUSINESS_QUERIES[query](star))
+            else:
+                frames = pg.run_sql_file(os.path.join(SQL_DIR, sql_file))
+                result["rows"] = sum(len(df) for df in frames.values() if df is not None)
+                result["failed"] = any(df is None for df in frames.values())
+        if result.get("failed"):
+            timer.records[-1]["error"] = "statement failed"
+            print(f"  ⚠️ {sql_file} failed on {db}")
+
+    # Mining (one combination, default miner)
+    cols = mining.get_selected_columns()
+    with timer.stage("load + encode transactions", rows=rows["fatality_wide"]):
+        data = mining.load_fatality_table(cols, wide_folder=output_dir)
+        df_trans = mining.prepare_transactions_custom(data, cols, algorithm=mining.MINING_ALGORITHM)
+    with timer.stage(f"mine_association_rules[{mining.MINING_ALGORITHM}]", rows=len(df_trans)):
+        mining.mine_association_rules(df_trans, target_rhs="road_user=", top_k=None,
+                                      algorithm=mining.MINING_ALGORITHM)
+    return timer.records
+
+
+# ---------- Reports ----------
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(scales=DEFAULT_SCALES, db: str = "sqlite", query_engine: str = "auto", seed: int = 0,
+                  out: str = None, quiet: bool = True, fact_block_rows: int = None) -> str:
+    """
+    Benchmark every scale and write `{metadata, results}` JSON; returns the file path.
+    """
+    fact_block_rows = fact_block_rows or importlib.import_module("01_ETL_template").FACT_BLOCK_ROWS
+    records = []
+    for scale in scales:
+        records.extend(run_scale(scale, db=db, query_engine=query_engine, seed=seed, quiet=quiet,
+                                 fact_block_rows=fact_block_rows))
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "db": db,
+        "query_engine": query_engine,
+        "seed": seed,
+        "fact_block_rows": fact_block_rows,
+        "scales": list(scales),
+        "results": records,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"bench_{commit}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark results saved to `{out}`")
+    return out
+
+
+def compare_results(baseline_path: str, candidate_path: str) -> pd.DataFrame:
+    """
+    Per-stage and per-scale timing / memory ratios of two benchmark JSON files (candidate / baseline).
+    """
+    frames = []
+    for path in (baseline_path, candidate_path):
+        with open(path, encoding="utf-8") as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]).set_index(["scale", "stage"]))
+    base, cand = frames
+    joined = base[["seconds", "peak_mb"]].join(cand[["seconds", "peak_mb"]], lsuffix="_base", rsuffix="_new",
+                                               how="inner")
+    joined["time_ratio"] = (joined["seconds_new"] / joined["seconds_base"]).round(3)
+    joined["memory_ratio"] = (joined["peak_mb_new"] / joined["peak_mb_base"]).round(3)
+    return joined.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ETL, load, query and mining stages.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="synthetic fatality counts to run")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite",
+                        help="database for the import and SQL stages")
+    parser.add_argument("--query-engine", choices=["auto", "db", "olap"], default="auto",
+                        help="run sql/1.x on the database or on the in-process OLAP engine "
+                             "(auto: the database for postgres, the engine for sqlite)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fact-block-rows", type=int,
+                        help="source rows per fact block (default: DW_FACT_BLOCK_ROWS or 50000)")
+    parser.add_argument("--out", help="output JSON path (default: bench_results/bench_<commit>_<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="show the stages' own console output")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_results(*args.compare).to_string(index=False))
+    else:
+        run_benchmark(args.scales, db=args.db, query_engine=args.query_engine, seed=args.seed, out=args.out,
+                      quiet=not args.verbose, fact_block_rows=args.fact_block_rows)
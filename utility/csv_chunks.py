@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# csv_chunks.py
+# Chunked CSV reading shared by the pre-load validation and the resumable import,
+# so both see exactly the same rows.
+
+import io
+
+import pandas as pd
+
+
+def iter_csv_chunks(file_path: str, chunk_rows: int, start_offset: int = 0):
+    """
+    Read a CSV in chunks of `chunk_rows` records starting at byte `start_offset` (a record boundary).
+    Yields (DataFrame, byte offset just after the chunk); quoted fields may span lines.
+    """
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        offset = max(start_offset, len(header))
+        f.seek(offset)
+        lines, records, in_quotes = [], 0, False
+        for line in f:
+            lines.append(line)
+            offset += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                records += 1
+                if records == chunk_rows:
+                    yield pd.read_csv(io.BytesIO(header + b"".join(lines))), offset
+                    lines, records = [], 0
+        if lines:
+            yield pd.read_csv(io.BytesIO(header + b"".join(lines))), offset
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# eclat.py
+# Vertical (Eclat-style) frequent itemset mining over packed bitsets.
+# Each item's transaction set is stored as rows/8 bytes of uint64 words; support is
+# counted with bitwise AND plus popcount, depth-first.
+
+from itertools import groupby
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def pack_item_bitsets(df_trans: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+    """
+    Pack each boolean item column into a row of uint64 words.
+    Columns are converted one at a time, so a sparse input is never densified as a whole.
+    """
+    n_rows = len(df_trans)
+    n_words = (n_rows + 63) // 64
+    bitsets = np.zeros((df_trans.shape[1], n_words), dtype=np.uint64)
+    as_bytes = bitsets.view(np.uint8)
+    for j, col in enumerate(df_trans.columns):
+        packed = np.packbits(np.asarray(df_trans[col], dtype=bool))
+        as_bytes[j, :len(packed)] = packed
+    return bitsets, list(df_trans.columns)
+
+
+def pack_csc_bitsets(matrix: sparse.spmatrix) -> np.ndarray:
+    """
+    Pack the boolean columns of a sparse matrix into rows of uint64 words straight from
+    the CSC row indices, in the same bit layout as pack_item_bitsets (no dense copy).
+    """
+    csc = sparse.csc_matrix(matrix)
+    n_rows, n_items = csc.shape
+    n_words = (n_rows + 63) // 64
+    bitsets = np.zeros((n_items, n_words), dtype=np.uint64)
+    rows = csc.indices.astype(np.int64)
+    cols = np.repeat(np.arange(n_items, dtype=np.int64), np.diff(csc.indptr))
+    # np.packbits order: row r sets bit 7 - r % 8 of byte r // 8
+    np.bitwise_or.at(bitsets.view(np.uint8).reshape(-1), cols * n_words * 8 + (rows >> 3),
+                     (0x80 >> (rows & 7)).astype(np.uint8))
+    return bitsets
+
+
+class PackedTransactions:
+    """
+    Item bitsets with their "col=value" labels and row count: Eclat's input without
+    a rows x items boolean matrix. `len()` and `columns` mirror the one-hot DataFrame.
+    """
+
+    def __init__(self, bitsets: np.ndarray, labels: List[str], n_rows: int):
+        self.bitsets = bitsets
+        self.labels = list(labels)
+        self.n_rows = n_rows
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def columns(self) -> List[str]:
+        return self.labels
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n_rows, len(self.labels)
+
+
+def eclat(df_trans: Union[pd.DataFrame, PackedTransactions], min_support: float = 0.02,
+          max_len: int = None) -> pd.DataFrame:
+    """
+    Frequent itemsets of a one-hot transaction DataFrame, in the same format as
+    mlxtend's apriori(..., use_colnames=True): columns `support` and `itemsets`.
+
+    Items are "col=value" labels; items of the same source column never co-occur,
+    so each column contributes at most one item to an itemset.
+    `df_trans` may also be a PackedTransactions, which is used as is.
+    """
+    n_rows = len(df_trans)
+    if isinstance(df_trans, PackedTransactions):
+        bitsets, labels = df_trans.bitsets, df_trans.labels
+    else:
+        bitsets, labels = pack_item_bitsets(df_trans)
+    counts = np.bitwise_count(bitsets).sum(axis=1)
+
+    # Frequent single items grouped by their source column
+    frequent = sorted((j for j in range(len(labels)) if counts[j] / n_rows >= min_support),
+                      key=lambda j: labels[j])
+    groups = [list(g) for _, g in groupby(frequent, key=lambda j: labels[j].split("=", 1)[0])]
+
+    supports, itemsets = [], []
+
+    def search(prefix, prefix_bits, start):
+        for g in range(start, len(groups)):
+            for j in groups[g]:
+                bits = prefix_bits & bitsets[j] if prefix_bits is not None else bitsets[j]
+                count = int(np.bitwise_count(bits).sum()) if prefix_bits is not None else int(counts[j])
+                support = count / n_rows
+                if support < min_support:
+                    continue
+                itemset = prefix + [j]
+                supports.append(support)
+                itemsets.append(frozenset(labels[k] for k in itemset))
+                if max_len is None or len(itemset) < max_len:
+                    search(itemset, bits, g + 1)
+
+    search([], None, 0)
+    return pd.DataFrame({"support": supports, "itemsets": itemsets})
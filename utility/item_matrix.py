@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# item_matrix.py
+# Sparse one-hot transaction matrix for association rule mining.
+# Encodes every candidate column once; each parameter combination then slices its items.
+
+import warnings
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utility.eclat import PackedTransactions, pack_csc_bitsets
+
+
+class ItemMatrix:
+    """
+    Rows are transactions (fatalities), columns are "col=value" items.
+    Items are kept in sorted label order, matching mlxtend's TransactionEncoder.
+    """
+
+    def __init__(self, matrix: sparse.csc_matrix, items: List[str], item_columns: List[str]):
+        self.matrix = matrix
+        self.items = items
+        self.item_columns = item_columns
+
+    @classmethod
+    def encode(cls, df: pd.DataFrame, columns: Sequence[str]) -> "ItemMatrix":
+        """
+        Build the item matrix for `columns` in one vectorized pass over categorical codes.
+        Missing values produce no item, and unused categories are dropped.
+        """
+        codes = np.empty((len(df), len(columns)), dtype=np.int64)
+        labels, owners, offsets = [], [], []
+        for j, col in enumerate(columns):
+            values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+            values = values.cat.remove_unused_categories()
+            codes[:, j] = values.cat.codes.to_numpy()
+            offsets.append(len(labels))
+            labels.extend(f"{col}={value}" for value in values.cat.categories)
+            owners.extend([col] * len(values.cat.categories))
+
+        # Shift each column's codes into its own block of item ids
+        valid = codes >= 0
+        item_ids = (codes + np.asarray(offsets, dtype=np.int64))[valid]
+        row_ids = np.nonzero(valid)[0]
+
+        # Renumber items so that columns follow sorted label order
+        order = np.argsort(labels, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        matrix = sparse.csc_matrix(
+            (np.ones(len(row_ids), dtype=bool), (row_ids, rank[item_ids])),
+            shape=(len(df), len(labels)),
+        )
+        return cls(matrix, [labels[i] for i in order], [owners[i] for i in order])
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def item_indices(self, columns: Sequence[str]) -> np.ndarray:
+        """
+        Positions of the items that belong to any of `columns`, in sorted label order.
+        """
+        wanted = set(columns)
+        return np.array([i for i, owner in enumerate(self.item_columns) if owner in wanted], dtype=np.int64)
+
+    def select(self, columns: Sequence[str], dense: bool = False) -> pd.DataFrame:
+        """
+        Slice the items of `columns` as a boolean DataFrame ready for mlxtend's apriori.
+        Returned as a sparse DataFrame unless `dense` is set.
+        """
+        idx = self.item_indices(columns)
+        sub = self.matrix[:, idx]
+        labels = [self.items[i] for i in idx]
+        if dense:
+            return pd.DataFrame(sub.toarray(), columns=labels)
+        with warnings.catch_warnings():
+            # pandas flags the integer fill value 0 of a bool matrix; it is equivalent to False
+            warnings.simplefilter("ignore", FutureWarning)
+            return pd.DataFrame.sparse.from_spmatrix(sub, columns=labels)
+
+    def select_packed(self, columns: Sequence[str]) -> PackedTransactions:
+        """
+        Slice the items of `columns` as packed bitsets for Eclat, straight from the sparse columns.
+        """
+        idx = self.item_indices(columns)
+        return PackedTransactions(pack_csc_bitsets(self.matrix[:, idx]), [self.items[i] for i in idx],
+                                  self.shape[0])
+
+
+class ColumnSubset:
+    """
+    Some item columns of a column-major boolean matrix, read in place (e.g. from shared memory).
+    `subset[label]` is a Series viewing one column, so miners that work column by column
+    (targeted search, Eclat packing, exact recounts) never copy the matrix; `to_frame()`
+    copies the selected columns into a DataFrame for miners that need one (mlxtend's apriori).
+    """
+
+    def __init__(self, matrix: np.ndarray, positions: np.ndarray, labels: List[str]):
+        self.matrix = matrix
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.labels = list(labels)
+        self._index = {label: i for i, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def columns(self) -> List[str]:
+        return self.labels
+
+    @property
+    def shape(self):
+        return len(self), len(self.labels)
+
+    def column(self, j: int) -> np.ndarray:
+        """
+        View of the j-th selected column.
+        """
+        return self.matrix[:, self.positions[j]]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self.column(self._index[key]), name=key, copy=False)
+        idx = [self._index[label] for label in key]
+        return pd.DataFrame(self.matrix[:, self.positions[idx]], columns=list(key))
+
+    def take(self, rows: np.ndarray) -> pd.DataFrame:
+        """
+        Copy of the given rows as a one-hot DataFrame, like DataFrame.take.
+        """
+        return pd.DataFrame(self.matrix[np.ix_(rows, self.positions)], columns=self.labels)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.matrix[:, self.positions], columns=self.labels)
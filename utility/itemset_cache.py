@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# itemset_cache.py
+# On-disk cache of frequent itemsets, keyed by the transaction data, its columns and min_support.
+# A query at a support at or above a cached level is answered by filtering the cached itemsets.
+
+import glob
+import hashlib
+import os
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utility.eclat import PackedTransactions
+
+CACHE_DIR = ".mining_cache"
+
+
+def data_fingerprint(df_trans: pd.DataFrame) -> str:
+    """
+    Hash of the transaction matrix contents and the selected columns.
+    Packed input hashes its bitsets, so it gets its own cache entries.
+    """
+    digest = hashlib.sha256()
+    columns = sorted({label.split("=", 1)[0] for label in df_trans.columns})
+    digest.update("|".join(columns).encode("utf-8"))
+    digest.update("|".join(map(str, df_trans.columns)).encode("utf-8"))
+    if isinstance(df_trans, PackedTransactions):
+        digest.update(str(len(df_trans)).encode("utf-8"))
+        digest.update(np.ascontiguousarray(df_trans.bitsets).tobytes())
+        return digest.hexdigest()[:24]
+    for col in df_trans.columns:
+        digest.update(pd.util.hash_pandas_object(df_trans[col].astype(bool), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:24]
+
+
+class ItemsetCache:
+    """
+    Frequent itemsets stored as `<cache_dir>/<fingerprint>/support_<min_support>.pkl`.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _entries(self, fingerprint: str):
+        """
+        Cached (min_support, path) pairs for one dataset, lowest support first.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, fingerprint, "support_*.pkl")):
+            level = float(os.path.basename(path)[len("support_"):-len(".pkl")])
+            entries.append((level, path))
+        return sorted(entries)
+
+    def get(self, fingerprint: str, min_support: float) -> Optional[pd.DataFrame]:
+        """
+        Itemsets with support >= min_support, from the closest cached run at or below that level.
+        """
+        usable = [(level, path) for level, path in self._entries(fingerprint) if level <= min_support]
+        if not usable:
+            return None
+        level, path = usable[-1]
+        itemsets = pd.read_pickle(path)
+        print(f"♻️ Reusing cached itemsets (min_support={level}) for min_support={min_support}.")
+        return itemsets[itemsets["support"] >= min_support].reset_index(drop=True)
+
+    def put(self, fingerprint: str, min_support: float, itemsets: pd.DataFrame):
+        folder = os.path.join(self.cache_dir, fingerprint)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"support_{min_support!r}.pkl")
+        tmp_path = path + ".tmp"
+        itemsets.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+
+def cached_frequent_itemsets(df_trans: pd.DataFrame, min_support: float, miner: Callable,
+                             cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """
+    Return `miner(df_trans, min_support)` from the cache when possible, mining and storing it otherwise.
+    """
+    cache = ItemsetCache(cache_dir)
+    fingerprint = data_fingerprint(df_trans)
+    itemsets = cache.get(fingerprint, min_support)
+    if itemsets is None:
+        itemsets = miner(df_trans, min_support)
+        cache.put(fingerprint, min_support, itemsets)
+    return itemsets
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+# metrics.py
+# Structured per-stage metrics for the ETL, database and query scripts.
+# Every stage records its duration, rows in / out, peak memory and database round trips;
+# progress messages go through log() so they can be silenced and are kept as events.
+# Records are appended as JSON lines to DW_METRICS_LOG (if set) and summarised as a table.
+#
+#   DW_METRICS_LOG=metrics.jsonl DW_QUIET=1 python 01_ETL_template.py
+#
+# Deliberately free of pandas, so pg_utils can import it cheaply.
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utility.profiling import profiler_from_env
+
+# ---------- Configuration ----------
+# JSON-lines file receiving one record per finished stage and per logged event (None = off)
+METRICS_LOG = os.environ.get("DW_METRICS_LOG")
+# Silence console output (progress messages and the summary table)
+QUIET = os.environ.get("DW_QUIET", "").lower() in ("1", "true", "yes")
+# Measure peak memory with tracemalloc where per-stage RSS peaks are unavailable (adds overhead)
+USE_TRACEMALLOC = os.environ.get("DW_METRICS_TRACEMALLOC", "").lower() in ("1", "true", "yes")
+
+
+# Writing "5" here resets the kernel's peak-RSS counter of this process (Linux only)
+CLEAR_REFS = "/proc/self/clear_refs"
+
+
+# ---------- Memory ----------
+def rss_peak_resettable() -> bool:
+    """
+    Whether reset_rss_peak() can work here; checks without writing anything.
+    """
+    return os.path.exists(CLEAR_REFS) and os.access(CLEAR_REFS, os.W_OK)
+
+
+def reset_rss_peak() -> bool:
+    """
+    Reset the kernel's peak-RSS counter for this process (Linux only).
+    """
+    if not os.path.exists(CLEAR_REFS):
+        return False
+    try:
+        with open(CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb(field: str = "VmHWM") -> float:
+    """
+    Peak (VmHWM) or current (VmRSS) resident memory of this process in MB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+# ---------- Stage Records ----------
+class Stage:
+    """
+    One measured stage. Set `rows_out` (and `rows_in`, if not given up front) inside the block.
+    """
+
+    def __init__(self, name: str, rows_in=None, parent=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.counters = {"db_round_trips": 0, "db_rows_written": 0, "db_rows_read": 0}
+        self.events = 0
+        self.peak_mb = None
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def record(self) -> dict:
+        return {
+            "type": "stage",
+            "stage": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "depth": self.depth,
+            "seconds": round(self.seconds, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "peak_mb": None if self.peak_mb is None else round(self.peak_mb, 1),
+            "events": self.events,
+            **self.counters,
+        }
+
+
+class MetricsRecorder:
+    """
+    Stack of open stages plus the records of finished ones.
+    Nothing is measured or reset until the first stage starts.
+    Each thread has its own stack (e.g. the read API's pool threads), so concurrent stages nest
+    correctly; memory peaks are process-wide and then cover the overlapping stages too.
+    """
+
+    def __init__(self, log_path=METRICS_LOG, quiet: bool = QUIET):
+        self.log_path = log_path
+        self.quiet = quiet
+        self._local = threading.local()
+        self.records = []
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._memory_source = None
+        self._memory_probed = False
+        # Optional utility.profiling.StageProfiler wrapped around stages (DW_PROFILE)
+        self.profiler = profiler_from_env()
+
+    @property
+    def stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @property
+    def memory_source(self):
+        """
+        "rss", "tracemalloc" or None, decided on first use (not at import).
+        """
+        if not self._memory_probed:
+            self.memory_source = "rss" if rss_peak_resettable() else ("tracemalloc" if USE_TRACEMALLOC else None)
+        return self._memory_source
+
+    @memory_source.setter
+    def memory_source(self, source):
+        self._memory_source = source
+        self._memory_probed = True
+
+    # Memory peaks: fold the current peak into every open stage before resetting it
+    def _fold_peak(self):
+        if self.memory_source == "rss":
+            peak = rss_mb("VmHWM")
+        elif self.memory_source == "tracemalloc" and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        else:
+            return
+        for open_stage in self.stack:
+            open_stage.peak_mb = peak if open_stage.peak_mb is None else max(open_stage.peak_mb, peak)
+
+    def _reset_peak(self):
+        if self.memory_source == "rss":
+            if reset_rss_peak():
+                return
+            # clear_refs exists but cannot be written (e.g. a restricted container): the VmHWM
+            # peaks would span the whole process, so fall back to tracemalloc (if enabled)
+            self.memory_source = "tracemalloc" if USE_TRACEMALLOC else None
+            for open_stage in self.stack:
+                open_stage.peak_mb = None
+        if self.memory_source == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def _write(self, record: dict):
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"run": self.run_id, "time": time.time(), **record}, default=str) + "\n")
+
+    @contextmanager
+    def stage(self, name: str, rows_in=None):
+        self._fold_peak()
+        current = Stage(name, rows_in=rows_in, parent=self.stack[-1] if self.stack else None)
+        self.stack.append(current)
+        self._reset_peak()
+        try:
+            if self.profiler is None:
+                yield current
+            else:
+                with self.profiler.profile(name):
+                    yield current
+        finally:
+            self._fold_peak()
+            current.seconds = time.perf_counter() - current.started
+            self.stack.pop()
+            if not self.stack and self.memory_source == "tracemalloc":
+                tracemalloc.stop()
+            record = current.record()
+            self.records.append(record)
+            self._write(record)
+
+    def count(self, counter: str, n: int = 1):
+        for open_stage in self.stack:
+            open_stage.counters[counter] = open_stage.counters.get(counter, 0) + n
+
+    def log(self, message: str = "", **fields):
+        """
+        Progress message: printed unless quiet, and kept as an event of the current stage.
+        """
+        if not self.quiet:
+            print(message)
+        current = self.stack[-1] if self.stack else None
+        if current is not None:
+            for open_stage in self.stack:
+                open_stage.events += 1
+        if fields:
+            self._write({"type": "event", "stage": current.name if current else None,
+                         "message": str(message), **fields})
+
+    def summary(self) -> str:
+        """
+        Text table of the finished stages in completion order (nested stages indented).
+        """
+        header = f"{'stage':<44}{'seconds':>10}{'rows in':>11}{'rows out':>11}{'peak MB':>10}{'db trips':>10}"
+        lines = [header, "-" * len(header)]
+        for record in self.records:
+            name = "  " * record.get("depth", 0) + record["stage"]
+            lines.append(
+                f"{name[:43]:<44}{record['seconds']:>10.3f}"
+                f"{'' if record['rows_in'] is None else record['rows_in']:>11}"
+                f"{'' if record['rows_out'] is None else record['rows_out']:>11}"
+                f"{'' if record['peak_mb'] is None else record['peak_mb']:>10}"
+                f"{record['db_round_trips']:>10}"
+            )
+        return "\n".join(lines)
+
+    def print_summary(self):
+        if not self.quiet:
+            print(self.summary())
+
+
+_recorder = MetricsRecorder()
+
+
+def get_recorder() -> MetricsRecorder:
+    return _recorder
+
+
+def configure(log_path=None, quiet=None):
+    """
+    Change the JSON-lines destination and / or console switch at runtime.
+    """
+    if log_path is not None:
+        _recorder.log_path = log_path or None
+    if quiet is not None:
+        _recorder.quiet = quiet
+
+
+def stage(name: str, rows_in=None):
+    return _recorder.stage(name, rows_in=rows_in)
+
+
+def log(message: str = "", **fields):
+    _recorder.log(message, **fields)
+
+
+def count(counter: str, n: int = 1):
+    _recorder.count(counter, n)
+
+
+def print_summary():
+    _recorder.print_summary()
+
+
+def _row_count(value):
+    """
+    Row count of a DataFrame-like value (anything with `columns` and a length), else None.
+    """
+    return len(value) if hasattr(value, "columns") and hasattr(value, "__len__") else None
+
+
+def instrumented(name: str = None):
+    """
+    Decorator measuring a function as a stage: rows in = the first DataFrame argument,
+    rows out = the returned DataFrame. A `table` / `sheet_name` / `name` string argument
+    is appended to the stage name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            label = name or func.__name__
+            detail = next((v for k, v in kwargs.items() if k in ("table_name", "sheet_name", "name")
+                           and isinstance(v, str)), None)
+            if detail is None:
+                detail = next((a for a in args if isinstance(a, str)), None)
+            if detail:
+                label = f"{label}[{detail}]"
+            rows_in = next((n for n in map(_row_count, list(args) + list(kwargs.values())) if n is not None), None)
+            with stage(label, rows_in=rows_in) as current:
+                result = func(*args, **kwargs)
+                current.rows_out = _row_count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    # Summarise a JSON-lines metrics file: python -m utility.metrics metrics.jsonl
+    path = sys.argv[1] if len(sys.argv) > 1 else METRICS_LOG
+    recorder = MetricsRecorder(log_path=None, quiet=False)
+    with open(path, encoding="utf-8") as f:
+        recorder.records = [r for r in map(json.loads, f) if r.get("type") == "stage"]
+    recorder.print_summary()
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+# olap.py
+# In-process columnar OLAP engine over the star schema CSVs in output/.
+# Lets the business reports in sql/1.1 - 1.6 run without a PostgreSQL server.
+
+import os
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utility.schemas import TABLE_IMPORT_ORDER
+
+# ---------- Configuration Parameters ----------
+OUTPUT_DIR = "output"
+FACT_TABLES = ["fact_fatal_crash", "fact_person_fatality"]
+
+
+# ---------- Column Storage ----------
+class Column:
+    """
+    A single table column held as a NumPy array.
+    Text and boolean columns are dictionary-encoded: `values` holds int32 codes
+    into `categories`, with -1 standing for NULL.
+    Numeric columns keep their values; NULLs are NaN.
+    """
+
+    def __init__(self, values: np.ndarray, categories: Optional[np.ndarray] = None):
+        self.values = values
+        self.categories = categories
+
+    @classmethod
+    def from_series(cls, s: pd.Series) -> "Column":
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            values = s.to_numpy(dtype="float64", na_value=np.nan)
+            if not np.isnan(values).any() and np.all(values == np.round(values)):
+                values = values.astype(np.int64)
+            return cls(values)
+        codes, uniques = pd.factorize(s.astype(object).where(s.notna(), None), use_na_sentinel=True)
+        return cls(codes.astype(np.int32), np.asarray(uniques, dtype=object))
+
+    @property
+    def is_encoded(self) -> bool:
+        return self.categories is not None
+
+    def codes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (codes, labels) for grouping; numeric columns are encoded on demand.
+        """
+        if self.is_encoded:
+            return self.values, self.categories
+        valid = ~np.isnan(self.values) if self.values.dtype.kind == "f" else np.ones(len(self.values), bool)
+        labels, inverse = np.unique(self.values[valid], return_inverse=True)
+        codes = np.full(len(self.values), -1, dtype=np.int32)
+        codes[valid] = inverse
+        if labels.dtype.kind == "f" and np.all(labels == np.round(labels)):
+            labels = labels.astype(np.int64)
+        return codes, labels.astype(object)
+
+    def valid(self) -> np.ndarray:
+        if self.is_encoded:
+            return self.values >= 0
+        if self.values.dtype.kind == "f":
+            return ~np.isnan(self.values)
+        return np.ones(len(self.values), dtype=bool)
+
+
+class Table:
+    """
+    A named set of equal-length columns. Dimension tables also carry a dense
+    key index so that a foreign key value maps straight to a row position.
+    """
+
+    def __init__(self, name: str, columns: Dict[str, Column], key: str):
+        self.name = name
+        self.columns = columns
+        self.key = key
+        self.position = None
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())).values)
+
+    def build_key_index(self):
+        keys = self.columns[self.key].values.astype(np.int64)
+        self.position = np.full(int(keys.max()) + 1, -1, dtype=np.int64)
+        self.position[keys] = np.arange(len(keys))
+
+    def lookup(self, foreign_keys: np.ndarray) -> np.ndarray:
+        """
+        Map foreign key values to row positions (-1 when NULL or unmatched).
+        """
+        fk = np.where(np.isnan(foreign_keys), -1, foreign_keys) if foreign_keys.dtype.kind == "f" else foreign_keys
+        fk = fk.astype(np.int64)
+        in_range = (fk >= 0) & (fk < len(self.position))
+        rows = np.full(len(fk), -1, dtype=np.int64)
+        rows[in_range] = self.position[fk[in_range]]
+        return rows
+
+
+# ---------- Grouping Set Helpers ----------
+def cube(keys: Sequence[str]) -> List[Tuple[str, ...]]:
+    """
+    All grouping sets of GROUP BY CUBE (keys), largest first.
+    """
+    return [combo for size in range(len(keys), -1, -1) for combo in combinations(keys, size)]
+
+
+def rollup(keys: Sequence[str]) -> List[Tuple[str, ...]]:
+    """
+    All grouping sets of GROUP BY ROLLUP (keys): each prefix of the key list.
+    """
+    return [tuple(keys[:size]) for size in range(len(keys), -1, -1)]
+
+
+def order_by(df: pd.DataFrame, keys: Sequence[Tuple[str, bool]]) -> pd.DataFrame:
+    """
+    Sort like PostgreSQL ORDER BY: NULLS LAST for ASC and NULLS FIRST for DESC.
+    `keys` is a list of (column, ascending) pairs.
+    """
+    for col, ascending in reversed(keys):
+        df = df.sort_values(col, ascending=ascending, kind="stable",
+                            na_position="last" if ascending else "first")
+    return df.reset_index(drop=True)
+
+
+# ---------- Star Schema Engine ----------
+class StarSchema:
+    """
+    Loads the dimension and fact tables as NumPy columns and answers
+    star-join aggregate queries with CUBE / ROLLUP / GROUPING semantics.
+    """
+
+    def __init__(self, tables: Dict[str, Table]):
+        self.tables = tables
+        self._join_rows = {}
+
+    @classmethod
+    def load(cls, folder: str = OUTPUT_DIR) -> "StarSchema":
+        tables = {}
+        for name in TABLE_IMPORT_ORDER:
+            path = os.path.join(folder, f"{name}.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path)
+            columns = {col: Column.from_series(df[col]) for col in df.columns}
+            table = Table(name, columns, key=df.columns[0])
+            if name not in FACT_TABLES:
+                table.build_key_index()
+            tables[name] = table
+        return cls(tables)
+
+    def _resolve(self, fact: str, ref: str) -> Tuple[Column, np.ndarray]:
+        """
+        Resolve "dim_x.column" (or a plain fact column) to a Column aligned
+        with the fact rows, together with the inner-join validity mask.
+        """
+        fact_table = self.tables[fact]
+        if "." not in ref:
+            col = fact_table.columns[ref]
+            return col, np.ones(len(fact_table), dtype=bool)
+
+        dim_name, col_name = ref.split(".", 1)
+        dim = self.tables[dim_name]
+        if (fact, dim_name) not in self._join_rows:
+            self._join_rows[(fact, dim_name)] = dim.lookup(fact_table.columns[dim.key].values)
+        rows = self._join_rows[(fact, dim_name)]
+        joined = rows >= 0
+        src = dim.columns[col_name]
+        taken = src.values[np.where(joined, rows, 0)]
+        if src.is_encoded:
+            taken = np.where(joined, taken, -1).astype(np.int32)
+        return Column(taken, src.categories), joined
+
+    def aggregate(self, fact: str, measure: str, keys: Sequence[str],
+                  grouping_sets: Optional[List[Tuple[str, ...]]] = None,
+                  where: Optional[Dict[str, object]] = None,
+                  joins: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        SUM(measure) over the fact table, grouped by each grouping set of `keys`.
+
+        `where` maps a column reference to a scalar or a list of allowed values.
+        `joins` lists extra dimensions to inner join without grouping on them.
+        Returns one column per key (named after the attribute), a `grouping_<key>`
+        flag per key (PostgreSQL GROUPING()), and the summed `measure`.
+        """
+        grouping_sets = grouping_sets if grouping_sets is not None else [tuple(keys)]
+        mask = np.ones(len(self.tables[fact]), dtype=bool)
+
+        for dim_name in joins:
+            _, joined = self._resolve(fact, f"{dim_name}.{self.tables[dim_name].key}")
+            mask &= joined
+
+        for ref, allowed in (where or {}).items():
+            col, joined = self._resolve(fact, ref)
+            allowed = allowed if isinstance(allowed, (list, tuple, set)) else [allowed]
+            if col.is_encoded:
+                wanted = [i for i, label in enumerate(col.categories) if label in allowed]
+                mask &= joined & np.isin(col.values, wanted)
+            else:
+                mask &= joined & np.isin(col.values, list(allowed))
+
+        encoded = {}
+        for ref in keys:
+            col, joined = self._resolve(fact, ref)
+            mask &= joined
+            encoded[ref] = col.codes()
+
+        measure_col, joined = self._resolve(fact, measure)
+        mask &= joined & measure_col.valid()
+        weights = measure_col.values[mask].astype(np.float64)
+
+        names = [ref.split(".")[-1] for ref in keys]
+        frames = []
+        for gset in grouping_sets:
+            composite = np.zeros(int(mask.sum()), dtype=np.int64)
+            for ref in gset:
+                codes, labels = encoded[ref]
+                composite = composite * (len(labels) + 1) + (codes[mask].astype(np.int64) + 1)
+            groups, inverse = np.unique(composite, return_inverse=True)
+            totals = np.bincount(inverse, weights=weights, minlength=len(groups))
+
+            out = {}
+            for ref, name in zip(reversed(keys), reversed(names)):
+                if ref in gset:
+                    codes, labels = encoded[ref]
+                    radix = len(labels) + 1
+                    code = groups % radix - 1
+                    groups_left = groups // radix
+                    out[name] = [labels[c] if c >= 0 else None for c in code]
+                    groups = groups_left
+                else:
+                    out[name] = [None] * len(totals)
+            frame = pd.DataFrame({name: out[name] for name in names})
+            for ref, name in zip(keys, names):
+                frame[f"grouping_{name}"] = 0 if ref in gset else 1
+            frame[measure] = np.round(totals).astype(np.int64)
+            frames.append(frame)
+
+        return pd.concat(frames, ignore_index=True)
+
+
+# ---------- Business-Specific Queries ----------
+
+def _finish(df: pd.DataFrame, columns: List[str], labels: Dict[str, str],
+            measure: str, alias: str, max_grouping: int) -> pd.DataFrame:
+    """
+    Apply the HAVING / COALESCE / SELECT list shared by the CUBE reports.
+    """
+    flags = df[[c for c in df.columns if c.startswith("grouping_")]].sum(axis=1)
+    df = df[flags < max_grouping]
+    records = []
+    for row in df.itertuples(index=False):
+        row = row._asdict()
+        record = [labels[c] if c in labels and row[c] is None else row[c] for c in columns]
+        records.append(record + [int(row[measure])])
+    return pd.DataFrame(records, columns=columns + [alias])
+
+
+def query_1_1(star: StarSchema) -> pd.DataFrame:
+    """
+    Fatalities by time of day x road type in 2024 (CUBE, grand total removed).
+    """
+    keys = ["dim_time.time_of_day", "dim_road.road_type"]
+    df = star.aggregate("fact_person_fatality", "fatality_count", keys, cube(keys),
+                        where={"dim_date.year": 2024})
+    df = _finish(df, ["time_of_day", "road_type"],
+                 {"time_of_day": "All Times", "road_type": "All Road Types"},
+                 "fatality_count", "total_fatalities", 2)
+    return order_by(df, [("total_fatalities", False)])
+
+
+def query_1_2(star: StarSchema) -> pd.DataFrame:
+    """
+    Fatalities by age group x road user in 2024 (CUBE, grand total removed).
+    """
+    keys = ["dim_person.age_group", "dim_person.road_user"]
+    df = star.aggregate("fact_person_fatality", "fatality_count", keys, cube(keys),
+                        where={"dim_date.year": 2024})
+    df = _finish(df, ["age_group", "road_user"],
+                 {"age_group": "All Age Groups", "road_user": "All Road Users"},
+                 "fatality_count", "total_fatalities", 2)
+    return order_by(df, [("total_fatalities", False)])
+
+
+def query_1_3(star: StarSchema) -> pd.DataFrame:
+    """
+    Fatalities by month -> time of day in 2024 (ROLLUP, grand total removed).
+    """
+    keys = ["dim_date.month", "dim_time.time_of_day"]
+    df = star.aggregate("fact_person_fatality", "fatality_count", keys, rollup(keys),
+                        where={"dim_date.year": 2024})
+    df = _finish(df, ["month", "time_of_day"], {"time_of_day": "All Times"},
+                 "fatality_count", "total_fatalities", 2)
+    return order_by(df, [("total_fatalities", False)])
+
+
+def query_1_4(star: StarSchema) -> pd.DataFrame:
+    """
+    Christmas / Easter fatalities by holiday x road type x time of day in 2024.
+    """
+    keys = ["dim_holiday.holiday_id", "dim_road.road_type", "dim_time.time_of_day"]
+    df = star.aggregate("fact_person_fatality", "fatality_count", keys, cube(keys),
+                        where={"dim_date.year": 2024, "dim_holiday.holiday_id": [1, 3]})
+    df = _finish(df, ["holiday_id", "road_type", "time_of_day"],
+                 {"road_type": "All Road Types", "time_of_day": "All Times"},
+                 "fatality_count", "total_fatalities", 3)
+    return order_by(df, [("total_fatalities", False)])
+
+
+def _decode(col: Column) -> np.ndarray:
+    """
+    Labels of an encoded column, row by row, with None where the code is -1 (NULL).
+    """
+    codes, labels = col.codes()
+    decoded = labels[np.where(codes >= 0, codes, 0)] if len(labels) else np.full(len(codes), None, dtype=object)
+    decoded[codes < 0] = None
+    return decoded
+
+
+def query_1_5(star: StarSchema) -> pd.DataFrame:
+    """
+    2023 deaths per 100,000 population by state.
+    State population is the sum over distinct (state, LGA, population) rows.
+    """
+    loc = star.tables["dim_location"]
+    locations = pd.DataFrame({
+        "state": _decode(loc.columns["state"]),
+        "lga_name": _decode(loc.columns["lga_name"]),
+        "population": loc.columns["population_2023_lga"].values,
+    }).drop_duplicates()
+    state_population = locations.groupby("state")["population"].sum(min_count=1)
+
+    df = star.aggregate("fact_fatal_crash", "number_fatalities", ["dim_location.state"],
+                        where={"dim_date.year": 2023})
+    # The SQL joins on state, so crashes at a NULL state drop out
+    df = df[df["state"].notna()]
+    records = []
+    for state, deaths in zip(df["state"], df["number_fatalities"]):
+        population = state_population.get(state)
+        population = None if population is None or pd.isna(population) else int(population)
+        rate = None
+        if population:
+            rate = (Decimal(int(deaths) * 100000) / Decimal(population)).quantize(Decimal("0.01"), ROUND_HALF_UP)
+        records.append([state, int(deaths), population, rate])
+    df = pd.DataFrame(records, columns=["state", "total_deaths_2023", "total_population", "death_rate_per_100k_2023"])
+    return order_by(df, [("death_rate_per_100k_2023", False)])
+
+
+def query_1_6(star: StarSchema) -> pd.DataFrame:
+    """
+    Fatalities by year x crash type x speed category (CUBE, year-only rows removed).
+    """
+    keys = ["dim_date.year", "dim_crash_type.crash_type", "dim_road.speed_category"]
+    df = star.aggregate("fact_person_fatality", "fatality_count", keys, cube(keys))
+    df = df[df["grouping_crash_type"] + df["grouping_speed_category"] < 2]
+    df = _finish(df, ["year", "crash_type", "speed_category"],
+                 {"crash_type": "All Crash Types", "speed_category": "All Speed Zones"},
+                 "fatality_count", "total_fatalities", 4)
+    return order_by(df, [("year", True), ("total_fatalities", False)])
+
+
+BUSINESS_QUERIES = {
+    "1.1": query_1_1,
+    "1.2": query_1_2,
+    "1.3": query_1_3,
+    "1.4": query_1_4,
+    "1.5": query_1_5,
+    "1.6": query_1_6,
+}
+
+
+# ---------- Comparison & Benchmark ----------
+
+def frames_match(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    """
+    True when two result sets hold the same rows (ignoring the order of ties).
+    """
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+
+    def normalise(df):
+        df = df.astype(object).where(df.notna(), None).map(lambda v: str(v) if v is not None else "")
+        return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+    return normalise(left).equals(normalise(right))
+
+
+def benchmark_business_queries(folder: str = OUTPUT_DIR, pg_runner=None, repeat: int = 5) -> pd.DataFrame:
+    """
+    Time each business query in the engine and, when `pg_runner` is given
+    (a callable taking a .sql path and returning a DataFrame), on PostgreSQL.
+    Reports the best-of-`repeat` wall time in milliseconds and whether results match.
+    """
+    start = time.perf_counter()
+    star = StarSchema.load(folder)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"📦 Loaded star schema from `{folder}` in {load_ms:.1f} ms")
+
+    rows = []
+    for name, func in BUSINESS_QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(star)
+            timings.append((time.perf_counter() - start) * 1000)
+        row = {"query": name, "engine_ms": min(timings), "rows": len(result)}
+
+        if pg_runner is not None:
+            pg_timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                expected = pg_runner(os.path.join("sql", f"{name}.sql"))
+                pg_timings.append((time.perf_counter() - start) * 1000)
+            row["postgres_ms"] = min(pg_timings)
+            row["speedup"] = row["postgres_ms"] / row["engine_ms"]
+            row["identical"] = frames_match(result, expected)
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def _postgres_runner(path: str) -> pd.DataFrame:
+    from utility.pg_utils import query_data
+
+    with open(path, "r", encoding="utf-8") as f:
+        statement = f.read().strip().rstrip(";")
+    results, columns = query_data(statement)
+    return pd.DataFrame(results, columns=columns)
+
+
+if __name__ == "__main__":
+    try:
+        report = benchmark_business_queries(pg_runner=_postgres_runner)
+    except Exception as e:
+        print(f"⚠️ PostgreSQL unavailable ({e}); benchmarking the engine only.")
+        report = benchmark_business_queries()
+    print(report.to_string(index=False))
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# parallel_mining.py
+# Mine several parameter combinations in worker processes that share one encoded item matrix.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utility.eclat import PackedTransactions, pack_csc_bitsets
+from utility.item_matrix import ColumnSubset, ItemMatrix
+
+# Set inside each worker by _attach_shared_matrix
+_shared = {}
+
+
+def _attach_shared_matrix(shm_name: str, shape: Tuple[int, int], items: List[str], n_rows: int = None):
+    """
+    Worker initializer: map the shared item matrix into this process (no copy).
+    With `n_rows` set, the buffer holds packed bitsets (items x uint64 words) instead of booleans.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared["shm"] = shm
+    if n_rows is None:
+        _shared["matrix"] = np.ndarray(shape, dtype=bool, buffer=shm.buf, order="F")
+    else:
+        _shared["bitsets"] = np.ndarray(shape, dtype=np.uint64, buffer=shm.buf)
+    _shared["items"] = items
+    _shared["n_rows"] = n_rows
+
+
+def _mine_job(item_idx: np.ndarray, mine_func: Callable, mine_kwargs: dict) -> pd.DataFrame:
+    """
+    Worker task: mine one combination's item columns in place in shared memory.
+    """
+    labels = [_shared["items"][i] for i in item_idx]
+    if _shared["n_rows"] is not None:
+        df_trans = PackedTransactions(_shared["bitsets"][item_idx], labels, _shared["n_rows"])
+    else:
+        # Selecting the columns with fancy indexing would copy them into every worker
+        df_trans = ColumnSubset(_shared["matrix"], item_idx, labels)
+    return mine_func(df_trans, **mine_kwargs)
+
+
+def mine_combinations_parallel(item_matrix: ItemMatrix, jobs: Sequence[Sequence[str]], mine_func: Callable,
+                               max_workers: int = None, packed: bool = False, **mine_kwargs) -> List[pd.DataFrame]:
+    """
+    Run `mine_func(df_trans, **mine_kwargs)` for each job (a list of selected columns).
+
+    The item matrix is written once to `multiprocessing.shared_memory`; workers attach
+    to it instead of receiving pickled copies. Results are returned in the order of
+    `jobs`, whatever order the workers finish in.
+    Jobs receive a ColumnSubset reading their columns in place in the shared matrix.
+    With `packed` (Eclat), jobs receive PackedTransactions built from the sparse columns
+    and the shared buffer holds rows/8 bytes per item instead of a dense boolean matrix.
+    `mine_func` must be importable by the workers (a module-level function).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    job_items = [item_matrix.item_indices(cols) for cols in jobs]
+
+    # A single worker gains nothing from a process pool
+    if max_workers == 1 or len(jobs) <= 1:
+        select = item_matrix.select_packed if packed else (lambda cols: item_matrix.select(cols, dense=True))
+        return [mine_func(select(cols), **mine_kwargs) for cols in jobs]
+
+    csc = item_matrix.matrix.tocsc()
+    if packed:
+        bitsets = pack_csc_bitsets(csc)
+        shape, n_rows = bitsets.shape, item_matrix.shape[0]
+    else:
+        # Column-major layout keeps each item's column contiguous for the workers
+        shape, n_rows = item_matrix.shape, None
+    itemsize = np.dtype(np.uint64 if packed else bool).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * itemsize, 1))
+    shared = None
+    try:
+        if packed:
+            shared = np.ndarray(shape, dtype=np.uint64, buffer=shm.buf)
+            shared[:] = bitsets
+            del bitsets
+        else:
+            shared = np.ndarray(shape, dtype=bool, buffer=shm.buf, order="F")
+            shared[:] = False
+            for j in range(shape[1]):
+                shared[csc.indices[csc.indptr[j]:csc.indptr[j + 1]], j] = True
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_shared_matrix,
+                                 initargs=(shm.name, shape, item_matrix.items, n_rows)) as pool:
+            futures = [pool.submit(_mine_job, idx, mine_func, mine_kwargs) for idx in job_items]
+            return [future.result() for future in futures]
+    finally:
+        del shared
+        shm.close()
+        shm.unlink()
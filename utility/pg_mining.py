@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# pg_mining.py
+# Frequent itemset support counting inside PostgreSQL.
+# Item counts are computed with GROUPING SETS over the star schema joins; only the compact
+# count tables come back to Python, where candidates are generated and rules derived.
+
+import math
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+import pandas as pd
+
+from utility.pg_utils import with_db_cursor
+from utility.schemas import table_columns
+from utility.wide_table import WIDE_JOINS
+
+# Per-query work_mem for the counting queries; enough memory lets PostgreSQL hash all
+# grouping sets in one pass instead of sorting the joined rows once per set
+WORK_MEM = "256MB"
+
+# Star schema join used for mining: every fatality linked to all of its dimensions
+FROM_CLAUSE = "fact_person_fatality f\n" + "\n".join(
+    f"JOIN {dim} ON f.{key} = {dim}.{key}" for dim, key in WIDE_JOINS
+)
+
+# Mining column -> dimension table that holds it
+COLUMN_SOURCES = {
+    name: dim
+    for dim, key in WIDE_JOINS
+    for name, _ in table_columns(dim)
+    if name != key
+}
+
+
+class PostgresSupportCounter:
+    """
+    Counts itemset supports in PostgreSQL, level by level.
+
+    Level 1 and 2 count every column and column pair with one GROUPING SETS query each;
+    larger itemsets are counted only for column sets that contain an apriori candidate.
+    Counts for a column set are kept, so combinations sharing columns reuse them.
+    """
+
+    def __init__(self, min_support: float = 0.02):
+        self.min_support = min_support
+        self.n_rows = self._count_rows()
+        # smallest count whose support reaches min_support (same float test as apriori)
+        self.min_count = max(int(math.ceil(min_support * self.n_rows)) - 1, 0)
+        while self.min_count / self.n_rows < min_support:
+            self.min_count += 1
+        # column tuple -> {value tuple: count} for frequent value combinations
+        self.counts: Dict[Tuple[str, ...], Dict[tuple, int]] = {}
+
+    def _count_rows(self) -> int:
+        with with_db_cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {FROM_CLAUSE}")
+            return int(cur.fetchone()[0])
+
+    def _count_column_sets(self, column_sets: List[Tuple[str, ...]]):
+        """
+        Fetch value-combination counts for the given column sets in one GROUPING SETS query.
+        """
+        column_sets = [cs for cs in column_sets if cs not in self.counts]
+        if not column_sets:
+            return
+        columns = sorted({c for cs in column_sets for c in cs})
+        qualified = {c: f"{COLUMN_SOURCES[c]}.{c}" for c in columns}
+        sets_sql = ", ".join("(" + ", ".join(qualified[c] for c in cs) + ")" for cs in column_sets)
+        select_sql = f"""
+            SELECT GROUPING({', '.join(qualified[c] for c in columns)}) AS grouping_id,
+                   {', '.join(qualified[c] for c in columns)},
+                   COUNT(*) AS support_count
+            FROM {FROM_CLAUSE}
+            GROUP BY GROUPING SETS ({sets_sql})
+            HAVING COUNT(*) >= %s
+        """
+        with with_db_cursor() as cur:
+            cur.execute("SET LOCAL work_mem = %s", (WORK_MEM,))
+            cur.execute(select_sql, (self.min_count,))
+            results = cur.fetchall()
+
+        by_mask = {}
+        for cs in column_sets:
+            # GROUPING() sets bit (n - 1 - i) when the i-th argument is aggregated away
+            mask = sum(1 << (len(columns) - 1 - i) for i, c in enumerate(columns) if c not in cs)
+            by_mask[mask] = cs
+            self.counts[cs] = {}
+        for row in results:
+            cs = by_mask[row[0]]
+            values = tuple(row[1 + columns.index(c)] for c in cs)
+            # A NULL value is not an item (the encoder drops missing values)
+            if any(v is None for v in values):
+                continue
+            self.counts[cs][values] = int(row[-1])
+
+    def frequent_itemsets(self, selected_cols: Sequence[str]) -> pd.DataFrame:
+        """
+        All frequent itemsets over `selected_cols`, in the format of mlxtend's apriori
+        (`support`, `itemsets` with "col=value" labels).
+        """
+        cols = sorted(selected_cols)
+        self._count_column_sets([(c,) for c in cols])
+        frequent = {((c,), values): n for c in cols for values, n in self.counts[(c,)].items()}
+        current = dict(frequent)
+
+        k = 1
+        while current:
+            k += 1
+            # apriori-gen: join itemsets sharing their first k-2 columns/values, prune by subsets
+            by_prefix = {}
+            for cs, vs in current:
+                by_prefix.setdefault((cs[:-1], vs[:-1]), []).append((cs[-1], vs[-1]))
+            candidates = set()
+            for (prefix_cs, prefix_vs), tails in by_prefix.items():
+                for (c1, v1), (c2, v2) in combinations(sorted(tails, key=lambda t: t[0]), 2):
+                    if c1 == c2:
+                        continue
+                    cs, vs = prefix_cs + (c1, c2), prefix_vs + (v1, v2)
+                    if all((cs[:j] + cs[j + 1:], vs[:j] + vs[j + 1:]) in current for j in range(k)):
+                        candidates.add((cs, vs))
+            if not candidates:
+                break
+
+            self._count_column_sets(sorted({cs for cs, _ in candidates}) if k > 2
+                                    else list(combinations(cols, 2)))
+            current = {}
+            for cs, vs in candidates:
+                n = self.counts[cs].get(vs)
+                if n is not None and n / self.n_rows >= self.min_support:
+                    current[(cs, vs)] = n
+            frequent.update(current)
+
+        return pd.DataFrame({
+            "support": [n / self.n_rows for n in frequent.values()],
+            "itemsets": [frozenset(f"{c}={v}" for c, v in zip(cs, vs)) for cs, vs in frequent],
+        })
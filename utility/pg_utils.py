@@ -1,9 +1,11 @@
 #pg_utils.py
-import psycopg2
-from psycopg2 import sql
+import hashlib
+import os
+import re
+import sqlite3
 from contextlib import contextmanager
-import pandas as pd
 
+from utility.metrics import count, log
 
 
 # ---------- Configuration Parameters ----------
@@ -15,24 +17,231 @@ DB_CONFIG = {
     "password": "oddSt@mp92"
 }
 
+# Which backend to use: "postgres" (server in DB_CONFIG) or "sqlite" (in-process, no server)
+DB_BACKEND = os.environ.get("DW_DB_BACKEND", "postgres")
+SQLITE_PATH = os.environ.get("DW_SQLITE_PATH", "project1.sqlite")
+
+# Rows per executemany call during bulk inserts
+INSERT_BATCH_SIZE = 5000
+
+
+# ---------- Database Backends ----------
+class PostgresBackend:
+    """
+    PostgreSQL via psycopg2; opens a new connection for each operation.
+    """
+    name = "postgres"
+    # Server round trips per operation: psycopg2's executemany sends one statement per row
+    CONNECT_ROUND_TRIPS = 1
+    EXECUTEMANY_PER_ROW = True
+
+    def connect(self):
+        import psycopg2
+        return psycopg2.connect(**DB_CONFIG)
+
+    def connect_dedicated(self):
+        """
+        A connection owned by the caller (e.g. one per worker thread of a pool).
+        """
+        return self.connect()
+
+    def release(self, conn):
+        conn.close()
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def table_exists(self, cur, table_name: str) -> bool:
+        cur.execute("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_name = %s
+            );
+        """, (table_name,))
+        return cur.fetchone()[0]
+
+    def translate_ddl(self, schema_sql: str) -> str:
+        return schema_sql
+
+    def table_checksum(self, cur, table_name: str):
+        """
+        Row count and content checksum, aggregated on the server in constant memory: the sum of each
+        row's md5 truncated to a signed 64-bit integer (independent of row order, no sort).
+        """
+        cur.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(('x' || substr(md5(t::text), 1, 16))::bit(64)::bigint), 0)
+            FROM {table_name} t;
+        """)
+        count, total = cur.fetchone()
+        return int(count), format_checksum(int(total))
+
+
+def format_checksum(total: int) -> str:
+    """
+    A table checksum (sum of signed 64-bit row hashes) as 32 hex digits, taken modulo 2**128.
+    """
+    return format(total % 2 ** 128, "032x")
+
+
+class _SQLiteCursor:
+    """
+    Wraps a sqlite3 cursor so that the psycopg2-style SQL used throughout the
+    project (`%s` placeholders, `::type` casts, `DROP ... CASCADE`) runs unchanged.
+    """
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    # String literals, quoted identifiers and comments, which are passed through untouched
+    QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+    @classmethod
+    def translate(cls, statement: str) -> str:
+        parts, end = [], 0
+        for quoted in cls.QUOTED.finditer(statement):
+            parts.append(cls._translate_code(statement[end:quoted.start()]))
+            parts.append(quoted.group())
+            end = quoted.end()
+        parts.append(cls._translate_code(statement[end:]))
+        return re.sub(r"\s+CASCADE\s*;?\s*$", ";", "".join(parts), flags=re.IGNORECASE)
+
+    @staticmethod
+    def _translate_code(code: str) -> str:
+        code = code.replace("%s", "?")
+        return re.sub(r"::\w+", "", code)
+
+    def execute(self, statement, params=None):
+        return self._cur.execute(self.translate(statement), params or ())
+
+    def executemany(self, statement, seq_of_params):
+        return self._cur.executemany(self.translate(statement), seq_of_params)
+
+    def __getattr__(self, item):
+        return getattr(self._cur, item)
+
+
+# SQLite stores BOOLEAN as 1 / 0; columns declared BOOLEAN are read back as Python bools, as psycopg2 returns them
+SQLITE_TRUE = {"1", "true", "t", "yes", "y", "on"}
+SQLITE_FALSE = {"0", "false", "f", "no", "n", "off"}
+
+
+def _convert_sqlite_boolean(value: bytes):
+    text = value.decode("utf-8").strip().lower()
+    if text in SQLITE_TRUE:
+        return True
+    if text in SQLITE_FALSE:
+        return False
+    return value.decode("utf-8")
+
+
+class SQLiteBackend:
+    """
+    In-process SQLite database; keeps one connection open for the whole process
+    so that ":memory:" databases survive between calls.
+    """
+    name = "sqlite"
+    # In-process: connecting is free after the first call and executemany is a single call
+    CONNECT_ROUND_TRIPS = 0
+    EXECUTEMANY_PER_ROW = False
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._conn = None
+        # sqlite3's converter registry is process-wide, so it is only touched once SQLite is in use
+        sqlite3.register_converter("BOOLEAN", _convert_sqlite_boolean)
+
+    def connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+        return self._conn
+
+    def connect_dedicated(self):
+        """
+        A separate connection to the same file, owned by the caller (not usable with ":memory:").
+        """
+        return sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+    def release(self, conn):
+        pass
+
+    def cursor(self, conn):
+        return _SQLiteCursor(conn.cursor())
+
+    def table_exists(self, cur, table_name: str) -> bool:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table_name,))
+        return cur.fetchone() is not None
+
+    def translate_ddl(self, schema_sql: str) -> str:
+        """
+        Translate the PostgreSQL DDL in TABLE_SCHEMAS to SQLite.
+        """
+        schema_sql = re.sub(r"\bSERIAL\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY", schema_sql, flags=re.IGNORECASE)
+        schema_sql = re.sub(r"\bVARCHAR\s*\(\s*\d+\s*\)", "TEXT", schema_sql, flags=re.IGNORECASE)
+        return schema_sql
+
+    def table_checksum(self, cur, table_name: str):
+        """
+        Row count and content checksum, summed like PostgresBackend's (SQLite has no md5:
+        rows are hashed while streaming the cursor).
+        """
+        cur.execute(f"SELECT * FROM {table_name}")
+        rows, total = 0, 0
+        for row in iter(cur.fetchone, None):
+            rows += 1
+            total += int.from_bytes(hashlib.md5(repr(row).encode("utf-8")).digest()[:8], "big", signed=True)
+        return rows, format_checksum(total)
+
+
+BACKENDS = {
+    "postgres": PostgresBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """
+    Return the active backend, creating it from DB_BACKEND on first use.
+    """
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[DB_BACKEND]()
+    return _backend
+
+
+def set_backend(name: str, **kwargs):
+    """
+    Switch backend at runtime, e.g. set_backend("sqlite", path=":memory:").
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown database backend `{name}`. Choose from {list(BACKENDS)}.")
+    _backend = BACKENDS[name](**kwargs)
+    return _backend
+
+
 # ---------- Database Connection Context Manager ----------
 @contextmanager
 def with_db_cursor():
     """
     Provides a managed database cursor with automatic connection handling.
     """
-    conn = psycopg2.connect(**DB_CONFIG)
+    backend = get_backend()
+    conn = backend.connect()
+    count("db_round_trips", backend.CONNECT_ROUND_TRIPS + 1)  # connect + commit / rollback
     try:
-        cur = conn.cursor()
+        cur = backend.cursor(conn)
         yield cur
         conn.commit()
     except Exception as e:
         conn.rollback()
-        print("❌ Database operation failed:", e)
+        log(f"❌ Database operation failed: {e}", error=str(e))
         raise
     finally:
         cur.close()
-        conn.close()
+        backend.release(conn)
 
 # ---------- Table Creation ----------
 
@@ -40,23 +249,19 @@ def create_table(table_name: str, schema_sql: str):
     """
     Create a table if it does not already exist.
     """
-    check_sql = """
-        SELECT EXISTS (
-            SELECT FROM information_schema.tables 
-            WHERE table_name = %s
-        );
-    """
+    backend = get_backend()
     with with_db_cursor() as cur:
-        cur.execute(check_sql, (table_name,))
-        exists = cur.fetchone()[0]
+        exists = backend.table_exists(cur, table_name)
+        count("db_round_trips")
 
         if exists:
-            print(f"⚠️ Table  `{table_name}` already exists. Skipping creation.")
+            log(f"⚠️ Table  `{table_name}` already exists. Skipping creation.", table=table_name, created=False)
         else:
-            create_sql = f"CREATE TABLE {table_name} ({schema_sql});"
-            print(create_sql)
+            create_sql = f"CREATE TABLE {table_name} ({backend.translate_ddl(schema_sql)});"
+            log(create_sql)
             cur.execute(create_sql)
-            print(f"✅ Table  `{table_name}` created successfully.")
+            count("db_round_trips")
+            log(f"✅ Table  `{table_name}` created successfully.", table=table_name, created=True)
 
 
 # ---------- Insert Single Row ----------
@@ -66,16 +271,28 @@ def insert_data(insert_sql: str, data: tuple):
     """
     with with_db_cursor() as cur:
         cur.execute(insert_sql, data)
-        print("✅ Row inserted successfully.")
+        count("db_round_trips")
+        count("db_rows_written")
+        log("✅ Row inserted successfully.")
 
 # ---------- Insert Multiple Rows ----------
-def insert_many(insert_sql: str, data_list: list):
+def insert_many(insert_sql: str, data_list: list, checkpoint: tuple = None):
     """
     Bulk insert multiple rows into a table.
+    Rows are sent in batches of INSERT_BATCH_SIZE within a single transaction;
+    `checkpoint` (sql, params) is executed in the same transaction, e.g. to record import progress.
     """
+    backend = get_backend()
     with with_db_cursor() as cur:
-        cur.executemany(insert_sql, data_list)
-        print(f"✅ Successfully inserted {len(data_list)} rows.")
+        for start in range(0, len(data_list), INSERT_BATCH_SIZE):
+            batch = data_list[start:start + INSERT_BATCH_SIZE]
+            cur.executemany(insert_sql, batch)
+            count("db_round_trips", len(batch) if backend.EXECUTEMANY_PER_ROW else 1)
+        if checkpoint is not None:
+            cur.execute(*checkpoint)
+            count("db_round_trips")
+        count("db_rows_written", len(data_list))
+        log(f"✅ Successfully inserted {len(data_list)} rows.", rows=len(data_list))
 
 
 # ---------- Query Data ----------
@@ -88,10 +305,23 @@ def query_data(select_sql: str, params=None):
         cur.execute(select_sql, params)
         results = cur.fetchall()
         columns = [desc[0] for desc in cur.description]  # 提取列名
-        print(f"✅ Query returned {len(results)} rows.")
+        count("db_round_trips")
+        count("db_rows_read", len(results))
+        log(f"✅ Query returned {len(results)} rows.", rows=len(results))
         return results, columns
 
 
+# ---------- Table Checksum ----------
+def table_checksum(table_name: str):
+    """
+    (row count, checksum) of a table's contents, computed by the backend.
+    """
+    with with_db_cursor() as cur:
+        rows, checksum = get_backend().table_checksum(cur, table_name)
+        count("db_round_trips")
+        return rows, checksum
+
+
 # ---------- Drop Table ----------
 def drop_table(table_name: str):
     """
@@ -99,8 +329,68 @@ def drop_table(table_name: str):
     """
     with with_db_cursor() as cur:
         cur.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
-        print(f"🗑️ Table `{table_name}` dropped successfully.")
+        count("db_round_trips")
+        log(f"🗑️ Table `{table_name}` dropped successfully.", table=table_name)
 
 
 # ---------- Business-Specific Queries ----------
 # (To be implemented or extended as needed)
+
+# Death rates by geography: geo_denominator level → dim_location columns it matches on
+# (the last one against geo_name, `state` also against the state)
+RATE_LEVELS = {
+    "state": ["state"],
+    "remoteness": ["remoteness_area"],
+    "state_remoteness": ["state", "remoteness_area"],
+    "sa4": ["state", "sa4_name"],
+    "lga": ["state", "lga_name"],
+}
+RATE_DENOMINATORS = {"population": "population", "dwellings": "dwelling_records"}
+
+
+def death_rate_sql(level: str, per: str = "population") -> str:
+    """
+    Deaths per 100,000 residents (or dwellings) of every geography of `level` in a given year.
+    Deaths are aggregated once per dim_location value and joined to the denominators; the population
+    is the latest one up to that year, or the earliest one for years before the series starts
+    (population_year shows the year used). Parameters: (year, year).
+
+    Denominators come from geo_denominator (see generate_geo_denominator in 01_ETL_template.py):
+    state and remoteness levels use the ABS Table 3 totals, lga the ABS LGA estimates, and sa4 the
+    LGA populations split across SA4s by their share of crash records (an approximation). State rates
+    are usually lower than sql/1.5's, whose denominator only sums the LGAs present in dim_location;
+    the death counts are the same.
+    """
+    if level not in RATE_LEVELS:
+        raise ValueError(f"Unknown geography level `{level}`. Choose one of {', '.join(RATE_LEVELS)}.")
+    if per not in RATE_DENOMINATORS:
+        raise ValueError(f"Unknown denominator `{per}`. Choose 'population' or 'dwellings'.")
+    columns = RATE_LEVELS[level]
+    denominator = RATE_DENOMINATORS[per]
+    join = [f"g.geo_name = d.{columns[-1]}"] + (["g.state = d.state"] if len(columns) > 1 else [])
+    return f"""
+        SELECT g.state, g.geo_name, g.year AS population_year, g.{denominator},
+               COALESCE(d.deaths, 0) AS deaths,
+               ROUND(CAST(COALESCE(d.deaths, 0) * 100000.0 / NULLIF(g.{denominator}, 0) AS NUMERIC), 2)
+                   AS deaths_per_100k
+        FROM geo_denominator g
+        LEFT JOIN (
+            SELECT {', '.join(f'l.{c}' for c in columns)}, SUM(f.number_fatalities) AS deaths
+            FROM fact_fatal_crash f
+            JOIN dim_location l ON f.location_id = l.location_id
+            JOIN dim_date dt ON f.date_id = dt.date_id
+            WHERE dt.year = %s
+            GROUP BY {', '.join(f'l.{c}' for c in columns)}
+        ) d ON {' AND '.join(join)}
+        WHERE g.geo_level = '{level}'
+          AND g.year = COALESCE((SELECT MAX(year) FROM geo_denominator WHERE year <= %s),
+                                (SELECT MIN(year) FROM geo_denominator))
+        ORDER BY deaths_per_100k DESC NULLS LAST, g.state, g.geo_name
+    """
+
+
+def death_rates(level: str = "state", year: int = 2023, per: str = "population"):
+    """
+    Deaths per 100,000 population (or dwellings) by geography for one year; returns (rows, columns).
+    """
+    return query_data(death_rate_sql(level, per), (year, year))
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# profiling.py
+# Opt-in profiling of the stages measured by utility.metrics.
+# Off by default; when enabled, every matching top-level stage is profiled and written to DW_PROFILE_DIR:
+#   sample   - stdlib stack sampler on a background thread (low overhead): <stage>.collapsed (flamegraph input) and <stage>.txt
+#   cprofile - deterministic cProfile: <stage>.prof (pstats dump) and <stage>.txt
+#
+#   DW_PROFILE=sample DW_PROFILE_STAGES="fact_*,import*" python 01_ETL_template.py
+#   python -m utility.profiling --mode sample --out profiles 02_PostgreSQL.py
+#
+# Collapsed stacks render with e.g. `flamegraph.pl <stage>.collapsed > <stage>.svg` or speedscope.
+
+import argparse
+import cProfile
+import fnmatch
+import io
+import os
+import pstats
+import random
+import re
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# ---------- Configuration ----------
+# "sample", "cprofile" or empty (off); "1" means sample
+PROFILE_MODE = os.environ.get("DW_PROFILE", "").lower()
+PROFILE_DIR = os.environ.get("DW_PROFILE_DIR", "profiles")
+# Comma-separated stage name patterns (fnmatch); nested stages are covered by their outermost profiled stage
+PROFILE_STAGES = os.environ.get("DW_PROFILE_STAGES", "*")
+# Sampling interval in milliseconds, and the clock it runs on ("wall" includes time waiting on the database)
+SAMPLE_INTERVAL_MS = float(os.environ.get("DW_PROFILE_INTERVAL_MS", "5"))
+SAMPLE_CLOCK = os.environ.get("DW_PROFILE_CLOCK", "wall")
+# Fraction of runs that profile at all, so it can stay enabled on scheduled runs
+PROFILE_RUN_RATE = float(os.environ.get("DW_PROFILE_RUN_RATE", "1"))
+
+# Rows of the text report
+REPORT_TOP = 30
+
+
+# ---------- Stack Sampler ----------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stack of the thread that starts it from a background thread, and counts collapsed stacks.
+    Each stack is credited with the clock time elapsed since the previous sample, so a long C call (a sort, a
+    merge, `executemany`) that keeps the sampler waiting still gets its share, on the Python frame that called it.
+    """
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS, clock: str = SAMPLE_CLOCK):
+        self.clock = time.process_time if clock == "cpu" else time.perf_counter
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._target)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        last, credit = self.clock(), 0.0
+        while not self._stop.wait(self.interval):
+            now = self.clock()
+            credit += (now - last) / self.interval
+            last = now
+            n = int(credit)
+            if n:
+                credit -= n
+                stack = self._sample()
+                if stack:
+                    self.stacks[stack] += n
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dw-profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def report(self, top: int = REPORT_TOP) -> str:
+        """
+        Functions with the most samples, on top of the stack (self) and anywhere in it (total).
+        """
+        own, total = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            for label in set(frames):
+                total[label] += n
+        n_samples = sum(self.stacks.values()) or 1
+        lines = [f"{n_samples} samples every {self.interval * 1000:g} ms", "",
+                 f"{'self %':>7} {'total %':>8}  function"]
+        for label, n in own.most_common(top):
+            lines.append(f"{100 * n / n_samples:>7.1f} {100 * total[label] / n_samples:>8.1f}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- Stage Profiler ----------
+class StageProfiler:
+    """
+    Profiles the stages whose names match `stages`, one output set per stage.
+    Only one stage is profiled at a time: nested stages run inside their parent's profile.
+    """
+
+    def __init__(self, mode: str = "sample", out_dir: str = PROFILE_DIR, stages: str = PROFILE_STAGES,
+                 interval_ms: float = SAMPLE_INTERVAL_MS, clock: str = SAMPLE_CLOCK):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profiling mode `{mode}`. Choose 'sample' or 'cprofile'.")
+        self.mode = mode
+        self.out_dir = out_dir
+        self.patterns = [p.strip() for p in stages.split(",") if p.strip()]
+        self.interval_ms = interval_ms
+        self.clock = clock
+        self.active = False
+        self.run_id = time.strftime("%Y%m%d_%H%M%S")
+
+    def wants(self, name: str) -> bool:
+        return (not self.active and threading.current_thread() is threading.main_thread()
+                and any(fnmatch.fnmatchcase(name, p) for p in self.patterns))
+
+    def _path(self, name: str, suffix: str) -> str:
+        safe = re.sub(r"[^\w.-]+", "_", name).strip("_")
+        return os.path.join(self.out_dir, f"{self.run_id}_{safe}{suffix}")
+
+    @contextmanager
+    def profile(self, name: str):
+        if not self.wants(name):
+            yield
+            return
+        self.active = True
+        os.makedirs(self.out_dir, exist_ok=True)
+        try:
+            if self.mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(self._path(name, ".prof"))
+                    text = io.StringIO()
+                    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(REPORT_TOP)
+                    with open(self._path(name, ".txt"), "w", encoding="utf-8") as f:
+                        f.write(text.getvalue())
+            else:
+                sampler = StackSampler(self.interval_ms, self.clock)
+                sampler.start()
+                try:
+                    yield
+                finally:
+                    sampler.stop()
+                    with open(self._path(name, ".collapsed"), "w", encoding="utf-8") as f:
+                        f.write(sampler.collapsed())
+                    with open(self._path(name, ".txt"), "w", encoding="utf-8") as f:
+                        f.write(sampler.report())
+        finally:
+            self.active = False
+
+
+def profiler_from_env():
+    """
+    StageProfiler configured by DW_PROFILE*, or None when profiling is off (or this run is not sampled).
+    """
+    if PROFILE_MODE in ("", "0", "off", "false"):
+        return None
+    if random.random() >= PROFILE_RUN_RATE:
+        return None
+    return StageProfiler("sample" if PROFILE_MODE == "1" else PROFILE_MODE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a pipeline script with its stages profiled.")
+    parser.add_argument("script", help="Script to run, e.g. 01_ETL_template.py")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments passed to the script")
+    parser.add_argument("--mode", choices=["sample", "cprofile"], default="sample")
+    parser.add_argument("--out", default=PROFILE_DIR, help="Directory for the profile files")
+    parser.add_argument("--stages", default=PROFILE_STAGES, help="Comma-separated stage name patterns")
+    parser.add_argument("--interval-ms", type=float, default=SAMPLE_INTERVAL_MS)
+    parser.add_argument("--clock", choices=["wall", "cpu"], default=SAMPLE_CLOCK)
+    cli = parser.parse_args()
+
+    from utility import metrics
+    metrics.get_recorder().profiler = StageProfiler(cli.mode, cli.out, cli.stages, cli.interval_ms, cli.clock)
+    sys.argv = [cli.script] + cli.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(cli.script)))
+    runpy.run_path(cli.script, run_name="__main__")
+    print(f"✅ Profiles saved to `{cli.out}`")
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+# read_api.py
+# Small read-only HTTP API over the warehouse (asyncio, stdlib only):
+#   GET /queries                     business queries available in sql/
+#   GET /queries/<name>              run sql/<name>.sql, e.g. /queries/1.1?format=csv
+#                                    (--engine aggregate: unedited fact aggregates via query_fact_aggregate)
+#   GET /tables                      tables in TABLE_SCHEMAS
+#   GET /tables/<name>?limit=100     preview rows of a table (JSON or CSV)
+#   GET /rates/<level>?year=2023     deaths per 100k population (&per=dwellings) by geography
+#   GET /health, GET /stats
+# Database work runs on a bounded pool of worker threads, each keeping its own connection open;
+# identical requests arriving while one is in flight share its result. With the aggregate engine the
+# dimension labels come from a snapshot refreshed in the background every DW_DIM_CACHE_TTL seconds.
+#
+#   python -m utility.read_api --port 8765 --pool-size 4
+#   python -m utility.read_api --sqlite-path project1.sqlite --engine olap
+#   python -m utility.read_api --engine aggregate     # unedited fact aggregates on ids, the rest as SQL
+
+import argparse
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+from utility import pg_utils
+from utility.metrics import log
+from utility.schemas import BUSINESS_AGGREGATE_NAMES, TABLE_SCHEMAS, matches_business_aggregate
+
+# ---------- Configuration ----------
+API_HOST = os.environ.get("DW_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("DW_API_PORT", "8765"))
+# Worker threads, i.e. open database connections
+POOL_SIZE = int(os.environ.get("DW_API_POOL_SIZE", "4"))
+SQL_DIR = "sql"
+DEFAULT_PREVIEW_ROWS = 100
+MAX_PREVIEW_ROWS = 10000
+# Largest request head accepted (request line + headers)
+MAX_HEADER_BYTES = 16384
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- Connection Pool ----------
+class ConnectionPool:
+    """
+    Fixed number of worker threads, each with one long-lived connection of the active backend.
+    A connection that fails is closed and reopened on its thread's next query.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, backend=None):
+        self.backend = backend or pg_utils.get_backend()
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="dw-api")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.executions = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.backend.connect_dedicated()
+            if hasattr(conn, "set_session"):
+                conn.set_session(readonly=True)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, work):
+        """
+        `work(cursor)` on this thread's connection; must run on one of the pool's threads.
+        """
+        conn = self._connection()
+        cur = self.backend.cursor(conn)
+        try:
+            result = work(cur)
+            conn.rollback()  # end the read transaction, so the next query sees fresh data
+            with self._lock:
+                self.executions += 1
+            return result
+        except Exception:
+            self._local.conn = None
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+            raise
+        finally:
+            try:
+                cur.close()
+            except Exception:
+                pass
+
+    def _execute(self, statement: str, params=None):
+        def work(cur):
+            cur.execute(statement, params)
+            return [desc[0] for desc in cur.description], cur.fetchall()
+        return self._call(work)
+
+    def _checksum(self, table_name: str):
+        return self._call(lambda cur: self.backend.table_checksum(cur, table_name))
+
+    async def run(self, statement: str, params=None):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._execute, statement, params)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+# ---------- Query Sources ----------
+def load_business_queries(sql_dir: str = SQL_DIR) -> dict:
+    """
+    Name → last statement of each sql/<name>.sql script.
+    """
+    queries = {}
+    for filename in sorted(os.listdir(sql_dir)):
+        if filename.endswith(".sql"):
+            with open(os.path.join(sql_dir, filename), "r", encoding="utf-8") as f:
+                statements = [stmt.strip() for stmt in f.read().split(";") if stmt.strip()]
+            if statements:
+                queries[filename[:-len(".sql")]] = statements[-1]
+    return queries
+
+
+class OlapQueries:
+    """
+    Business queries answered by the in-process OLAP engine (for backends without CUBE / ROLLUP).
+    """
+
+    def __init__(self, folder: str = "output"):
+        from utility.olap import BUSINESS_QUERIES, StarSchema
+        self.star = StarSchema.load(folder)
+        self.queries = BUSINESS_QUERIES
+        self._lock = threading.Lock()
+
+    def run(self, name: str):
+        with self._lock:
+            df = self.queries[name](self.star)
+        return list(df.columns), [tuple(row) for row in df.astype(object).where(df.notna(), None).to_numpy()]
+
+
+class AggregateQueries:
+    """
+    Business queries that are fact aggregates, answered with 02_PostgreSQL.business_aggregate on the
+    pool's connections: the fact table is grouped on dimension ids on the server and the labels are
+    decoded from a snapshot of the dimension tables. The snapshot is refreshed by `keep_fresh` between
+    requests, so a request never waits for the dimension checksums.
+    Only scripts that still have the text their spec was written for are taken over; edited ones run as SQL.
+    """
+
+    def __init__(self, pool: ConnectionPool, sql_dir: str = SQL_DIR):
+        self.pg = importlib.import_module("02_PostgreSQL")
+        self.pool = pool
+        self.queries = set()
+        for name in BUSINESS_AGGREGATE_NAMES:
+            path = os.path.join(sql_dir, f"{name}.sql")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    if matches_business_aggregate(name, f.read()):
+                        self.queries.add(name)
+        self.version = None
+        self.tables = None
+
+    def _query(self, statement: str, params=None):
+        columns, rows = self.pool._execute(statement, params)
+        return rows, columns
+
+    def refresh(self):
+        """
+        Re-check the dimensions' data version and swap in their tables if it changed (on a pool thread).
+        """
+        version = self.pg.dimension_version(self.pool._checksum)
+        if version != self.version:
+            self.tables = self.pg.read_dimension_tables(version, self._query)
+            self.version = version
+
+    async def keep_fresh(self, interval: float):
+        """
+        Refresh the dimension snapshot every `interval` seconds until cancelled; on failure the
+        previous snapshot stays in use.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(self.pool.executor, self.refresh)
+            except Exception as e:
+                log(f"⚠️ Dimension cache refresh failed, keeping version {self.version}: {e}", error=str(e))
+
+    def run(self, name: str):
+        if self.tables is None:  # only before the first refresh
+            self.refresh()
+        df = self.pg.business_aggregate(name, run=self._query, tables=self.tables)
+        return list(df.columns), [tuple(row) for row in df.astype(object).where(df.notna(), None).to_numpy()]
+
+
+# ---------- Serialisation ----------
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # NumPy scalars from the OLAP engine
+        return value.item()
+    return str(value)
+
+
+def render(columns, rows, fmt: str):
+    if fmt == "csv":
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return "text/csv; charset=utf-8", text.getvalue().encode("utf-8")
+    body = {"columns": list(columns), "rows": [list(row) for row in rows], "row_count": len(rows)}
+    return "application/json", json.dumps(body, default=_json_value).encode("utf-8")
+
+
+# ---------- Application ----------
+class ReadAPI:
+    """
+    Request routing, in-flight request coalescing and the HTTP/1.1 connection loop.
+    """
+
+    def __init__(self, pool: ConnectionPool, queries: dict, engine=None):
+        self.pool = pool
+        self.queries = queries
+        # OlapQueries / AggregateQueries answering the business queries it knows; the others run as SQL
+        self.engine = engine
+        self._in_flight = {}
+        self.stats = {"requests": 0, "coalesced": 0, "errors": 0}
+
+    async def _coalesced(self, key, make_coroutine):
+        """
+        Result of `make_coroutine()`, shared with identical requests already in flight.
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(make_coroutine())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def handle(self, path: str, params: dict):
+        parts = [p for p in path.split("/") if p]
+        fmt = params.get("format", "json")
+        if fmt not in ("json", "csv"):
+            raise HTTPError(400, "format must be json or csv")
+
+        if parts == ["health"]:
+            return "application/json", b'{"status": "ok"}'
+        if parts == ["stats"]:
+            body = dict(self.stats, db_executions=self.pool.executions, in_flight=len(self._in_flight))
+            return "application/json", json.dumps(body).encode("utf-8")
+        if parts == ["queries"]:
+            return render(["query"], [(name,) for name in self.queries], fmt)
+        if parts == ["tables"]:
+            return render(["table"], [(name,) for name in TABLE_SCHEMAS], fmt)
+
+        if len(parts) == 2 and parts[0] == "queries":
+            name = parts[1]
+            if name not in self.queries:
+                raise HTTPError(404, f"Unknown query `{name}`")
+            if self.engine is not None and name in self.engine.queries:
+                loop = asyncio.get_running_loop()
+                columns, rows = await self._coalesced(
+                    ("engine", name), lambda: loop.run_in_executor(self.pool.executor, self.engine.run, name))
+            else:
+                columns, rows = await self._coalesced(("query", name), lambda: self.pool.run(self.queries[name]))
+            return render(columns, rows, fmt)
+
+        if len(parts) == 2 and parts[0] == "tables":
+            name = parts[1]
+            if name not in TABLE_SCHEMAS:  # also keeps arbitrary SQL out of the statement
+                raise HTTPError(404, f"Unknown table `{name}`")
+            try:
+                limit = int(params.get("limit", DEFAULT_PREVIEW_ROWS))
+            except ValueError:
+                raise HTTPError(400, "limit must be an integer")
+            limit = max(0, min(limit, MAX_PREVIEW_ROWS))
+            statement = f"SELECT * FROM {name} LIMIT {limit}"
+            columns, rows = await self._coalesced(("table", name, limit), lambda: self.pool.run(statement))
+            return render(columns, rows, fmt)
+
+        if len(parts) == 2 and parts[0] == "rates":
+            level, per = parts[1], params.get("per", "population")
+            try:
+                year = int(params.get("year", 2023))
+                statement = pg_utils.death_rate_sql(level, per)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            columns, rows = await self._coalesced(("rates", level, year, per),
+                                                  lambda: self.pool.run(statement, (year, year)))
+            return render(columns, rows, fmt)
+
+        raise HTTPError(404, f"No route for `{path}`")
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, "text/plain", b"Request head too large", False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, "text/plain", b"Malformed request line", False)
+                    break
+                headers = {k.strip().lower(): v.strip() for k, v in
+                           (line.split(":", 1) for line in lines[1:] if ":" in line)}
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+
+                self.stats["requests"] += 1
+                if method != "GET":
+                    status, content_type, body = 405, "text/plain", b"Only GET is supported"
+                else:
+                    url = urlsplit(target)
+                    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    try:
+                        content_type, body = await self.handle(url.path, params)
+                        status = 200
+                    except HTTPError as e:
+                        status, content_type, body = e.status, "text/plain", str(e).encode("utf-8")
+                    except Exception as e:
+                        # The details (SQL, driver messages) go to the log, not to the client
+                        self.stats["errors"] += 1
+                        log(f"❌ GET {url.path} failed: {type(e).__name__}: {e}", path=url.path, error=str(e))
+                        status, content_type, body = 500, "text/plain", b"Internal server error"
+                await self._respond(writer, status, content_type, body, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status: int, content_type: str, body: bytes, keep_alive: bool):
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT, pool_size: int = POOL_SIZE,
+                engine: str = "sql", ready: asyncio.Event = None):
+    """
+    Run the API until cancelled. `engine="aggregate"` answers the unedited business fact aggregates with
+    query_fact_aggregate, `engine="olap"` answers the business queries in process, `"sql"` runs their scripts.
+    """
+    pool = ConnectionPool(pool_size)
+    refresher = None
+    if engine == "aggregate":
+        aggregates = AggregateQueries(pool)
+        await asyncio.get_running_loop().run_in_executor(pool.executor, aggregates.refresh)
+        refresher = asyncio.ensure_future(aggregates.keep_fresh(aggregates.pg.DIMENSION_CACHE_TTL))
+        api = ReadAPI(pool, load_business_queries(), aggregates)
+    else:
+        api = ReadAPI(pool, load_business_queries(), OlapQueries() if engine == "olap" else None)
+    server = await asyncio.start_server(api.serve_connection, host, port, limit=MAX_HEADER_BYTES)
+    log(f"🚀 Serving on http://{host}:{server.sockets[0].getsockname()[1]} "
+        f"({pool.backend.name}, {pool_size} connections, engine={engine})")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if refresher is not None:
+            refresher.cancel()
+        pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the business queries and table previews over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE)
+    parser.add_argument("--engine", choices=["aggregate", "sql", "olap"], default="sql",
+                        help="sql: run the scripts as they are (default); aggregate: unedited fact aggregates on "
+                             "ids, labels from the dimension cache; olap: answer the business queries with utility.olap")
+    parser.add_argument("--sqlite-path", help="Serve this SQLite database instead of PostgreSQL")
+    cli = parser.parse_args()
+
+    if cli.sqlite_path:
+        pg_utils.set_backend("sqlite", path=cli.sqlite_path)
+    try:
+        asyncio.run(serve(cli.host, cli.port, cli.pool_size, cli.engine))
+    except KeyboardInterrupt:
+        pass
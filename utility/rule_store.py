@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# rule_store.py
+# Typed columnar store for mined association rules with an inverted index from item to rule ids.
+# Antecedents and consequents are list columns (offsets + item ids into a shared vocabulary),
+# so "rules containing X with lift > y" is an index lookup instead of parsing text.
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+METRIC_COLUMNS = ["support", "confidence", "lift", "antecedent support", "consequent support", "leverage", "conviction"]
+
+
+def _to_csr(lists: List[List[int]]):
+    """
+    Flatten a list of id lists into (offsets, values).
+    """
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(x) for x in lists])
+    values = np.fromiter((v for x in lists for v in x), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _invert(offsets: np.ndarray, values: np.ndarray, n_items: int):
+    """
+    Build item -> sorted rule ids postings from rule -> item lists.
+    """
+    rule_ids = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    order = np.lexsort((rule_ids, values))
+    postings = rule_ids[order]
+    index_offsets = np.zeros(n_items + 1, dtype=np.int64)
+    index_offsets[1:] = np.cumsum(np.bincount(values, minlength=n_items))
+    return index_offsets, postings
+
+
+class RuleStore:
+    """
+    Rules from every mining combination, with list-typed antecedents / consequents
+    and inverted indexes (item -> rule ids) for each side.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.vocabulary = [str(v) for v in arrays["vocabulary"]]
+        self.item_ids = {item: i for i, item in enumerate(self.vocabulary)}
+        self.combos = [str(v) for v in arrays["combos"]]
+
+    def __len__(self):
+        return len(self.arrays["combo_codes"])
+
+    # ---------- Construction & Persistence ----------
+    @classmethod
+    def from_rules(cls, rules: pd.DataFrame) -> "RuleStore":
+        """
+        Build a store from mined rules (frozenset antecedents / consequents and a `combo` column).
+        """
+        antecedents = [sorted(x) for x in rules["antecedents"]]
+        consequents = [sorted(x) for x in rules["consequents"]]
+        vocabulary = sorted({item for items in antecedents + consequents for item in items})
+        item_ids = {item: i for i, item in enumerate(vocabulary)}
+
+        combo_values = rules["combo"] if "combo" in rules.columns else pd.Series([""] * len(rules))
+        combo_codes, combos = pd.factorize(combo_values)
+
+        arrays = {
+            "vocabulary": np.array(vocabulary, dtype=str),
+            "combos": np.array(list(combos), dtype=str),
+            "combo_codes": combo_codes.astype(np.int32),
+        }
+        for side, lists in (("antecedent", antecedents), ("consequent", consequents)):
+            offsets, values = _to_csr([[item_ids[item] for item in items] for items in lists])
+            index_offsets, postings = _invert(offsets, values, len(vocabulary))
+            arrays[f"{side}_offsets"] = offsets
+            arrays[f"{side}_items"] = values
+            arrays[f"{side}_index_offsets"] = index_offsets
+            arrays[f"{side}_index_rules"] = postings
+        for col in METRIC_COLUMNS:
+            if col in rules.columns:
+                arrays[f"metric:{col}"] = rules[col].to_numpy(dtype=np.float64)
+        return cls(arrays)
+
+    def save(self, path: str):
+        np.savez_compressed(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "RuleStore":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    # ---------- Lookups ----------
+    def metric(self, name: str) -> np.ndarray:
+        return self.arrays[f"metric:{name}"]
+
+    def rules_with(self, item: str, side: str = "any") -> np.ndarray:
+        """
+        Sorted ids of rules mentioning `item` in the antecedent, consequent, or either side.
+        """
+        item_id = self.item_ids.get(item)
+        if item_id is None:
+            return np.empty(0, dtype=np.int32)
+        sides = ["antecedent", "consequent"] if side == "any" else [side]
+        found = []
+        for s in sides:
+            offsets = self.arrays[f"{s}_index_offsets"]
+            found.append(self.arrays[f"{s}_index_rules"][offsets[item_id]:offsets[item_id + 1]])
+        return np.union1d(*found) if len(found) == 2 else found[0]
+
+    def query(self, contains: Iterable[str] = (), antecedent: Iterable[str] = (), consequent: Iterable[str] = (),
+              min_support: Optional[float] = None, min_confidence: Optional[float] = None,
+              min_lift: Optional[float] = None, combo: Optional[str] = None) -> pd.DataFrame:
+        """
+        Rules mentioning all items in `contains` (either side), `antecedent` and `consequent`,
+        filtered by metric thresholds and combination, sorted by lift then confidence.
+        """
+        ids = None
+        for side, items in (("any", contains), ("antecedent", antecedent), ("consequent", consequent)):
+            for item in items:
+                postings = self.rules_with(item, side)
+                ids = postings if ids is None else np.intersect1d(ids, postings, assume_unique=True)
+        if ids is None:
+            ids = np.arange(len(self), dtype=np.int32)
+
+        keep = np.ones(len(ids), dtype=bool)
+        for name, threshold in (("support", min_support), ("confidence", min_confidence), ("lift", min_lift)):
+            if threshold is not None:
+                keep &= self.metric(name)[ids] >= threshold
+        if combo is not None:
+            code = self.combos.index(combo) if combo in self.combos else -1
+            keep &= self.arrays["combo_codes"][ids] == code
+
+        return self.to_frame(ids[keep])
+
+    def _items(self, side: str, rule_id: int) -> List[str]:
+        offsets = self.arrays[f"{side}_offsets"]
+        values = self.arrays[f"{side}_items"][offsets[rule_id]:offsets[rule_id + 1]]
+        return [self.vocabulary[v] for v in values]
+
+    def to_frame(self, ids: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Materialise rules as a DataFrame with list-typed antecedents / consequents.
+        """
+        # int64 rule ids whichever lookup produced them (the postings are int32)
+        ids = np.arange(len(self), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        df = pd.DataFrame({
+            "rule_id": ids,
+            "combo": [self.combos[c] for c in self.arrays["combo_codes"][ids]],
+            "antecedents": [self._items("antecedent", i) for i in ids],
+            "consequents": [self._items("consequent", i) for i in ids],
+        })
+        for key in self.arrays:
+            if key.startswith("metric:"):
+                df[key[len("metric:"):]] = self.arrays[key][ids]
+        return df.sort_values(by=["lift", "confidence"], ascending=False, kind="stable").reset_index(drop=True)
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 # schemas.py
+import hashlib
+import re
+
 # ✅ Define table import order for CSV loading & table creation in ETL or database initialization.
 TABLE_IMPORT_ORDER = [
     "dim_location",
@@ -10,6 +13,7 @@ TABLE_IMPORT_ORDER = [
     "dim_time",
     "dim_vehicle",
     "dim_road",
+    "geo_denominator",
     "fact_fatal_crash",
     "fact_person_fatality"
 ]
@@ -82,6 +86,18 @@ TABLE_SCHEMAS = {
         speed_category VARCHAR(20)
     """,
 
+    # Population (by year) and 2021 dwelling denominators per geography, matched to dim_location
+    # by geo_level: state, remoteness, state_remoteness, sa4, lga
+    "geo_denominator": """
+        geography_id SERIAL PRIMARY KEY,
+        geo_level VARCHAR(20),
+        state VARCHAR(20),
+        geo_name VARCHAR(100),
+        year INTEGER,
+        population INTEGER,
+        dwelling_records INTEGER
+    """,
+
     # Fact table summarizing each fatal crash event
     "fact_fatal_crash": """
         fact_crash_id INTEGER PRIMARY KEY,
@@ -127,3 +143,57 @@ TABLE_SCHEMAS = {
 }
 
 
+
+
+# ✅ Control tables used by the loader itself (created and dropped with the data tables, never exported)
+IMPORT_CHECKPOINT_TABLE = "import_checkpoint"
+CONTROL_TABLE_SCHEMAS = {
+    # Progress of the chunked CSV import: bytes and rows of each table's CSV committed so far,
+    # and the size / mtime / head-and-tail hash identifying the file they were read from
+    IMPORT_CHECKPOINT_TABLE: """
+        table_name VARCHAR(50) PRIMARY KEY,
+        byte_offset BIGINT,
+        rows_committed BIGINT,
+        file_size BIGINT,
+        file_mtime_ns BIGINT,
+        file_hash VARCHAR(32),
+        updated_at TIMESTAMP
+    """
+}
+
+
+# ✅ Business queries sql/<name>.sql that are fact aggregates (02_PostgreSQL.BUSINESS_AGGREGATES), named here
+# so that callers can tell them apart without importing pandas. Each maps to the SHA-256 of the script text
+# its spec was written for: an edited script no longer matches and runs as SQL.
+BUSINESS_AGGREGATE_SCRIPTS = {
+    "1.1": "3df45c5bc548082f0c0f16dec63238190d669c24c11b75765d85cae08e4dfb0f",
+    "1.2": "dd6361374b30f85bafb2273b2797d38f99902d6d7d0f2c954ec2c475c94fdfd2",
+    "1.3": "b6c104c7b4d6331bceb9b0253d3ad53145d415f89e27cd9d83406c2137f4366d",
+    "1.4": "e37d065157545259497c1046fc8575b3d9e75f2f3ad9760eb567d94d9e586840",
+    "1.6": "d8b48ef9142ce6efbc875fa118d6b832c7c23513f6fc5bac914a0e7df446484e",
+}
+BUSINESS_AGGREGATE_NAMES = list(BUSINESS_AGGREGATE_SCRIPTS)
+
+
+# ✅ Whether script `name` still has the text its BUSINESS_AGGREGATES spec was written for
+def matches_business_aggregate(name: str, text: str) -> bool:
+    digest = hashlib.sha256(text.replace("\r\n", "\n").encode("utf-8")).hexdigest()
+    return BUSINESS_AGGREGATE_SCRIPTS.get(name) == digest
+
+# ✅ Parse the column definitions (name, SQL type and constraints) out of a table's DDL
+def table_columns(table_name: str) -> list:
+    columns = []
+    for line in TABLE_SCHEMAS[table_name].split(",\n"):
+        line = line.strip()
+        if not line or line.upper().startswith("FOREIGN KEY"):
+            continue
+        name, definition = line.split(None, 1)
+        columns.append((name, definition))
+    return columns
+
+
+# ✅ Parse the foreign keys out of a table's DDL as (column, referenced table, referenced column)
+def table_foreign_keys(table_name: str) -> list:
+    pattern = r"FOREIGN\s+KEY\s*\(\s*(\w+)\s*\)\s*REFERENCES\s+(\w+)\s*\(\s*(\w+)\s*\)"
+    return re.findall(pattern, TABLE_SCHEMAS[table_name], flags=re.IGNORECASE)
+
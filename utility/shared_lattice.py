@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# shared_lattice.py
+# Incremental frequent-itemset mining for parameter combinations that share most of their columns.
+# The lattice of the shared base columns is mined once; each combination only adds the
+# itemsets that involve its own variable columns.
+
+from itertools import groupby
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utility.item_matrix import ItemMatrix
+
+
+class SharedLattice:
+    """
+    Frequent itemsets over `base_columns`, reusable across combinations.
+
+    For a combination with extra (variable) columns, every frequent itemset is either a
+    base itemset or V ∪ B, where V is a frequent set of variable items (at most one per
+    column) and B is a frequent base itemset (possibly empty). Extensions are computed
+    once per V and shared by all combinations containing V's columns, so the itemsets
+    returned are exactly those an independent apriori run would find.
+    """
+
+    def __init__(self, item_matrix: ItemMatrix, base_columns: Sequence[str], min_support: float = 0.02):
+        self.items = item_matrix.items
+        self.item_columns = item_matrix.item_columns
+        self.min_support = min_support
+        self.n_rows = item_matrix.shape[0]
+        self.X = np.asfortranarray(item_matrix.matrix.toarray())
+
+        self.base_columns = list(base_columns)
+        self.base_items = self._column_ordered(self.base_columns)
+        self._all_rows = np.arange(self.n_rows)
+
+        # frozenset(item ids) -> support
+        self.base_lattice = self._mine(self._all_rows, self.base_items, prefix=())
+        self._extensions: Dict[frozenset, Dict[frozenset, float]] = {}
+
+    def _column_ordered(self, columns: Sequence[str]) -> List[List[int]]:
+        """
+        Item ids of `columns`, grouped per column (items of one column never co-occur).
+        """
+        wanted = set(columns)
+        ids = sorted((i for i, owner in enumerate(self.item_columns) if owner in wanted),
+                     key=lambda i: (self.item_columns[i], self.items[i]))
+        return [list(group) for _, group in groupby(ids, key=lambda i: self.item_columns[i])]
+
+    def _mine(self, rows: np.ndarray, groups: List[List[int]], prefix: tuple,
+              allowed: Dict[frozenset, float] = None) -> Dict[frozenset, float]:
+        """
+        Depth-first search over `groups` within `rows`, taking at most one item per group.
+        When `allowed` is given, base parts outside it are pruned (they cannot be frequent).
+        Keys are prefix ∪ base part; the prefix is not itself included.
+        """
+        found = {}
+
+        def search(rows, start, base_part):
+            for g in range(start, len(groups)):
+                for i in groups[g]:
+                    sub = rows[self.X[rows, i]]
+                    support = len(sub) / self.n_rows
+                    if support < self.min_support:
+                        continue
+                    part = base_part | {i}
+                    if allowed is not None and frozenset(part) not in allowed:
+                        continue
+                    found[frozenset(prefix) | frozenset(part)] = support
+                    search(sub, g + 1, part)
+
+        search(rows, 0, frozenset())
+        return found
+
+    def _extend(self, variable_items: frozenset) -> Dict[frozenset, float]:
+        """
+        Frequent itemsets V ∪ B for one set of variable items V (cached).
+        """
+        if variable_items not in self._extensions:
+            rows = self._all_rows
+            for i in variable_items:
+                rows = rows[self.X[rows, i]]
+            found = {}
+            support = len(rows) / self.n_rows
+            if support >= self.min_support:
+                found[variable_items] = support
+                found.update(self._mine(rows, self.base_items, prefix=tuple(variable_items),
+                                        allowed=self.base_lattice))
+            self._extensions[variable_items] = found
+        return self._extensions[variable_items]
+
+    def frequent_itemsets(self, columns: Sequence[str]) -> pd.DataFrame:
+        """
+        All frequent itemsets over `columns` (base columns plus variable ones),
+        as an mlxtend-style DataFrame with `support` and `itemsets` columns.
+        """
+        variable_groups = self._column_ordered([c for c in columns if c not in self.base_columns])
+        itemsets = dict(self.base_lattice)
+
+        # Enumerate frequent combinations of variable items, at most one per column
+        def combine(start, chosen):
+            for g in range(start, len(variable_groups)):
+                for i in variable_groups[g]:
+                    current = chosen | {i}
+                    extension = self._extend(frozenset(current))
+                    if not extension:
+                        continue
+                    itemsets.update(extension)
+                    combine(g + 1, current)
+
+        combine(0, frozenset())
+
+        return pd.DataFrame({
+            "support": list(itemsets.values()),
+            "itemsets": [frozenset(self.items[i] for i in key) for key in itemsets],
+        })
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+# synthetic_sources.py
+# Seeded generator of synthetic BITRE / ABS source files in the exact layouts read by
+# 01_ETL_template.py (sheet names, skipped header rows, sentinel values), for testing the
+# ETL, the database import and the miner at volumes beyond the real ~55k fatalities.
+#
+#   python -m utility.synthetic_sources --rows 550000 --out synthetic_sources
+#   DW_DATA_DIR=synthetic_sources DW_OUTPUT_DIR=synthetic_output python 01_ETL_template.py
+
+import argparse
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Excel worksheets hold at most this many rows (header rows included)
+XLSX_MAX_ROWS = 1_048_576
+
+CRASH_FILE = "Fatal_Crashes_December_2024.xlsx"
+FATALITY_FILE = "bitre_fatalities_dec2024.xlsx"
+POPULATION_FILE = "Population_estimates.xlsx"
+DWELLING_FILE = "LGA (count of dwellings).csv"
+
+# ---------- Raw column layouts ----------
+CRASH_COLUMNS = [
+    "Crash ID", "State", "Month", "Year", "Dayweek", "Time", "Crash Type", "Number Fatalities",
+    "Bus Involvement", "Heavy Rigid Truck Involvement", "Articulated Truck Involvement", "Speed Limit",
+    "National Remoteness Areas", "SA4 Name 2021", "National LGA Name 2021", "National Road Type",
+    "Christmas Period", "Easter Period", "Day of week", "Time of Day",
+]
+FATALITY_COLUMNS = [
+    "Crash ID", "State", "Month", "Year", "Dayweek", "Time", "Crash Type", "Bus Involvement",
+    "Heavy Rigid Truck Involvement", "Articulated Truck Involvement", "Speed Limit", "Road User", "Gender",
+    "Age", "National Remoteness Areas", "SA4 Name 2021", "National LGA Name 2021", "National Road Type",
+    "Christmas Period", "Easter Period", "Age Group", "Day of week", "Time of Day",
+]
+
+# ---------- Category distributions (shares in the 1989-2024 extract) ----------
+YEAR_WEIGHTS = {
+    1989: 2332, 1990: 1980, 1991: 1806, 1992: 1669, 1993: 1663, 1994: 1656, 1995: 1765, 1996: 1706,
+    1997: 1546, 1998: 1512, 1999: 1514, 2000: 1569, 2001: 1494, 2002: 1471, 2003: 1399, 2004: 1401,
+    2005: 1408, 2006: 1412, 2007: 1414, 2008: 1301, 2009: 1339, 2010: 1230, 2011: 1139, 2012: 1176,
+    2013: 1091, 2014: 1039, 2015: 1094, 2016: 1192, 2017: 1118, 2018: 1047, 2019: 1089, 2020: 992,
+    2021: 1035, 2022: 1092, 2023: 1137, 2024: 1098,
+}
+# Share of crashes with a geocoded location (LGA / SA4 / remoteness, road type) by year
+GEOCODED_SHARE = {2014: 0.26, 2015: 0.78, 2016: 0.79}
+GEOCODED_FROM = 2017
+
+MONTH_WEIGHTS = [0.081, 0.076, 0.090, 0.081, 0.085, 0.081, 0.082, 0.083, 0.082, 0.086, 0.085, 0.088]
+DAYWEEK_WEIGHTS = {
+    "Monday": 0.117, "Tuesday": 0.119, "Wednesday": 0.127, "Thursday": 0.137,
+    "Friday": 0.163, "Saturday": 0.179, "Sunday": 0.158,
+}
+FATALITIES_PER_CRASH = {1: 45687, 2: 3428, 3: 587, 4: 157, 5: 43, 6: 14, 7: 3, 8: 2}
+CRASH_TYPE_WEIGHTS = {"Single": 0.573, "Multiple": 0.427}
+DAY_SHARE = 0.571
+ROAD_TYPE_WEIGHTS = {
+    "National or State Highway": 0.281, "Arterial Road": 0.238, "Local Road": 0.211,
+    "Sub-arterial Road": 0.172, "Collector Road": 0.079, "Access road": 0.013,
+    "Pedestrian Thoroughfare": 0.0015, "Busway": 0.0005,
+}
+SPEED_WEIGHTS = {
+    100: 0.3368, 60: 0.274, 80: 0.1234, 110: 0.1116, 50: 0.0644, 70: 0.052, 90: 0.0212, 40: 0.008,
+    75: 0.0047, 130: 0.0022, 20: 0.0007, 10: 0.0005, 30: 0.0004, 5: 0.0001, 25: 0.0001,
+}
+# Road user share, then (male share, age mean, age sd) per road user
+ROAD_USERS = {
+    "Driver": (0.4538, 0.752, 41.9, 20.1),
+    "Passenger": (0.2242, 0.524, 35.0, 24.0),
+    "Pedestrian": (0.1539, 0.677, 47.4, 25.8),
+    "Motorcycle rider": (0.1322, 0.963, 35.9, 14.8),
+    "Pedal cyclist": (0.0273, 0.867, 39.9, 22.4),
+    "Motorcycle pillion passenger": (0.0067, 0.434, 28.7, 12.5),
+}
+AGE_GROUPS = [(0, "0_to_16"), (17, "17_to_25"), (26, "26_to_39"), (40, "40_to_64"), (65, "65_to_74"),
+              (75, "75_or_older")]
+
+# Sentinel rates: raw codes the cleaning step maps to missing values
+SENTINEL_RATES = {
+    "speed_unknown": 0.010,     # Speed Limit = -9 (row dropped)
+    "speed_below_40": 0.004,    # Speed Limit = "<40" (mapped to 40)
+    "age_unknown": 0.002,       # Age = -9 (row dropped)
+    "road_user_other": 0.002,   # Road User = "Other/-9"
+    "gender_unknown": 0.0004,   # Gender = "Unknown"
+    "bus_unknown": 0.0009,      # Bus Involvement = -9
+    "articulated_unknown": 0.0008,
+}
+HEAVY_RIGID_UNRECORDED_BEFORE = 2005  # Heavy Rigid Truck Involvement is mostly -9 before this year
+
+# ---------- Geography ----------
+# (BITRE code, state name, ABS suffix, crash share, LGAs, SA4s, remoteness weights, capital)
+REMOTENESS_AREAS = ["Major Cities of Australia", "Inner Regional Australia", "Outer Regional Australia",
+                    "Remote Australia", "Very Remote Australia"]
+STATES = [
+    ("NSW", "New South Wales", "NSW", 0.312, 128, 28, [0.30, 0.35, 0.25, 0.06, 0.04], "Sydney"),
+    ("Vic", "Victoria", "Vic.", 0.222, 80, 17, [0.40, 0.38, 0.20, 0.02, 0.00], "Melbourne"),
+    ("Qld", "Queensland", "Qld", 0.206, 78, 19, [0.25, 0.30, 0.25, 0.10, 0.10], "Brisbane"),
+    ("SA", "South Australia", "SA", 0.087, 72, 7, [0.25, 0.20, 0.30, 0.15, 0.10], "Adelaide"),
+    ("WA", "Western Australia", "WA", 0.121, 140, 10, [0.20, 0.15, 0.25, 0.20, 0.20], "Perth"),
+    ("Tas", "Tasmania", "Tas.", 0.030, 29, 4, [0.00, 0.60, 0.35, 0.03, 0.02], "Hobart"),
+    ("NT", "Northern Territory", "NT", 0.019, 18, 2, [0.00, 0.00, 0.40, 0.30, 0.30], "Darwin"),
+    ("ACT", "Australian Capital Territory", "ACT", 0.003, 1, 1, [1.00, 0.00, 0.00, 0.00, 0.00], "Canberra"),
+]
+OTHER_TERRITORIES = ("OT", "Other Territories", "OT")
+DWELLING_DATA_ROWS = 556  # rows read by load_dwelling_data()
+
+SYLLABLES = ["al", "bar", "ben", "bo", "bri", "bun", "cal", "cor", "dal", "dar", "gar", "gong", "gun", "jin",
+             "kal", "kin", "lan", "lar", "lon", "mar", "mel", "mur", "na", "nar", "ning", "oo", "ra", "ray",
+             "ren", "ri", "ro", "ta", "tam", "ton", "wa", "wal", "war", "wick", "wol", "yar", "yan", "worth"]
+
+
+def _names(rng: np.random.Generator, count: int, taken: set) -> list:
+    """
+    `count` distinct place-like names built from syllables (none containing "total").
+    """
+    names = []
+    while len(names) < count:
+        name = "".join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).capitalize()
+        if name not in taken and "total" not in name.lower():
+            taken.add(name)
+            names.append(name)
+    return names
+
+
+def _choice(rng: np.random.Generator, weights: dict, size: int) -> np.ndarray:
+    keys = list(weights)
+    p = np.array([weights[k] for k in keys], dtype=float)
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size=size, p=p / p.sum())]
+
+
+def build_geography(rng: np.random.Generator) -> pd.DataFrame:
+    """
+    One row per LGA: state, name, SA4, one or two remoteness areas, 2001-2023 populations, dwellings.
+    """
+    taken = set()
+    rows = []
+    for code, state_name, suffix, _, n_lgas, n_sa4, remoteness_weights, capital in STATES:
+        sa4_names = [f"{capital} - {name}" if i < n_sa4 // 2 else name
+                     for i, name in enumerate(_names(rng, n_sa4, taken))]
+        lga_names = _names(rng, n_lgas - 1, taken) + [f"Unincorporated {code}"]
+        for i, lga in enumerate(lga_names):
+            areas = rng.choice(len(REMOTENESS_AREAS), size=2, p=remoteness_weights)
+            remoteness = [REMOTENESS_AREAS[areas[0]]]
+            if areas[1] != areas[0] and rng.random() < 0.2:
+                remoteness.append(REMOTENESS_AREAS[areas[1]])
+            population = int(rng.lognormal(9.5, 1.3)) + 200
+            rows.append({
+                "state": code, "state_name": state_name, "suffix": suffix, "lga_name": lga,
+                "sa4_name": sa4_names[i % n_sa4], "remoteness": remoteness,
+                "population_2023": population, "growth": rng.normal(0.012, 0.008),
+                "dwellings": int(population / rng.uniform(2.2, 2.8)),
+            })
+    code, state_name, suffix = OTHER_TERRITORIES
+    rows.append({"state": code, "state_name": state_name, "suffix": suffix,
+                 "lga_name": "Unincorp. Other Territories", "sa4_name": "Other Territories",
+                 "remoteness": ["Very Remote Australia"], "population_2023": 2516, "growth": 0.0,
+                 "dwellings": 1376})
+    return pd.DataFrame(rows)
+
+
+# ---------- Crash & fatality records ----------
+def generate_records(n_fatalities: int, geography: pd.DataFrame, rng: np.random.Generator):
+    """
+    Crash-level and person-level raw tables. Every crash has exactly `Number Fatalities`
+    fatality rows sharing its crash attributes, and the fatality rows sum to `n_fatalities`.
+    """
+    # Fatalities per crash, trimmed so the total is exactly n_fatalities
+    sizes = _choice(rng, FATALITIES_PER_CRASH, int(n_fatalities / 1.1) + 100).astype(np.int64)
+    while sizes.sum() < n_fatalities:
+        sizes = np.concatenate([sizes, _choice(rng, FATALITIES_PER_CRASH, 1000).astype(np.int64)])
+    ends = np.cumsum(sizes)
+    n_crashes = int(np.searchsorted(ends, n_fatalities) + 1)
+    sizes = sizes[:n_crashes]
+    sizes[-1] -= int(ends[n_crashes - 1] - n_fatalities)
+
+    crashes = pd.DataFrame({"Number Fatalities": sizes})
+    crashes["Year"] = _choice(rng, YEAR_WEIGHTS, n_crashes).astype(np.int64)
+    crashes["Month"] = rng.choice(12, size=n_crashes, p=np.array(MONTH_WEIGHTS) / sum(MONTH_WEIGHTS)) + 1
+    crashes["Dayweek"] = _choice(rng, DAYWEEK_WEIGHTS, n_crashes)
+    crashes["Day of week"] = np.where(crashes["Dayweek"].isin(["Saturday", "Sunday"]), "Weekend", "Weekday")
+
+    day = rng.random(n_crashes) < DAY_SHARE
+    hours = np.where(day, rng.integers(6, 18, n_crashes), (rng.integers(18, 30, n_crashes)) % 24)
+    crashes["Time"] = [f"{h:02d}:{m:02d}" for h, m in zip(hours, rng.integers(0, 60, n_crashes))]
+    crashes["Time of Day"] = np.where(day, "Day", "Night")
+    crashes["Crash Type"] = _choice(rng, CRASH_TYPE_WEIGHTS, n_crashes)
+
+    # Holiday periods fall around late December / early January and March / April
+    month = crashes["Month"].to_numpy()
+    christmas = rng.random(n_crashes) < np.select([month == 12, month == 1], [0.25, 0.12], 0.0)
+    easter = rng.random(n_crashes) < np.where(np.isin(month, [3, 4]), 0.035, 0.0)
+    crashes["Christmas Period"] = np.where(christmas, "Yes", "No")
+    crashes["Easter Period"] = np.where(easter, "Yes", "No")
+
+    # Location: state by crash share, LGA by population within the state
+    state_codes = [s[0] for s in STATES]
+    crashes["State"] = _choice(rng, {s[0]: s[3] for s in STATES}, n_crashes)
+    lga_index = np.empty(n_crashes, dtype=np.int64)
+    for code in state_codes:
+        rows = np.flatnonzero(crashes["State"].to_numpy() == code)
+        candidates = geography.index[geography["state"] == code].to_numpy()
+        p = geography.loc[candidates, "population_2023"].to_numpy(dtype=float) ** 0.5
+        lga_index[rows] = rng.choice(candidates, size=len(rows), p=p / p.sum())
+    lgas = geography.loc[lga_index]
+    pick = rng.random(n_crashes)
+    remoteness = [areas[int(u * len(areas))] for areas, u in zip(lgas["remoteness"], pick)]
+
+    # Older crashes are not geocoded: blank LGA / SA4 / remoteness and an undetermined road type
+    year = crashes["Year"].to_numpy()
+    geocoded_share = np.array([1.0 if y >= GEOCODED_FROM else GEOCODED_SHARE.get(y, 0.0) for y in year])
+    geocoded = rng.random(n_crashes) < geocoded_share
+    crashes["National Remoteness Areas"] = np.where(geocoded, remoteness, None)
+    crashes["SA4 Name 2021"] = np.where(geocoded, lgas["sa4_name"].to_numpy(), None)
+    crashes["National LGA Name 2021"] = np.where(geocoded, lgas["lga_name"].to_numpy(), None)
+    crashes["National Road Type"] = np.where(geocoded, _choice(rng, ROAD_TYPE_WEIGHTS, n_crashes), "Undetermined")
+
+    # Speed limit with the raw -9 / "<40" codes
+    speed = _choice(rng, SPEED_WEIGHTS, n_crashes)
+    u = rng.random(n_crashes)
+    speed = np.where(u < SENTINEL_RATES["speed_unknown"], -9, speed)
+    speed = np.where((u >= SENTINEL_RATES["speed_unknown"])
+                     & (u < SENTINEL_RATES["speed_unknown"] + SENTINEL_RATES["speed_below_40"]), "<40", speed)
+    crashes["Speed Limit"] = speed
+
+    # Vehicle involvement; articulated trucks are more common on high-speed roads
+    high_speed = np.isin(crashes["Speed Limit"].astype(str), ["100", "110", "130"])
+    crashes["Bus Involvement"] = np.where(rng.random(n_crashes) < 0.0165, "Yes", "No")
+    crashes["Heavy Rigid Truck Involvement"] = np.where(rng.random(n_crashes) < 0.052, "Yes", "No")
+    crashes["Articulated Truck Involvement"] = np.where(rng.random(n_crashes) < np.where(high_speed, 0.16, 0.06),
+                                                        "Yes", "No")
+    crashes.loc[rng.random(n_crashes) < SENTINEL_RATES["bus_unknown"], "Bus Involvement"] = -9
+    crashes.loc[rng.random(n_crashes) < SENTINEL_RATES["articulated_unknown"], "Articulated Truck Involvement"] = -9
+    unrecorded = (year < HEAVY_RIGID_UNRECORDED_BEFORE) & (rng.random(n_crashes) < 0.8)
+    crashes.loc[unrecorded, "Heavy Rigid Truck Involvement"] = -9
+
+    # Crash ID: year, one-digit state code, sequence within year and state (at least 3 digits)
+    state_digit = pd.Series(crashes["State"]).map({code: i + 1 for i, code in enumerate(state_codes)}).to_numpy()
+    seq = crashes.groupby(["Year", "State"]).cumcount().to_numpy() + 1
+    width = np.maximum(3, np.floor(np.log10(seq)).astype(np.int64) + 1)
+    crashes["Crash ID"] = (year * 10 + state_digit) * 10 ** width + seq
+    crashes = crashes.sort_values(["Year", "Month", "Crash ID"], ascending=[False, False, True]).reset_index(drop=True)
+
+    # Person-level rows: one per fatality, repeating the crash attributes
+    fatalities = crashes.loc[crashes.index.repeat(crashes["Number Fatalities"])].reset_index(drop=True)
+    n = len(fatalities)
+    users = list(ROAD_USERS)
+    user_index = rng.choice(len(users), size=n, p=np.array([ROAD_USERS[r][0] for r in users]) /
+                            sum(ROAD_USERS[r][0] for r in users))
+    male_share, age_mean, age_sd = (np.array([ROAD_USERS[r][k] for r in users])[user_index] for k in (1, 2, 3))
+    age = np.clip(np.round(rng.normal(age_mean, age_sd)), 0, 101).astype(np.int64)
+    road_user = np.array(users, dtype=object)[user_index]
+    gender = np.where(rng.random(n) < male_share, "Male", "Female").astype(object)
+
+    road_user[rng.random(n) < SENTINEL_RATES["road_user_other"]] = "Other/-9"
+    gender[rng.random(n) < SENTINEL_RATES["gender_unknown"]] = "Unknown"
+    age_unknown = rng.random(n) < SENTINEL_RATES["age_unknown"]
+    bounds = np.array([b for b, _ in AGE_GROUPS])
+    age_group = np.array([label for _, label in AGE_GROUPS], dtype=object)[np.searchsorted(bounds, age, "right") - 1]
+
+    fatalities["Road User"] = road_user
+    fatalities["Gender"] = gender
+    fatalities["Age"] = np.where(age_unknown, -9, age)
+    fatalities["Age Group"] = np.where(age_unknown, -9, age_group)
+
+    return crashes[CRASH_COLUMNS], fatalities[FATALITY_COLUMNS]
+
+
+# ---------- Writers ----------
+def _cell(value):
+    """
+    Native Python value for openpyxl (numpy scalars and missing values converted).
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _write_workbook(path: str, sheets: list):
+    """
+    Write (sheet name, rows) pairs with a streaming (write-only) workbook.
+    """
+    wb = Workbook(write_only=True)
+    for name, rows in sheets:
+        ws = wb.create_sheet(title=name)
+        for row in rows:
+            ws.append([_cell(v) for v in row])
+    tmp_path = path + ".tmp"
+    wb.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_bitre_workbook(path: str, sheet_name: str, title: str, df: pd.DataFrame):
+    """
+    BITRE layout: 4 metadata rows (skipped by the loaders), the header row, then the records.
+    """
+    if len(df) + 5 > XLSX_MAX_ROWS:
+        raise ValueError(f"{len(df)} rows do not fit in one worksheet (max {XLSX_MAX_ROWS - 5}).")
+    preamble = [
+        ["Australian Road Deaths Database"],
+        [title],
+        ["Synthetic data generated for testing; values do not describe real crashes."],
+        [],
+    ]
+
+    def rows():
+        yield from preamble
+        yield list(df.columns)
+        yield from df.itertuples(index=False, name=None)
+
+    _write_workbook(path, [("Index", [["Synthetic ARDD extract"]]), (sheet_name, rows())])
+
+
+def _population_sheet(table_no: int, title: str, code_label: str, name_label: str, body: list) -> list:
+    """
+    ABS population layout: 6 preamble rows, the header row (skiprows=6), the body, then a
+    "Total Australia" row and a copyright row (the loader drops the last two rows).
+    """
+    years = list(range(2001, 2024))
+    total = [sum(row[2 + i] or 0 for row in body if not str(row[1]).startswith("Total")) for i in range(len(years))]
+    return [
+        [f"This tab has one table with the estimated resident population for {title} as at 30 June 2023."],
+        ["Australian Bureau of Statistics"],
+        [f"Table {table_no}. Estimated resident population, {title}, Australia"],
+        ["Regional population, 2022-23"],
+        [None, None, "ERP at 30 June"],
+        [None, None] + years,
+        [code_label, name_label] + ["no."] * len(years),
+        *body,
+        [None, "Total Australia"] + total,
+        ["© Commonwealth of Australia"],
+    ]
+
+
+def _population_series(population_2023: int, growth: float) -> list:
+    return [int(round(population_2023 / (1 + growth) ** (2023 - year))) for year in range(2001, 2024)]
+
+
+def write_population_workbook(path: str, geography: pd.DataFrame, rng: np.random.Generator):
+    """
+    Population_estimates.xlsx with Tables 1-4 (LGA, SUA, remoteness area, electoral division).
+    """
+    state_order = [s[0] for s in STATES] + [OTHER_TERRITORIES[0]]
+    state_no = {code: i + 1 for i, code in enumerate(state_order)}
+
+    # Table 1: LGAs
+    lga_body = []
+    for i, row in enumerate(geography.itertuples()):
+        code = state_no[row.state] * 10000 + (i % 900) * 10 + 50
+        lga_body.append([code, row.lga_name] + _population_series(row.population_2023, row.growth))
+
+    # Table 2: significant urban areas, plus the remainder of each state
+    taken = set(geography["lga_name"]) | set(geography["sa4_name"])
+    sua_body = []
+    for code in state_order:
+        people = geography.loc[geography["state"] == code, "population_2023"].sum()
+        n_sua = max(1, int(np.log10(max(people, 10))) - 2)
+        urban = people * rng.uniform(0.6, 0.9)
+        for j, name in enumerate(_names(rng, n_sua, taken)):
+            share = urban * (0.7 if j == 0 else 0.3 / max(n_sua - 1, 1))
+            sua_body.append([state_no[code] * 1000 + j + 1, name] + _population_series(int(share), 0.015))
+        sua_body.append([state_no[code] * 1000, f"Not in any Significant Urban Area ({code})"]
+                        + _population_series(int(people - urban), 0.005))
+
+    # Table 3: remoteness areas per state with state totals, then national rows
+    remote_body = []
+    national = {area: np.zeros(23, dtype=np.int64) for area in REMOTENESS_AREAS}
+    for code, state_name, suffix, *_ in STATES + [OTHER_TERRITORIES]:
+        state_rows = geography[geography["state"] == code]
+        state_total = np.zeros(23, dtype=np.int64)
+        first = True
+        for area in REMOTENESS_AREAS:
+            members = state_rows[state_rows["remoteness"].map(lambda areas: areas[0] == area)]
+            if members.empty:
+                continue
+            series = np.sum([_population_series(r.population_2023, r.growth) for r in members.itertuples()], axis=0)
+            remote_body.append([state_name if first else None, f"{area} ({suffix})"] + series.tolist())
+            first = False
+            state_total += series
+            national[area] += series
+        remote_body.append([None, f"Total {state_name}"] + state_total.tolist())
+    remote_body.append([None, None] + [None] * 23)
+    for area in REMOTENESS_AREAS:
+        remote_body.append([None, area] + national[area].tolist())
+
+    # Table 4: electoral divisions of roughly equal size
+    ced_body = []
+    for code in state_order:
+        people = geography.loc[geography["state"] == code, "population_2023"].sum()
+        n_ced = max(1, int(round(people / 180000)))
+        for j, name in enumerate(_names(rng, n_ced, taken)):
+            ced_body.append([state_no[code] * 100 + j + 1, name] + _population_series(int(people / n_ced), 0.012))
+
+    contents = [["Population estimates by region (synthetic)"], [], ["Contents"],
+                ["Table 1", "Local Government Areas"], ["Table 2", "Significant Urban Areas"],
+                ["Table 3", "Remoteness Areas"], ["Table 4", "Commonwealth Electoral Divisions"]]
+    _write_workbook(path, [
+        ("Contents", contents),
+        ("Table 1", _population_sheet(1, "Local Government Areas", "LGA code", "Local Government Area", lga_body)),
+        ("Table 2", _population_sheet(2, "Significant Urban Areas", "SUA code", "Significant Urban Area", sua_body)),
+        ("Table 3", _population_sheet(3, "Remoteness Areas", "State/Territory", "Remoteness Area", remote_body)),
+        ("Table 4", _population_sheet(4, "Commonwealth Electoral Divisions", "CED code",
+                                      "Commonwealth Electoral Division", ced_body)),
+    ])
+
+
+def write_dwelling_csv(path: str, geography: pd.DataFrame):
+    """
+    ABS TableBuilder layout: 11 preamble lines, exactly DWELLING_DATA_ROWS area rows
+    (LGAs plus offshore/shipping rows), a Total row and the footer.
+    """
+    areas = [(row.lga_name, row.dwellings) for row in geography.itertuples()]
+    codes = [s[0] for s in STATES] + [OTHER_TERRITORIES[0]]
+    areas += [(f"Migratory - Offshore - Shipping ({code})", 0) for code in codes]
+    if len(areas) != DWELLING_DATA_ROWS:
+        raise ValueError(f"Dwelling table needs {DWELLING_DATA_ROWS} area rows, got {len(areas)}.")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        f.write("Australian Bureau of Statistics\n\n")
+        f.write('"2021 Census - counting dwellings, place of enumeration"\n"LGA (EN)"\n"Counting: Dwelling Records"\n\n')
+        f.write('Filters:\n"Default Summation","Dwelling Records"\n\n\n"LGA (EN)",\n')
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC, lineterminator=",\n")
+        for name, count in areas:
+            writer.writerow([name, int(count)])
+        writer.writerow(["Total", int(sum(count for _, count in areas))])
+        f.write('\n"Data source: Census of Population and Housing, 2021, TableBuilder"\n\n')
+        f.write('"INFO","Cells in this table have been randomly adjusted to avoid the release of confidential data."\n\n\n')
+        f.write('"Copyright Commonwealth of Australia, 2021, see abs.gov.au/copyright"\n')
+    os.replace(tmp_path, path)
+
+
+def generate_sources(output_dir: str = "synthetic_sources", n_fatalities: int = 55000, seed: int = 0) -> dict:
+    """
+    Write all four source files into `output_dir`; returns {file name: path}.
+    The same seed and row count always produce the same files.
+    """
+    if n_fatalities + 5 > XLSX_MAX_ROWS:
+        raise ValueError(f"n_fatalities={n_fatalities} exceeds one worksheet (max {XLSX_MAX_ROWS - 5} rows).")
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    geography = build_geography(rng)
+    crashes, fatalities = generate_records(n_fatalities, geography, rng)
+
+    paths = {name: os.path.join(output_dir, name) for name in (CRASH_FILE, FATALITY_FILE, POPULATION_FILE, DWELLING_FILE)}
+    print(f"📦 Writing {len(crashes)} crashes / {len(fatalities)} fatalities to `{output_dir}`")
+    write_bitre_workbook(paths[CRASH_FILE], "BITRE_Fatal_Crash", "Fatal crashes - December 2024", crashes)
+    write_bitre_workbook(paths[FATALITY_FILE], "BITRE_Fatality", "Fatalities - December 2024", fatalities)
+    write_population_workbook(paths[POPULATION_FILE], geography, rng)
+    write_dwelling_csv(paths[DWELLING_FILE], geography)
+    print("✅ Synthetic source files written.")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic BITRE / ABS source files.")
+    parser.add_argument("--rows", type=int, default=55000, help="number of fatality records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_sources")
+    args = parser.parse_args()
+    generate_sources(args.out, n_fatalities=args.rows, seed=args.seed)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# table_catalog.py
+# Lazy catalog of the CSV tables in a folder. Tables and their column types are registered
+# from TABLE_SCHEMAS / WIDE_DTYPES without reading any data; a load reads only the requested
+# columns with compact types (Int32 keys, categorical text), and each column at most once per process.
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from utility.schemas import TABLE_SCHEMAS, table_columns
+from utility.wide_table import WIDE_DTYPES, WIDE_TABLE_NAME, blank_unmatched_keys
+
+
+def sql_to_dtype(definition: str) -> str:
+    """
+    Compact pandas dtype for a column definition from TABLE_SCHEMAS.
+    """
+    sql_type = definition.split()[0].upper()
+    if sql_type == "BIGINT":
+        return "Int64"
+    if sql_type in ("SERIAL", "INTEGER", "INT", "SMALLINT"):
+        return "Int32"
+    if sql_type.startswith(("NUMERIC", "DECIMAL", "REAL", "DOUBLE", "FLOAT")):
+        return "float64"
+    return "category"
+
+
+def table_dtypes(table_name: str) -> Dict[str, str]:
+    """
+    Declared column types of a table; WIDE_DTYPES takes precedence so every
+    table agrees with fatality_wide (e.g. "True"/"False" categoricals, Int64 populations).
+    """
+    if table_name == WIDE_TABLE_NAME:
+        return dict(WIDE_DTYPES)
+    if table_name not in TABLE_SCHEMAS:
+        return {}
+    return {name: WIDE_DTYPES.get(name, sql_to_dtype(definition)) for name, definition in table_columns(table_name)}
+
+
+class TableCatalog:
+    """
+    Tables available in `folder` (one CSV per table), loaded on demand.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.tables: Dict[str, Dict[str, str]] = {}
+        if os.path.isdir(folder):
+            for filename in sorted(os.listdir(folder)):
+                if filename.endswith(".csv"):
+                    self.register(filename[:-len(".csv")])
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def register(self, table_name: str, dtypes: Optional[Dict[str, str]] = None):
+        """
+        Register a table and its column types (TABLE_SCHEMAS by default) without reading it.
+        """
+        self.tables[table_name] = dtypes if dtypes is not None else table_dtypes(table_name)
+
+    def path(self, table_name: str) -> str:
+        return os.path.join(self.folder, f"{table_name}.csv")
+
+    def columns(self, table_name: str) -> List[str]:
+        """
+        Column names of a table, from its schema (or the CSV header for undeclared tables).
+        """
+        if not self.tables[table_name]:
+            self.tables[table_name] = {col: None for col in pd.read_csv(self.path(table_name), nrows=0).columns}
+        return list(self.tables[table_name])
+
+    def load(self, table_name: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Columns of a table (all when `columns` is None). Columns already loaded are served
+        from memory; only the missing ones are read from the CSV.
+        """
+        if table_name not in self.tables:
+            raise KeyError(f"Table `{table_name}` is not in the catalog for `{self.folder}`.")
+        wanted = self.columns(table_name) if columns is None else list(columns)
+        cached = self._frames.get(table_name)
+        missing = [col for col in wanted if cached is None or col not in cached.columns]
+
+        if missing:
+            dtypes = {col: dtype for col, dtype in self.tables[table_name].items() if col in missing and dtype}
+            # Nullable integers are cast after parsing: the CSV reader is much slower producing them directly
+            integers = {col: dtype for col, dtype in dtypes.items() if dtype.startswith("Int")}
+            print(f"📥 Loading {table_name} ({len(missing)} columns)")
+            df = pd.read_csv(self.path(table_name), usecols=missing,
+                             dtype={col: dtype for col, dtype in dtypes.items() if col not in integers})
+            df = df.astype(integers)
+            cached = df if cached is None else pd.concat([cached, df], axis=1)
+            self._frames[table_name] = cached
+        return cached[wanted]
+
+    def owner(self, column: str, tables: Sequence[str]) -> Optional[str]:
+        """
+        First table among `tables` whose schema holds `column`.
+        """
+        for table_name in tables:
+            if table_name in self.tables and column in self.columns(table_name):
+                return table_name
+        return None
+
+    def load_joined(self, fact: str, joins: Sequence[Tuple[str, str]], columns: Sequence[str]) -> pd.DataFrame:
+        """
+        `fact` left-joined with only the dimensions that hold some of `columns`.
+        The fact side keeps every join key; keys that are NULL or match no dimension row are missing.
+        """
+        keys = [key for _, key in joins]
+        dims = [dim for dim, _ in joins]
+        needed: Dict[str, List[str]] = {}
+        fact_cols = list(keys)
+        for col in columns:
+            if col in keys or col in fact_cols:
+                continue
+            if col in self.columns(fact):
+                fact_cols.append(col)
+                continue
+            dim = self.owner(col, dims)
+            if dim is None:
+                raise KeyError(f"Column `{col}` is not in `{fact}` or any joined dimension.")
+            needed.setdefault(dim, []).append(col)
+
+        df = self.load(fact, fact_cols)
+        for dim, key in joins:
+            # One read per dimension: the key column for blanking unmatched keys, plus the wanted columns
+            dim_df = self.load(dim, [key] + needed.get(dim, []))
+            df = blank_unmatched_keys(df, key, dim_df[key])
+            if dim in needed:
+                df = df.merge(dim_df, on=key, how="left")
+        return df
+
+
+# One catalog per folder, shared by every loader in this process
+_CATALOGS: Dict[str, TableCatalog] = {}
+
+
+def get_catalog(folder: str) -> TableCatalog:
+    key = os.path.abspath(folder)
+    if key not in _CATALOGS:
+        _CATALOGS[key] = TableCatalog(folder)
+    return _CATALOGS[key]
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# targeted_mining.py
+# Consequent-constrained association rule mining: only rules X -> {target item} are searched,
+# instead of enumerating every frequent itemset and filtering the rules afterwards.
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from utility.item_matrix import ColumnSubset
+
+# Metric columns produced by mlxtend.frequent_patterns.association_rules, in the same order
+RULE_METRIC_COLUMNS = [
+    "antecedent support", "consequent support", "support", "confidence", "lift",
+    "representativity", "leverage", "conviction", "zhangs_metric", "jaccard",
+    "certainty", "kulczynski",
+]
+
+
+def rule_metrics(antecedents: List[frozenset], consequents: List[frozenset],
+                 sAC: np.ndarray, sA: np.ndarray, sC: np.ndarray) -> pd.DataFrame:
+    """
+    Build a rules DataFrame with the same columns and formulas as mlxtend's
+    association_rules (complete data, no null handling).
+    """
+    sAC, sA, sC = (np.asarray(x, dtype=float) for x in (sAC, sA, sC))
+    df = pd.DataFrame({"antecedents": antecedents, "consequents": consequents})
+    if not len(df):
+        return pd.DataFrame(columns=["antecedents", "consequents"] + RULE_METRIC_COLUMNS)
+
+    confidence = sAC / sA
+    leverage = sAC - sA * sC
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conviction = np.where(confidence < 1.0, (1.0 - sC) / (1.0 - confidence), np.inf)
+        denominator = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+        zhangs = np.where(denominator == 0, 0, leverage / denominator)
+        certainty = np.where(1 - sC == 0, 0, (confidence - sC) / (1 - sC))
+
+    df["antecedent support"] = sA
+    df["consequent support"] = sC
+    df["support"] = sAC
+    df["confidence"] = confidence
+    df["lift"] = confidence / sC
+    df["representativity"] = 1.0
+    df["leverage"] = leverage
+    df["conviction"] = conviction
+    df["zhangs_metric"] = zhangs
+    df["jaccard"] = sAC / (sA + sC - sAC)
+    df["certainty"] = certainty
+    df["kulczynski"] = (sAC / sA + sAC / sC) / 2
+    return df
+
+
+def mine_targeted_rules(df_trans: pd.DataFrame, target_rhs: str = "road_user=", min_support: float = 0.02,
+                        min_confidence: float = 0.60, min_lift: float = 1.0) -> pd.DataFrame:
+    """
+    Mine rules whose single consequent is an item starting with `target_rhs`.
+
+    For each target item y, a depth-first search grows antecedents X only inside the rows
+    containing y, so every counted itemset co-occurs with y:
+      - support(X ∪ {y}) is anti-monotone, so a branch stops as soon as it drops below min_support;
+      - lift(X -> y) can never exceed 1 / support(y), so targets that cannot reach min_lift are skipped;
+      - confidence and lift are checked when each rule is emitted.
+    Items from the same source column never co-occur ("col=a" and "col=b"), so each column
+    contributes at most one item to an antecedent. Returns the same metric columns as mlxtend.
+    `df_trans` may also be a ColumnSubset, whose columns are read in place.
+    """
+    labels = list(df_trans.columns)
+    if isinstance(df_trans, ColumnSubset):
+        # Read the columns in place (e.g. in shared memory) instead of copying them
+        X, position = df_trans.matrix, df_trans.positions
+    else:
+        X, position = np.asfortranarray(df_trans.to_numpy(dtype=bool)), np.arange(len(labels))
+    n_rows = X.shape[0]
+    owners = [label.split("=", 1)[0] for label in labels]
+    counts = np.array([np.count_nonzero(X[:, position[j]]) for j in range(len(labels))], dtype=np.int64)
+
+    # Candidate antecedent items grouped by column; `next_column[k]` is where the next column starts
+    targets = [j for j, label in enumerate(labels) if label.startswith(target_rhs)]
+    target_columns = {owners[j] for j in targets}
+    candidates = sorted((j for j in range(len(labels)) if owners[j] not in target_columns and counts[j] / n_rows >= min_support),
+                        key=lambda j: (owners[j], labels[j]))
+    next_column = [0] * len(candidates)
+    for k in range(len(candidates) - 1, -1, -1):
+        same = k + 1 < len(candidates) and owners[candidates[k + 1]] == owners[candidates[k]]
+        next_column[k] = next_column[k + 1] if same else k + 1
+
+    antecedents, consequents, sAC, sA, sC = [], [], [], [], []
+
+    def search(prefix, rows_A, rows_AC, start, y, support_y):
+        for k in range(start, len(candidates)):
+            i = candidates[k]
+            column = X[:, position[i]]
+            in_AC = rows_AC[column[rows_AC]]
+            support_AC = len(in_AC) / n_rows
+            if support_AC < min_support:
+                continue
+            in_A = rows_A[column[rows_A]]
+            support_A = len(in_A) / n_rows
+            confidence = support_AC / support_A
+            itemset = prefix + [i]
+            if confidence >= min_confidence and confidence / support_y >= min_lift:
+                antecedents.append(frozenset(labels[j] for j in itemset))
+                consequents.append(frozenset([labels[y]]))
+                sAC.append(support_AC)
+                sA.append(support_A)
+                sC.append(support_y)
+            search(itemset, in_A, in_AC, next_column[k], y, support_y)
+
+    all_rows = np.arange(n_rows)
+    for y in targets:
+        support_y = counts[y] / n_rows
+        if support_y < min_support or 1.0 / support_y < min_lift:
+            continue
+        search([], all_rows, np.flatnonzero(X[:, position[y]]), 0, y, support_y)
+
+    return rule_metrics(antecedents, consequents, sAC, sA, sC)
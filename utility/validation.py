@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# validation.py
+# Pre-load validation of the star schema tables against TABLE_SCHEMAS, with vectorized checks
+# run chunk by chunk: primary keys (NOT NULL, unique), NOT NULL columns, foreign keys present in
+# the referenced dimension, VARCHAR lengths, INTEGER / BOOLEAN values.
+# Errors are what the database would reject, plus NULL foreign keys (unresolved dimension lookups)
+# unless they are explicitly allowed; warnings load fine.
+
+import argparse
+import os
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utility.csv_chunks import iter_csv_chunks
+from utility.schemas import TABLE_IMPORT_ORDER, table_columns, table_foreign_keys
+
+# ---------- Configuration ----------
+INTEGER_RANGES = {
+    "SMALLINT": (-2 ** 15, 2 ** 15 - 1),
+    "INTEGER": (-2 ** 31, 2 ** 31 - 1),
+    "INT": (-2 ** 31, 2 ** 31 - 1),
+    "SERIAL": (1, 2 ** 31 - 1),
+    "BIGINT": (-2 ** 63, 2 ** 63 - 1),
+}
+# Values PostgreSQL accepts for BOOLEAN (compared case-insensitively as text)
+BOOLEAN_VALUES = {"true", "false", "t", "f", "yes", "no", "y", "n", "on", "off", "1", "0"}
+# Offending values quoted per problem
+EXAMPLES = 3
+# Rows per chunk when validating CSV files
+CHUNK_ROWS = 50000
+
+
+def _problem(severity: str, table: str, column: str, check: str, mask, values=None) -> dict:
+    count = int(np.count_nonzero(mask))
+    examples = [] if values is None else pd.unique(np.asarray(values)[np.asarray(mask)])[:EXAMPLES].tolist()
+    return {"severity": severity, "table": table, "column": column, "check": check,
+            "rows": count, "examples": examples}
+
+
+def check_column_types(table_name: str, df: pd.DataFrame, seen_keys: Dict[str, set] = None) -> List[dict]:
+    """
+    Column-level checks: presence, NOT NULL / PRIMARY KEY, uniqueness, VARCHAR(n), integer and boolean values.
+    `seen_keys` (column → values of earlier chunks) extends uniqueness across chunks and is updated in place;
+    a key repeated from an earlier chunk counts only the later rows.
+    """
+    problems = []
+    for name, definition in table_columns(table_name):
+        upper = definition.upper()
+        if name not in df.columns:
+            if not upper.startswith("SERIAL"):
+                problems.append({"severity": "warning", "table": table_name, "column": name,
+                                 "check": "missing column (loaded as NULL)", "rows": len(df), "examples": []})
+            continue
+        col = df[name]
+        missing = col.isna().to_numpy()
+
+        if ("PRIMARY KEY" in upper or "NOT NULL" in upper) and missing.any():
+            problems.append(_problem("error", table_name, name, "NOT NULL", missing))
+        if "PRIMARY KEY" in upper or "UNIQUE" in upper:
+            duplicated = (col.duplicated(keep=False) & ~col.isna()).to_numpy()
+            if seen_keys is not None:
+                seen = seen_keys.setdefault(name, set())
+                duplicated |= col.isin(seen).to_numpy() & ~missing
+                seen.update(col[~missing].unique().tolist())
+            if duplicated.any():
+                problems.append(_problem("error", table_name, name, "unique", duplicated, col))
+
+        present = col[~missing]
+        sql_type = upper.split()[0]
+        varchar = re.match(r"(?:VAR)?CHAR(?:ACTER)?(?:\s+VARYING)?\s*\(\s*(\d+)\s*\)", upper)
+        if varchar:
+            too_long = (present.astype(str).str.len() > int(varchar.group(1))).to_numpy()
+            if too_long.any():
+                problems.append(_problem("error", table_name, name, f"length > {varchar.group(1)}", too_long, present))
+        elif sql_type in INTEGER_RANGES:
+            numbers = pd.to_numeric(present, errors="coerce").to_numpy(dtype=float)
+            low, high = INTEGER_RANGES[sql_type]
+            with np.errstate(invalid="ignore"):
+                bad = np.isnan(numbers) | (numbers != np.round(numbers)) | (numbers < low) | (numbers > high)
+            if bad.any():
+                problems.append(_problem("error", table_name, name, sql_type.lower(), bad, present))
+        elif sql_type == "BOOLEAN":
+            bad = ~present.astype(str).str.lower().isin(BOOLEAN_VALUES).to_numpy()
+            if bad.any():
+                problems.append(_problem("error", table_name, name, "boolean", bad, present))
+    return problems
+
+
+def check_foreign_keys(table_name: str, df: pd.DataFrame, keys: Dict[str, Dict[str, pd.Index]],
+                       allow_null: bool = False) -> List[dict]:
+    """
+    Every non-NULL foreign key must exist among the referenced table's keys (`keys[table][column]`,
+    set membership). NULL foreign keys (unresolved dimension lookups) are errors, or warnings with `allow_null`.
+    """
+    problems = []
+    for column, ref_table, ref_column in table_foreign_keys(table_name):
+        if column not in df.columns:
+            continue
+        col = df[column]
+        missing = col.isna().to_numpy()
+        if missing.any():
+            problems.append(_problem("warning" if allow_null else "error", table_name, column,
+                                     f"NULL (no {ref_table} match)", missing))
+        if ref_table not in keys:
+            problems.append({"severity": "error", "table": table_name, "column": column,
+                             "check": f"references missing table {ref_table}", "rows": len(df), "examples": []})
+            continue
+        orphan = ~missing & ~col.isin(keys[ref_table][ref_column]).to_numpy()
+        if orphan.any():
+            problems.append(_problem("error", table_name, column, f"not in {ref_table}.{ref_column}", orphan, col))
+    return problems
+
+
+def merge_problems(problems: List[dict]) -> List[dict]:
+    """
+    Combine the per-chunk reports of the same check: row counts add up, examples are kept up to EXAMPLES.
+    """
+    merged = {}
+    for p in problems:
+        key = (p["severity"], p["table"], p["column"], p["check"])
+        if key not in merged:
+            merged[key] = dict(p, examples=list(p["examples"]))
+            continue
+        total = merged[key]
+        total["rows"] += p["rows"]
+        total["examples"] += [e for e in p["examples"] if e not in total["examples"]]
+        del total["examples"][EXAMPLES:]
+    return list(merged.values())
+
+
+def validate_tables(tables: Dict[str, pd.DataFrame], allow_null_foreign_keys: bool = False) -> List[dict]:
+    """
+    All checks for the given in-memory tables (name → DataFrame as it will be inserted).
+    """
+    keys = {}
+    for table_name in tables:
+        for _, ref_table, ref_column in table_foreign_keys(table_name):
+            if ref_table in tables:
+                keys.setdefault(ref_table, {})[ref_column] = pd.Index(tables[ref_table][ref_column].dropna().unique())
+    problems = []
+    for table_name, df in tables.items():
+        problems += check_column_types(table_name, df)
+        problems += check_foreign_keys(table_name, df, keys, allow_null_foreign_keys)
+    return problems
+
+
+def validate_csv_files(files: Dict[str, str], chunk_rows: int = CHUNK_ROWS,
+                       allow_null_foreign_keys: bool = False) -> Tuple[List[dict], int]:
+    """
+    All checks for the CSV files (table name → path), read `chunk_rows` records at a time.
+    Tables are visited in TABLE_IMPORT_ORDER, so the dimensions' primary keys collected by the
+    uniqueness check are the key sets the fact tables' foreign keys are checked against;
+    only those key columns are held in memory. Returns (problems, rows read).
+    """
+    keys, problems, rows = {}, [], 0
+    for table_name in sorted(files, key=lambda name: TABLE_IMPORT_ORDER.index(name)):
+        seen_keys = {}
+        for chunk, _ in iter_csv_chunks(files[table_name], chunk_rows):
+            problems += check_column_types(table_name, chunk, seen_keys)
+            problems += check_foreign_keys(table_name, chunk, keys, allow_null_foreign_keys)
+            rows += len(chunk)
+        keys[table_name] = {column: pd.Index(list(values)) for column, values in seen_keys.items()}
+    return merge_problems(problems), rows
+
+
+def csv_files(folder: str, table_names=TABLE_IMPORT_ORDER) -> Dict[str, str]:
+    """
+    The CSVs of `table_names` found in `folder` (table name → path).
+    """
+    return {name: os.path.join(folder, f"{name}.csv") for name in table_names
+            if os.path.exists(os.path.join(folder, f"{name}.csv"))}
+
+
+def format_problems(problems: List[dict]) -> str:
+    lines = []
+    for p in problems:
+        icon = "❌" if p["severity"] == "error" else "⚠️"
+        examples = f" e.g. {p['examples']}" if p["examples"] else ""
+        lines.append(f"{icon} {p['table']}.{p['column']}: {p['check']} ({p['rows']} rows){examples}")
+    return "\n".join(lines)
+
+
+def errors(problems: List[dict]) -> List[dict]:
+    return [p for p in problems if p["severity"] == "error"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the star schema CSVs before loading them.")
+    parser.add_argument("folder", nargs="?", default="output")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--allow-null-fks", action="store_true", help="Report NULL foreign keys as warnings")
+    cli = parser.parse_args()
+
+    found, _ = validate_csv_files(csv_files(cli.folder), cli.chunk_rows, allow_null_foreign_keys=cli.allow_null_fks)
+    print(format_problems(found) or "✅ All tables valid.")
+    raise SystemExit(1 if errors(found) else 0)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# wide_table.py
+# Denormalized `fatality_wide` table: one row per fatality holding every dimension attribute,
+# so that mining and ad-hoc analysis can start without re-joining the star schema.
+
+import os
+import pandas as pd
+
+WIDE_TABLE_NAME = "fatality_wide"
+
+# ✅ Dimensions joined onto fact_person_fatality, with the foreign key used for each join
+WIDE_JOINS = [
+    ("dim_person", "person_id"),
+    ("dim_date", "date_id"),
+    ("dim_holiday", "holiday_id"),
+    ("dim_location", "location_id"),
+    ("dim_road", "road_id"),
+    ("dim_vehicle", "vehicle_id"),
+    ("dim_crash_type", "crash_type_id"),
+    ("dim_time", "time_of_day_id"),
+]
+WIDE_KEY_COLUMNS = [key for _, key in WIDE_JOINS]
+
+# ✅ Compact column types; text and boolean attributes are stored as categoricals
+WIDE_DTYPES = {
+    "fact_person_fatality_id": "Int32",
+    "crash_id": "Int64",
+    "person_id": "Int32",
+    "date_id": "Int32",
+    "holiday_id": "Int32",
+    "location_id": "Int32",
+    "road_id": "Int32",
+    "vehicle_id": "Int32",
+    "crash_type_id": "Int32",
+    "time_of_day_id": "Int32",
+    "fatality_count": "Int8",
+    "age": "Int16",
+    "age_group": "category",
+    "gender": "category",
+    "road_user": "category",
+    "year": "Int16",
+    "month": "Int8",
+    "quarter": "Int8",
+    "day_of_week_name": "category",
+    "day_type": "category",
+    "christmas_period": "category",
+    "easter_period": "category",
+    "state": "category",
+    "lga_name": "category",
+    "sa4_name": "category",
+    "remoteness_area": "category",
+    "population_2023_lga": "Int64",
+    "population_2023_remoteness": "Int64",
+    "dwelling_records": "Int64",
+    "road_type": "category",
+    "speed_limit": "Int16",
+    "speed_category": "category",
+    "bus_involvement": "category",
+    "heavy_rigid_truck_involvement": "category",
+    "articulated_truck_involvement": "category",
+    "crash_type": "category",
+    "time_of_day": "category",
+}
+
+
+def apply_wide_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast columns to WIDE_DTYPES. Categoricals hold string labels (e.g. "True", "100")
+    so that values read back from CSV compare equal to freshly built ones.
+    """
+    for col, dtype in WIDE_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype == "category":
+            values = df[col].astype(object)
+            df[col] = values.where(values.isna(), values.astype(str)).astype("category")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype(dtype)
+    return df
+
+
+def blank_unmatched_keys(df: pd.DataFrame, key: str, dimension_keys: pd.Series) -> pd.DataFrame:
+    """
+    Set `key` to missing where it matches no row of the dimension, so that an orphan
+    foreign key looks the same as a NULL one.
+    """
+    matched = df[key].isin(dimension_keys)
+    if not matched.all():
+        df = df.assign(**{key: df[key].astype("Int64").where(matched)})
+    return df
+
+
+def build_fatality_wide(fact_person_fatality: pd.DataFrame, dimensions: dict) -> pd.DataFrame:
+    """
+    Join fact_person_fatality with all its dimensions (left joins, so every fatality is kept).
+    Rows whose foreign key is NULL or matches no dimension row get a missing key in
+    WIDE_KEY_COLUMNS; dropping those rows gives the inner join of the star schema.
+    """
+    df = fact_person_fatality
+    for dim_name, key in WIDE_JOINS:
+        df = blank_unmatched_keys(df, key, dimensions[dim_name][key])
+        df = df.merge(dimensions[dim_name], on=key, how="left")
+
+    ordered = [col for col in WIDE_DTYPES if col in df.columns]
+    df = df[ordered + [col for col in df.columns if col not in ordered]].copy()
+    return apply_wide_dtypes(df)
+
+
+def load_fatality_wide(folder: str = "output", columns: list = None) -> pd.DataFrame:
+    """
+    Load the fatality_wide CSV with its declared types.
+    Optionally restrict to a subset of columns.
+    """
+    path = os.path.join(folder, f"{WIDE_TABLE_NAME}.csv")
+    dtypes = {col: dtype for col, dtype in WIDE_DTYPES.items() if columns is None or col in columns}
+    return pd.read_csv(path, usecols=columns, dtype=dtypes)